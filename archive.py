@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+archive.py — Índice de claves DEDUP_KEY de todo un archivo de libros (pdf2excel index <carpeta>)
+- <carpeta>/pdf2excel-archive.sqlite: tabla files (ruta relativa, sello tamaño+mtime, claves) y tabla keys
+  (folio, fecha, maquina, file) con PRIMARY KEY en ese orden: buscar una clave es un recorrido del B-tree,
+  sin abrir ningún libro. Mismo enfoque (SQLite + sello) que dedup_index, a escala de carpeta.
+- Libros .xlsx/.xlsm ('Datos') y almacenes CSV / Parquet / SQLite (sinks.py). Las claves salen del índice
+  de duplicados del libro (<libro>.dedup.sqlite) si está fresco; si no, de leer sus columnas clave.
+- update(): solo relee los archivos nuevos o cuyo sello cambió y quita los que ya no están.
+- reject_known(rows): deja pasar solo las filas cuya clave no está en otro libro del archivo, en O(filas
+  nuevas). record(): tras escribir un destino dentro de la carpeta, lo anota con esas claves sin releerlo.
+"""
+from __future__ import annotations
+import logging, sqlite3, time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from dedup_index import DedupIndex, Key, index_path, norm_key, workbook_stamp
+from excel_io import iter_existing_keys
+from schema import DEDUP_KEY, ROW_SCHEMA
+from sinks import SQLITE_SUFFIXES, SqliteSink, open_sink, sink_format
+
+LOGGER = logging.getLogger("archive")
+ARCHIVE_INDEX = "pdf2excel-archive.sqlite"
+EXCEL_SUFFIXES = {".xlsx", ".xlsm"}
+KEY_POS = [ROW_SCHEMA.index(k) for k in DEDUP_KEY]
+_SIDE_SUFFIXES = (".dedup.sqlite", ".journal.jsonl", ".watch.json", ".tmp")
+
+def _indexable(p: Path) -> bool:
+    name = p.name.lower()
+    if name == ARCHIVE_INDEX or name.startswith(("~$", ".")) or name.endswith(_SIDE_SUFFIXES): return False
+    if p.is_dir(): return p.suffix.lower() == ".parquet"
+    return p.suffix.lower() in EXCEL_SUFFIXES | SQLITE_SUFFIXES | {".csv"}
+
+def file_keys(path: str | Path) -> Iterator[Key]:
+    """Claves normalizadas de un libro o almacén (del índice de duplicados si está fresco)."""
+    path = Path(path)
+    side = index_path(path)
+    if side.exists():
+        idx = DedupIndex(side)
+        try:
+            if idx.is_fresh(path):
+                yield from idx.conn.execute("SELECT folio, fecha, maquina FROM keys"); return
+        finally:
+            idx.close()
+    fmt = "excel" if path.suffix.lower() in EXCEL_SUFFIXES else sink_format(path)
+    if fmt == "sqlite":
+        # solo lectura: un .sqlite/.db ajeno de la carpeta no se toca (sin tabla 'datos' no aporta claves)
+        conn = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (SqliteSink.TABLE,)).fetchone():
+                yield from conn.execute(f"SELECT k_folio, k_fecha, k_maquina FROM {SqliteSink.TABLE}")
+        finally:
+            conn.close()
+        return
+    keys = iter_existing_keys(path) if fmt == "excel" else open_sink(path, fmt).iter_keys()
+    for k in keys: yield norm_key(k)
+
+class ArchiveIndex:
+    """Índice de claves de los libros de `folder` (ver módulo)."""
+
+    def __init__(self, folder: str | Path, path: str | Path | None = None):
+        self.folder = Path(folder)
+        self.path = Path(path) if path else self.folder / ARCHIVE_INDEX
+        self.conn = sqlite3.connect(str(self.path), isolation_level=None)
+        self.conn.executescript(
+            "CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT);"
+            "CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, path TEXT UNIQUE, stamp TEXT, n INTEGER);"
+            "CREATE TABLE IF NOT EXISTS keys (folio TEXT, fecha TEXT, maquina TEXT, file INTEGER,"
+            " PRIMARY KEY (folio, fecha, maquina, file)) WITHOUT ROWID;"
+        )
+        self.accepted: List[Key] = []      # claves que reject_known dejó pasar (para record)
+        self.rejected: Counter = Counter()  # libro → filas rechazadas por estar ya ahí
+
+    def __enter__(self) -> "ArchiveIndex": return self
+    def __exit__(self, *exc) -> None: self.close()
+
+    def close(self) -> None:
+        if self.conn.in_transaction: self.conn.execute("ROLLBACK")
+        self.conn.close()
+
+    def _rel(self, path: str | Path) -> Optional[str]:
+        try: return Path(path).resolve().relative_to(self.folder.resolve()).as_posix()
+        except ValueError: return None
+
+    def _files(self) -> Dict[str, Tuple[int, str]]:
+        return {p: (i, s) for i, p, s in self.conn.execute("SELECT id, path, stamp FROM files")}
+
+    def recursive(self) -> bool:
+        row = self.conn.execute("SELECT v FROM meta WHERE k = 'recursive'").fetchone()
+        return bool(row and row[0] == "1")
+
+    def _store(self, rel: str, keys: Iterable[Key], stamp: str, replace: bool = True) -> int:
+        """Reemplaza (o amplía) las claves de un archivo y su sello, en una transacción."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute("INSERT OR IGNORE INTO files (path) VALUES (?)", (rel,))
+            fid = self.conn.execute("SELECT id FROM files WHERE path = ?", (rel,)).fetchone()[0]
+            if replace: self.conn.execute("DELETE FROM keys WHERE file = ?", (fid,))
+            self.conn.executemany("INSERT OR IGNORE INTO keys VALUES (?, ?, ?, ?)", ((*k, fid) for k in keys))
+            n = self.conn.execute("SELECT COUNT(*) FROM keys WHERE file = ?", (fid,)).fetchone()[0]
+            self.conn.execute("UPDATE files SET stamp = ?, n = ? WHERE id = ?", (stamp, n, fid))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK"); raise
+        return n
+
+    def update(self, recursive: Optional[bool] = None) -> Dict[str, int]:
+        """Pone el índice al día con la carpeta releyendo solo lo nuevo o cambiado. `recursive`: incluir
+        subcarpetas (None = lo elegido al crear el índice)."""
+        if recursive is None: recursive = self.recursive()
+        else: self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('recursive', ?)", ("1" if recursive else "0",))
+        t0 = time.perf_counter(); known = self._files(); seen = set()
+        stats = {"files": 0, "read": 0, "removed": 0, "errors": 0}
+        for p in sorted(self.folder.rglob("*") if recursive else self.folder.iterdir()):
+            if not _indexable(p): continue
+            rel = self._rel(p); seen.add(rel); stats["files"] += 1
+            stamp = workbook_stamp(p)
+            if rel in known and known[rel][1] == stamp: continue
+            try: n = self._store(rel, file_keys(p), stamp)
+            except Exception as e:
+                # queda anotado sin claves: no se vuelve a intentar hasta que cambie
+                stats["errors"] += 1; LOGGER.warning("No se pudo indexar '%s': %s", p, e)
+                self._store(rel, (), stamp); continue
+            stats["read"] += 1; LOGGER.info("Índice del archivo: %s claves de '%s'", n, rel)
+        gone = [fid for rel, (fid, _) in known.items() if rel not in seen]
+        if gone:
+            self.conn.execute("BEGIN IMMEDIATE")
+            for fid in gone:
+                self.conn.execute("DELETE FROM keys WHERE file = ?", (fid,))
+                self.conn.execute("DELETE FROM files WHERE id = ?", (fid,))
+            self.conn.execute("COMMIT")
+        stats["removed"] = len(gone)
+        stats["keys"] = self.conn.execute("SELECT COUNT(*) FROM keys").fetchone()[0]
+        LOGGER.info("Índice del archivo '%s': %s archivos (%s releídos, %s quitados) | %s claves | %.2fs",
+                    self.folder, stats["files"], stats["read"], stats["removed"], stats["keys"], time.perf_counter() - t0)
+        return stats
+
+    def reject_known(self, rows: Iterable[Any], exclude: Iterable[str | Path] = ()) -> Iterator[Any]:
+        """Filas cuya clave no está en ningún libro del archivo salvo los de `exclude` (el destino, que
+        deduplica por su cuenta). Una consulta por fila; las claves aceptadas quedan en `accepted`."""
+        files = self._files()
+        skip = [files[r][0] for r in map(self._rel, exclude) if r in files]
+        q = ("SELECT f.path FROM keys k JOIN files f ON f.id = k.file WHERE k.folio = ? AND k.fecha = ? AND k.maquina = ?"
+             + "".join(" AND k.file != ?" for _ in skip) + " LIMIT 1")
+        for row in rows:
+            key = norm_key(row[p] for p in KEY_POS)
+            hit = self.conn.execute(q, (*key, *skip)).fetchone()
+            if hit: self.rejected[hit[0]] += 1; continue
+            self.accepted.append(key)
+            yield row
+        if self.rejected:
+            LOGGER.info("Índice del archivo: %s filas ya estaban en otros libros (%s)", sum(self.rejected.values()),
+                        ", ".join(f"{p}: {n}" for p, n in self.rejected.most_common(5)))
+
+    def record(self, target: str | Path, replace: bool) -> None:
+        """Anota el destino recién escrito con las claves aceptadas (replace=True: 'create', su contenido
+        son solo esas filas). Un destino fuera de la carpeta no se anota; uno que el índice no tenía y
+        que no se reemplazó entero se relee."""
+        rel = self._rel(target)
+        if rel is None or not _indexable(Path(target)): return
+        if replace or rel in self._files(): self._store(rel, self.accepted, workbook_stamp(target), replace)
+        else: self._store(rel, file_keys(target), workbook_stamp(target))
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+bench_archive.py — Índice del archivo (archive.py): construcción, actualización incremental y consulta.
+Genera --files almacenes CSV de --rows filas cada uno (claves distintas entre archivos) y mide:
+- construcción completa del índice y tamaño por clave,
+- update() sin cambios (solo sellos) y tras cambiar un archivo (relee solo ese),
+- reject_known sobre --new filas (mitad repetidas de otros archivos): filas/s y exactitud.
+Uso:  python benchmarks/bench_archive.py [--files 24] [--rows 20000] [--new 20000] [--out run.json]
+"""
+from __future__ import annotations
+import argparse, csv, json, logging, os, random, shutil, sys, tempfile, time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from archive import ArchiveIndex
+from schema import ROW_SCHEMA, Row
+
+def make_row(rnd: random.Random, folio: int) -> Row:
+    vals: List[Any] = [None] * len(ROW_SCHEMA)
+    vals[0] = f"{rnd.randint(1, 28):02d}-{rnd.randint(1, 12):02d}-2024"; vals[1] = "10:00:00"
+    vals[2] = rnd.randint(1, 300); vals[4] = str(folio)
+    return Row(vals)
+
+def write_csv(path: Path, rows: List[Row]) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f); w.writerow(ROW_SCHEMA)
+        for r in rows: w.writerow(["" if v is None else v for v in r])
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--files", type=int, default=24)
+    ap.add_argument("--rows", type=int, default=20000, help="Filas por archivo")
+    ap.add_argument("--new", type=int, default=20000, help="Filas entrantes a consultar")
+    ap.add_argument("--out", help="Guardar el JSON en este archivo")
+    args = ap.parse_args()
+    logging.disable(logging.INFO)
+    rnd = random.Random(0); work = Path(tempfile.mkdtemp(prefix="pdf2excel-archive-"))
+    try:
+        stored: List[Row] = []
+        for i in range(args.files):
+            rows = [make_row(rnd, 10**12 + i * args.rows + j) for j in range(args.rows)]
+            write_csv(work / f"m{i:02d}.csv", rows)
+            if i: stored.extend(rows[:: max(1, args.rows // 1000)])   # m00 se reescribe más abajo
+        report: Dict[str, Any] = {"files": args.files, "keys": args.files * args.rows}
+        with ArchiveIndex(work) as idx:
+            t0 = time.perf_counter(); idx.update(); report["build_s"] = round(time.perf_counter() - t0, 3)
+            t0 = time.perf_counter(); idx.update(); report["update_unchanged_s"] = round(time.perf_counter() - t0, 4)
+            write_csv(work / "m00.csv", [make_row(rnd, 9 * 10**12 + j) for j in range(args.rows)])
+            t0 = time.perf_counter(); st = idx.update(); report["update_one_changed_s"] = round(time.perf_counter() - t0, 3)
+            report["files_reread"] = st["read"]
+            dups = (stored * (args.new // 2 // max(len(stored), 1) + 1))[: args.new // 2]
+            fresh = [make_row(rnd, 8 * 10**12 + j) for j in range(args.new - len(dups))]
+            incoming = fresh + dups; rnd.shuffle(incoming)
+            t0 = time.perf_counter(); kept = list(idx.reject_known(incoming)); dt = time.perf_counter() - t0
+            report["lookup_rows_s"] = round(len(incoming) / dt)
+            report["lookup_exact"] = len(kept) == len(fresh) and sum(idx.rejected.values()) == len(dups)
+        report["index_bytes_per_key"] = round(os.path.getsize(work / "pdf2excel-archive.sqlite") / report["keys"], 1)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out: Path(args.out).write_text(text, encoding="utf-8")
+    sys.exit(0 if report["lookup_exact"] and report["files_reread"] == 1 else 1)
+
+if __name__ == "__main__":
+    main()
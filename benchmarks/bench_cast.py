@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+bench_cast.py — Compara cast_types vectorizado vs. el mapeo por celda de TYPE_CASTERS.
+Uso:  python benchmarks/bench_cast.py [--rows 1000000]
+Verifica además que ambos den el mismo resultado (None ↔ <NA>), también en casos borde contra el caster
+escalar directo (enteros fuera de int64, "1_000", dígitos Unicode, floats grandes).
+"""
+from __future__ import annotations
+import argparse, json, random, sys, time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import pandas as pd
+from schema import ROW_SCHEMA, TYPE_CASTERS
+from excel_io import cast_types
+
+def make_frame(n: int, text_ratio: float = 0.0, seed: int = 0) -> pd.DataFrame:
+    """Columnas como las de append_and_dedup: enteros con huecos (→ float64 en pandas) y '%' float.
+    Con text_ratio > 0 una fracción de celdas llega como texto del Excel ("12", "", "4,5")."""
+    rnd = random.Random(seed)
+    def intish():
+        r = rnd.random()
+        if r < text_ratio: return rnd.choice([str(rnd.randint(0, 999)), "", " 7 ", "x"])
+        return None if r < text_ratio + 0.1 else rnd.randint(0, 999)
+    def pct():
+        r = rnd.random()
+        if r < text_ratio: return rnd.choice([f"{rnd.randint(0, 100)},{rnd.randint(0, 9)}", ""])
+        return None if r < text_ratio + 0.1 else round(rnd.uniform(0, 100), 1)
+    cols = {c: [None] * n for c in ROW_SCHEMA}
+    for c in TYPE_CASTERS:
+        cols[c] = [pct() for _ in range(n)] if c == "%" else [intish() for _ in range(n)]
+    return pd.DataFrame(cols, columns=ROW_SCHEMA)
+
+def cast_types_per_cell(df: pd.DataFrame) -> pd.DataFrame:
+    for col, caster in TYPE_CASTERS.items():
+        df[col] = df[col].map(caster)
+    return df
+
+def same(a: pd.DataFrame, b: pd.DataFrame) -> bool:
+    for col in TYPE_CASTERS:
+        x = a[col].astype(object).where(a[col].notna(), None).tolist()
+        y = b[col].astype(object).where(b[col].notna(), None).tolist()
+        if x != y: return False
+    return True
+
+# Columnas de casos borde: cada una debe dar lo mismo que el caster escalar celda a celda
+EDGE_COLUMNS = {
+    "fuera de int64": [10 ** 20, 5, None],
+    "texto": [" 12 ", "1_000", "٣", "x", "", None, 3.0, 2.5, "-7", "+8", "1__0", "_1"],
+    "texto largo": ["99999999999999999999", "123456789012345678", "1234567890123456789", None],
+    "texto y fuera de int64": ["7", 10 ** 20],
+    "object > 2**53": [2 ** 60 + 1, None],
+    "float": [1e20, 3.0, float("nan"), float("inf")],
+    "bool": [True, 1, "2"],
+}
+
+def edge_cases() -> List[str]:
+    """Nombres de los casos borde en que cast_types no coincide con TYPE_CASTERS aplicado celda a celda."""
+    bad = []
+    for name, values in EDGE_COLUMNS.items():
+        df = pd.DataFrame({c: [None] * len(values) for c in ROW_SCHEMA}, columns=ROW_SCHEMA)
+        for col in TYPE_CASTERS: df[col] = pd.Series(values, dtype=object)
+        new = cast_types(df.copy())
+        for col, caster in TYPE_CASTERS.items():
+            got = new[col].astype(object).where(new[col].notna(), None).tolist()
+            want = [None if v != v else v for v in map(caster, values)]  # NaN ↔ <NA>, como el mapeo por celda
+            if got != want or any(type(g) is not type(w) and None not in (g, w) for g, w in zip(got, want)):
+                bad.append(f"{name} ({col})")
+    return bad
+
+def run(rows: int, text_ratio: float) -> dict:
+    df = make_frame(rows, text_ratio)
+    t0 = time.perf_counter(); old = cast_types_per_cell(df.copy()); t_old = time.perf_counter() - t0
+    t0 = time.perf_counter(); new = cast_types(df.copy()); t_new = time.perf_counter() - t0
+    return {"rows": rows, "text_ratio": text_ratio, "per_cell_s": round(t_old, 3), "vectorized_s": round(t_new, 3),
+            "speedup": round(t_old / t_new, 1), "identical": same(old, new)}
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--text-ratio", type=float, nargs="+", default=[0.0, 0.01],
+                    help="Fracción de celdas que llegan como texto (0 = columnas ya numéricas)")
+    args = ap.parse_args()
+    for ratio in args.text_ratio:
+        print(json.dumps(run(args.rows, ratio)))
+    bad = edge_cases()
+    print(json.dumps({"edge_cases": len(EDGE_COLUMNS), "identical": not bad, "mismatch": bad}, ensure_ascii=False))
+    sys.exit(1 if bad else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+bench_e2e.py — Benchmark de punta a punta sobre reportes sintéticos (benchmarks/synth.py).
+Etapas: extracción de texto (pdfplumber), parseo de bloques, cadena de texto completa, tabula,
+OCR sobre una copia rasterizada, create_new_excel, append_and_dedup y append_incremental.
+Por etapa: segundos, páginas/s, filas/s y pico de RSS; salida en JSON para comparar corridas.
+Uso:  python benchmarks/bench_e2e.py [--pages 200] [--rows 40] [--noise 0.3] [--workers 1]
+                                     [--ocr-pages 5] [--out run.json] [--baseline anterior.json]
+Las etapas sin dependencias (tabula/Java, poppler/tesseract) se informan como "skipped".
+"""
+from __future__ import annotations
+import argparse, json, os, platform, shutil, sys, tempfile, time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import pdfplumber
+import extractors
+from extractors import rows_from_text, parse_pdf_any, parse_pdf_ocr, parse_pdf_tabula, tabula_available
+from excel_io import append_and_dedup, append_incremental, create_new_excel
+import synth
+from text_backends import pdfplumber_page_text as _page_text
+
+# ===== Memoria =====
+def _reset_peak() -> bool:
+    # Linux: escribir 5 en clear_refs reinicia VmHWM, así el pico es por etapa
+    try:
+        with open("/proc/self/clear_refs", "w") as f: f.write("5")
+        return True
+    except OSError:
+        return False
+
+def _peak_rss_mb() -> float | None:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"): return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss   # KB en Linux, bytes en macOS
+        return round(peak / (2**20 if sys.platform == "darwin" else 1024), 1)
+    except Exception:
+        return None
+
+def stage(name: str, fn: Callable[[], Tuple[int, int]], results: Dict[str, Any]) -> None:
+    """Corre fn() → (páginas, filas) y registra tiempos y pico de memoria de la etapa."""
+    per_stage = _reset_peak()
+    t0 = time.perf_counter()
+    pages, rows = fn()
+    dt = time.perf_counter() - t0
+    results[name] = {"seconds": round(dt, 4), "pages": pages, "rows": rows,
+                     "pages_per_s": round(pages / dt, 1) if pages and dt else None,
+                     "rows_per_s": round(rows / dt, 1) if rows and dt else None,
+                     "peak_rss_mb": _peak_rss_mb(), "peak_is_per_stage": per_stage}
+    print(f"{name:>20}: {dt:8.3f}s  páginas={pages}  filas={rows}", file=sys.stderr)
+
+def skipped(name: str, reason: str, results: Dict[str, Any]) -> None:
+    results[name] = {"skipped": reason}
+    print(f"{name:>20}: omitida ({reason})", file=sys.stderr)
+
+def ocr_ready() -> str | None:
+    if not extractors._load_ocr(): return "pdf2image/pytesseract no instalados"
+    if not shutil.which("pdftoppm"): return "poppler (pdftoppm) no encontrado"
+    if not shutil.which("tesseract"): return "tesseract no encontrado"
+    return None
+
+def run(args: argparse.Namespace, work: Path) -> Dict[str, Any]:
+    pdf = work / "reporte.pdf"
+    truth = synth.make_report(pdf, args.pages, args.rows, args.noise, args.seed)
+    results: Dict[str, Any] = {}
+    texts: List[str] = []
+    parsed: List[Dict[str, Any]] = []
+
+    def text_extract():
+        with pdfplumber.open(str(pdf)) as doc:
+            texts.extend(_page_text(p) for p in doc.pages)
+        return len(texts), 0
+    stage("text_extract", text_extract, results)
+
+    def block_parse():
+        for t in texts: parsed.extend(rows_from_text(t))
+        return len(texts), len(parsed)
+    stage("block_parse", block_parse, results)
+    results["block_parse"].update(synth.score(parsed, truth))
+
+    def text_pipeline():
+        rows, by_page, _ = parse_pdf_any(pdf, workers=args.workers)
+        return len(by_page), len(rows)
+    stage("text_pipeline", text_pipeline, results)
+
+    if tabula_available():
+        def tab():
+            rows, _ = parse_pdf_tabula(pdf)
+            return args.pages, len(rows)
+        stage("tabula", tab, results)
+    else:
+        skipped("tabula", "tabula-py no instalado", results)
+
+    reason = ocr_ready() if args.ocr_pages > 0 else "--ocr-pages 0"
+    if reason is None:
+        raster = work / "reporte.raster.pdf"
+        n = min(args.ocr_pages, args.pages)
+        synth.rasterize(pdf, raster)
+        def ocr():
+            rows, by_page = parse_pdf_ocr(raster, pages=range(n), workers=args.workers)
+            return n, len(rows)
+        stage("ocr", ocr, results)
+    else:
+        skipped("ocr", reason, results)
+
+    book = work / "base.xlsx"
+    stage("create_new_excel", lambda: (0, len(parsed)) if create_new_excel(book, parsed) else (0, 0), results)
+
+    # mitad filas repetidas (se descartan), mitad nuevas de otro reporte
+    extra = work / "extra.pdf"
+    synth.make_report(extra, max(1, args.pages // 2), args.rows, args.noise, args.seed + 1)
+    incoming = parsed[: len(parsed) // 2] + parse_pdf_any(extra)[0]
+    inc_book = work / "inc.xlsx"; shutil.copyfile(book, inc_book)
+    stage("append_and_dedup", lambda: (0, len(incoming)) if append_and_dedup(book, incoming) else (0, 0), results)
+    stage("append_incremental", lambda: (0, len(incoming)) if append_incremental(inc_book, incoming) else (0, 0), results)
+    return results
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    for name, cur in current["stages"].items():
+        old = baseline.get("stages", {}).get(name, {})
+        if "seconds" in cur and old.get("seconds"):
+            print(f"{name:>20}: {old['seconds']:.3f}s → {cur['seconds']:.3f}s  (x{old['seconds'] / cur['seconds']:.2f})",
+                  file=sys.stderr)
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--pages", type=int, default=200)
+    ap.add_argument("--rows", type=int, default=40, help="Filas por página")
+    ap.add_argument("--noise", type=float, default=0.3)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--ocr-pages", type=int, default=5, help="Páginas de la copia rasterizada que pasan por OCR")
+    ap.add_argument("--out", help="Guardar el JSON en este archivo")
+    ap.add_argument("--baseline", help="JSON de una corrida anterior para comparar tiempos")
+    ap.add_argument("--keep", action="store_true", help="No borrar la carpeta de trabajo")
+    args = ap.parse_args()
+    work = Path(tempfile.mkdtemp(prefix="pdf2excel-bench-"))
+    try:
+        stages = run(args, work)
+    finally:
+        if args.keep: print(f"Archivos en {work}", file=sys.stderr)
+        else: shutil.rmtree(work, ignore_errors=True)
+    report = {"config": {k: v for k, v in vars(args).items() if k not in ("out", "baseline", "keep")},
+              "parser_version": extractors.PARSER_VERSION, "python": platform.python_version(),
+              "cpus": os.cpu_count(), "stages": stages}
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if args.out: Path(args.out).write_text(text, encoding="utf-8")
+    if args.baseline: compare(report, json.loads(Path(args.baseline).read_text(encoding="utf-8")))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+bench_journal.py — Costo del diario de páginas (journal.py) y prueba de reanudación.
+Genera un reporte sintético (benchmarks/synth.py) y:
+- mide iter_rows sin y con diario (sin caché, mejor de --repeat corridas) y el tiempo dentro de las
+  escrituras del diario (la diferencia de pared entre corridas suele quedar bajo el ruido),
+- corre `pdf2excel create` en un subproceso, lo mata (SIGKILL) tras --kill-after páginas anotadas,
+  lo reanuda con --resume y compara 'Datos' con una corrida sin cortes.
+Uso:  python benchmarks/bench_journal.py [--pages 200] [--rows 40] [--kill-after 120] [--workers 1] [--out run.json]
+"""
+from __future__ import annotations
+import argparse, json, logging, os, shutil, signal, subprocess, sys, tempfile, time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from excel_io import read_datos
+from journal import PageJournal, journal_path
+import pdf2excel
+import synth
+
+class TimedJournal(PageJournal):
+    seconds = 0.0
+
+    def record(self, *args: Any, **kw: Any) -> None:
+        t0 = time.perf_counter(); super().record(*args, **kw); self.seconds += time.perf_counter() - t0
+
+    def finish(self, key: str) -> None:
+        t0 = time.perf_counter(); super().finish(key); self.seconds += time.perf_counter() - t0
+
+def extract_seconds(pdf: Path, workers: int, backend: str, journal: Optional[PageJournal]) -> float:
+    t0 = time.perf_counter()
+    for _ in pdf2excel.iter_rows([str(pdf)], False, workers, None, backend=backend, journal=journal): pass
+    return time.perf_counter() - t0
+
+def cli(*args: str) -> list:
+    return [sys.executable, str(ROOT / "pdf2excel.py"), "create", *args, "--no-cache", "--no-server"]
+
+def crash_and_resume(pdf: Path, work: Path, workers: int, backend: str, kill_after: int) -> Dict[str, Any]:
+    common = ["--workers", str(workers), "--text-backend", backend]
+    ref, out = work / "ref.xlsx", work / "res.xlsx"
+    subprocess.run(cli("--pdf", str(pdf), "--out", str(ref), "--no-journal", *common), check=True, capture_output=True)
+    proc = subprocess.Popen(cli("--pdf", str(pdf), "--out", str(out), *common), stderr=subprocess.DEVNULL)
+    jpath = journal_path(out); lines = 0
+    while proc.poll() is None and lines < kill_after:
+        time.sleep(0.01)
+        lines = sum(1 for _ in open(jpath, encoding="utf-8")) if jpath.exists() else 0
+    if proc.poll() is None: proc.send_signal(getattr(signal, "SIGKILL", signal.SIGTERM))
+    proc.wait()
+    t0 = time.perf_counter()
+    subprocess.run(cli("--pdf", str(pdf), "--out", str(out), "--resume", *common), check=True, capture_output=True)
+    return {"journal_lines_at_kill": lines, "resume_s": round(time.perf_counter() - t0, 3),
+            "same_datos": bool(read_datos(ref).equals(read_datos(out))), "journal_left": jpath.exists()}
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--pages", type=int, default=200)
+    ap.add_argument("--rows", type=int, default=40, help="Filas por página")
+    ap.add_argument("--kill-after", type=int, default=120, help="Líneas del diario antes de matar la corrida")
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--text-backend", default="pdfminer", help="El más rápido deja ver mejor el costo relativo del diario")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--out", help="Guardar el JSON en este archivo")
+    args = ap.parse_args()
+    logging.disable(logging.INFO)
+    work = Path(tempfile.mkdtemp(prefix="pdf2excel-journal-"))
+    try:
+        pdf = work / "r.pdf"; synth.make_report(pdf, args.pages, args.rows, 0.3, 0)
+        extract_seconds(pdf, args.workers, args.text_backend, None)   # calentamiento (imports, caché del SO)
+        off = on = float("inf"); size = 0; writes = []
+        for i in range(args.repeat):
+            off = min(off, extract_seconds(pdf, args.workers, args.text_backend, None))
+            journal = TimedJournal(work / f"j{i}.xlsx")
+            t = extract_seconds(pdf, args.workers, args.text_backend, journal); on = min(on, t)
+            writes.append(journal.seconds / t)
+            journal.close(); size = os.path.getsize(journal.path); journal.discard()
+        report: Dict[str, Any] = {"pages": args.pages, "rows": args.pages * args.rows, "backend": args.text_backend,
+                                  "extract_s": {"no_journal": round(off, 3), "journal": round(on, 3)},
+                                  "wall_overhead": round(on / off - 1, 4), "journal_write_share": round(max(writes), 4),
+                                  "journal_mb": round(size / 2**20, 2)}
+        report["resume"] = crash_and_resume(pdf, work, args.workers, args.text_backend, args.kill_after)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out: Path(args.out).write_text(text, encoding="utf-8")
+    sys.exit(0 if report["resume"]["same_datos"] else 1)
+
+if __name__ == "__main__":
+    main()
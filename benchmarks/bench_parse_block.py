@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+bench_parse_block.py — Corpus dorado + micro-benchmark de extractors._parse_block.
+Compara la implementación actual con la de referencia (heurísticas por ventana con regex,
+copiadas abajo tal cual) sobre bloques realistas con ruido y tokens aleatorios.
+Uso:  python benchmarks/bench_parse_block.py [--blocks 20000] [--fuzz 200000]
+"""
+from __future__ import annotations
+import argparse, json, random, re, sys, time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import extractors
+from extractors import TRIPLE_PIPE_RE, PAIR_RE, PCT_RE
+from schema import as_row
+
+# ===== Referencia (implementación previa, sin cambios) =====
+def normalize_space(s: str) -> str:
+    return re.sub(r"\s+", " ", s).strip()
+
+def _tokens(s: str) -> List[str]:
+    return normalize_space(s.replace("\n", " ")).split(" ")
+
+def _ref_take_machine(tokens: List[str]) -> Tuple[int | None, int]:
+    for i, t in enumerate(tokens[:5]):
+        if t.isdigit() and 1 <= len(t) <= 3:
+            return int(t), i + 1
+    return None, 0
+
+def _ref_reconstruct_plate(tokens: List[str], start: int) -> Tuple[str | None, int]:
+    limit = min(len(tokens), start + 12)
+    for k in range(start, len(tokens)):
+        if re.fullmatch(r"\d{10,}", tokens[k] or ""):
+            limit = min(limit, k)
+            break
+    def cj(seq): return re.sub(r"[^A-Za-z0-9]", "", " ".join(seq)).upper()
+    for i in range(start, limit):
+        for j in range(i, min(i + 6, limit)):
+            cand = cj(tokens[i:j + 1])
+            m = re.search(r"[A-Z]{4}\d{2}\b", cand)
+            if m: return m.group(0), j + 1
+    for i in range(start, limit):
+        for j in range(i, min(i + 6, limit)):
+            cand = cj(tokens[i:j + 1])
+            m5 = re.search(r"([A-Z]{4}\d)\b$", cand)
+            if m5 and j + 1 < limit and re.fullmatch(r"\d\b", tokens[j + 1] or ""):
+                return (m5.group(1) + tokens[j + 1]).upper(), j + 2
+    return None, start
+
+def _ref_take_folio(tokens: List[str], start: int) -> Tuple[str | None, int]:
+    digs = ""
+    i = start
+    while i < len(tokens) and re.fullmatch(r"\d{1,}", tokens[i] or ""):
+        digs += tokens[i]
+        if 12 <= len(digs) <= 14: return digs, i + 1
+        if len(digs) > 14: break
+        i += 1
+    for j in range(start, min(start + 8, len(tokens))):
+        if re.fullmatch(r"\d{12,16}", tokens[j] or ""):
+            cand = re.sub(r"\D+", "", tokens[j])
+            if 12 <= len(cand) <= 14: return cand, j + 1
+    return None, start
+
+def _ref_take_variant_freq(tokens: List[str], start: int) -> Tuple[int | None, int | None, int]:
+    var = freq = None; i = start
+    for k in range(i, min(i + 6, len(tokens))):
+        if re.fullmatch(r"\d{3}", tokens[k] or ""):
+            var = int(tokens[k]); i = k + 1; break
+    for k in range(i, min(i + 6, len(tokens))):
+        if re.fullmatch(r"\d{1,3}", tokens[k] or ""):
+            freq = int(tokens[k]); i = k + 1; break
+    return var, freq, i
+
+def reference_parse_block(block: str, fecha: str, hora: str | None) -> Dict[str, Any] | None:
+    b = re.sub(r"(\d)\s*\n\s*(\d)", r"\1\2", block)
+    b = normalize_space(b)
+    tokens = _tokens(b)
+
+    maquina, pos = _ref_take_machine(tokens)
+    patente, pos = _ref_reconstruct_plate(tokens, pos)
+    folio, pos = _ref_take_folio(tokens, pos)
+    variante, frecuencia, pos = _ref_take_variant_freq(tokens, pos)
+
+    rest_text = " ".join(tokens[pos:]).strip()
+    ab = sd = ci = None
+    conductor = None
+    m_tri_rest = TRIPLE_PIPE_RE.search(rest_text)
+    if m_tri_rest:
+        conductor = normalize_space(rest_text[:m_tri_rest.start()]) or None
+        try: ab, sd, ci = map(int, m_tri_rest.groups())
+        except Exception: pass
+        after_triple = rest_text[m_tri_rest.end():]
+    else:
+        conductor = normalize_space(rest_text) or None
+        after_triple = ""
+
+    pct = ev = te = None
+    search_zone = after_triple if after_triple else rest_text
+    m_pct = PCT_RE.search(search_zone)
+    zone = search_zone[m_pct.end():] if m_pct else search_zone
+    if m_pct:
+        try: pct = float(m_pct.group(1).replace(",", "."))
+        except Exception: pct = None
+    m_pair = PAIR_RE.search(zone)
+    if m_pair:
+        try: ev = int(m_pair.group(1))
+        except Exception: ev = None
+        try: te = int(m_pair.group(2))
+        except Exception: te = None
+
+    row = {
+        "Fecha": fecha, "Hora": hora, "Máquina": maquina,
+        "Patente": patente, "Folio": folio,
+        "Variante": variante, "Frecuencia": frecuencia,
+        "Conductor": conductor, "AB": ab, "SD": sd, "CI": ci, "%": pct, "EV": ev, "TE": te,
+    }
+    if not row["Folio"] or not row["Fecha"]: return None
+    return row
+
+# ===== Corpus =====
+LETTERS = "BCDFGHJKLPRSTVWXYZ"
+DRIVERS = ["JUAN PEREZ", "MARIA SOTO", "PEDRO ROJAS", "ANA MUÑOZ"]
+
+def realistic_block(rnd: random.Random) -> str:
+    """Cola de fila tras Fecha/Hora con los casos de ruido que vemos en los reportes."""
+    plate = "".join(rnd.choice(LETTERS) for _ in range(4)) + f"{rnd.randint(0, 99):02d}"
+    folio = "".join(str(rnd.randint(0, 9)) for _ in range(rnd.choice([12, 13, 14])))
+    r = rnd.random()
+    if r < 0.10: plate_s = f"{plate[:5]} / {plate[5]}"       # placa partida "DTCB6 / 6"
+    elif r < 0.20: plate_s = f"{plate[:5]}\n{plate[5]}"      # dígito final en otra línea
+    elif r < 0.25: plate_s = f"{plate[:2]} {plate[2:]}"
+    elif r < 0.30: plate_s = plate.lower()
+    else: plate_s = plate
+    r = rnd.random()
+    if r < 0.10: folio_s = f"{folio[:7]}\n{folio[7:]}"      # folio envuelto
+    elif r < 0.15: folio_s = f"{folio[:6]} {folio[6:]}"
+    else: folio_s = folio
+    parts = [str(rnd.randint(1, 300)), plate_s, folio_s, str(rnd.randint(100, 999)), str(rnd.randint(1, 60)),
+             rnd.choice(DRIVERS), f"{rnd.randint(0, 99)} | {rnd.randint(0, 99)} | {rnd.randint(0, 99)}",
+             f"{rnd.randint(0, 100)},{rnd.randint(0, 9)}%", f"{rnd.randint(0, 9)} | {rnd.randint(0, 9)}"]
+    if rnd.random() < 0.1: del parts[rnd.randrange(len(parts))]
+    return " " + " ".join(parts) + "\n"
+
+FUZZ_TOKENS = ["|", "%", "/", "-", "", "12,5%", "ABCD", "abcd", "AB12", "DTCB6", "6", "66", "١٢٣",
+               "²", "123", "0", "1234567890", "12345678901234", "XY-Z1", "Ñ", "AB.CD", "12|3", "99%"]
+
+def fuzz_block(rnd: random.Random) -> str:
+    toks = []
+    for _ in range(rnd.randint(0, 18)):
+        r = rnd.random()
+        if r < 0.4: toks.append(rnd.choice(FUZZ_TOKENS))
+        elif r < 0.7: toks.append(str(rnd.randint(0, 10 ** rnd.randint(1, 15))))
+        else: toks.append("".join(rnd.choice(LETTERS + LETTERS.lower() + "0123456789") for _ in range(rnd.randint(1, 6))))
+    return "".join(t + rnd.choice([" ", " ", "\n", "  "]) for t in toks)
+
+def safe(fn, block: str) -> Any:
+    """Resultado comparable: _parse_block devuelve Row y la referencia un dict; los dos pasan a dict."""
+    try: r = fn(block, "01-01-2024", "00:00:00")
+    except Exception as e: return ("error", type(e).__name__)
+    return as_row(r).as_dict() if r is not None else None
+
+def bench(fn, blocks: List[str]) -> float:
+    t0 = time.perf_counter()
+    for b in blocks: fn(b, "01-01-2024", "00:00:00")
+    return len(blocks) / (time.perf_counter() - t0)
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--blocks", type=int, default=20000)
+    ap.add_argument("--fuzz", type=int, default=200000)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    rnd = random.Random(args.seed)
+    golden = [realistic_block(rnd) for _ in range(args.blocks)]
+    fuzz = [fuzz_block(rnd) for _ in range(args.fuzz)]
+    mismatches = [b for b in golden + fuzz if safe(reference_parse_block, b) != safe(extractors._parse_block, b)]
+    for b in mismatches[:5]: print("DIFERENCIA:", repr(b), file=sys.stderr)
+    before = bench(reference_parse_block, golden)
+    after = bench(extractors._parse_block, golden)
+    print(json.dumps({"golden_blocks": len(golden), "fuzz_blocks": len(fuzz), "mismatches": len(mismatches),
+                      "blocks_per_s_before": round(before), "blocks_per_s_after": round(after),
+                      "speedup": round(after / before, 2)}))
+    if mismatches: raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+bench_rows.py — Memoria y tiempo de conversión a DataFrame: filas como dict (14 claves) vs schema.Row.
+Las filas salen de _parse_block sobre un reporte sintético (benchmarks/synth.py) y se replican con
+folios distintos hasta --rows. Mide:
+- memoria de la lista de filas (tracemalloc, solo los contenedores: los valores se comparten),
+- pd.DataFrame(filas, columns=ROW_SCHEMA) y excel_io.iter_frames (lotes tipados) sobre todas las filas.
+Uso:  python benchmarks/bench_rows.py [--rows 500000] [--out run.json]
+"""
+from __future__ import annotations
+import argparse, gc, json, sys, tempfile, time, tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import pandas as pd
+from extractors import parse_pdf_text
+from excel_io import iter_frames
+from schema import ROW_SCHEMA, Row
+import synth
+
+def sample_rows(n: int) -> List[Row]:
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = Path(tmp) / "r.pdf"
+        synth.make_report(pdf, 5, 40, 0.3, 0)
+        base = parse_pdf_text(pdf)[0]
+    folio = ROW_SCHEMA.index("Folio")
+    return [Row(r[:folio] + (f"{i:013d}",) + r[folio + 1:]) for i, r in
+            ((i, base[i % len(base)]) for i in range(n))]
+
+def measure_alloc(build: Callable[[], Any]) -> tuple:
+    gc.collect(); tracemalloc.start()
+    obj = build()
+    size = tracemalloc.get_traced_memory()[0]; tracemalloc.stop()
+    return obj, size
+
+def timed(fn: Callable[[], Any], repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect(); t0 = time.perf_counter(); fn(); best = min(best, time.perf_counter() - t0)
+    return best
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=500_000)
+    ap.add_argument("--out", help="Guardar el JSON en este archivo")
+    args = ap.parse_args()
+    rows = sample_rows(args.rows)
+    values = [tuple(r) for r in rows]    # los mismos objetos valor para ambas representaciones
+    dicts, dict_bytes = measure_alloc(lambda: [dict(zip(ROW_SCHEMA, v)) for v in values])
+    tuples, row_bytes = measure_alloc(lambda: [Row(v) for v in values])
+    report: Dict[str, Any] = {"rows": args.rows, "memory_mb": {"dict": round(dict_bytes / 2**20, 1),
+                                                               "row": round(row_bytes / 2**20, 1)}}
+    report["memory_mb"]["saving"] = round(1 - row_bytes / dict_bytes, 3)
+    report["dataframe_s"] = {"dict": round(timed(lambda: pd.DataFrame(dicts, columns=ROW_SCHEMA)), 3),
+                             "row": round(timed(lambda: pd.DataFrame(tuples, columns=ROW_SCHEMA)), 3)}
+    report["iter_frames_s"] = {"dict": round(timed(lambda: sum(len(df) for df in iter_frames(dicts)), 1), 3),
+                               "row": round(timed(lambda: sum(len(df) for df in iter_frames(tuples)), 1), 3)}
+    same = pd.DataFrame(dicts[:5000], columns=ROW_SCHEMA).equals(pd.DataFrame(tuples[:5000], columns=ROW_SCHEMA))
+    report["same_frame"] = bool(same)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out: Path(args.out).write_text(text, encoding="utf-8")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+bench_serve.py — Corridas cortas de `pdf2excel create` con y sin servidor en caliente (pdf2excel serve).
+Genera un reporte sintético chico (synth.py), levanta el servidor en un subproceso (caché en una carpeta
+temporal) y mide la pared de --calls corridas `create` por la CLI: mandadas al servidor y con --no-server.
+Sin caché (--no-cache) para que cada corrida extraiga de verdad. Falla (código 1) si el libro escrito por
+el servidor no es igual al local.
+Uso:  python benchmarks/bench_serve.py [--pages 2] [--rows 40] [--calls 10] [--workers 1] [--out run.json]
+"""
+from __future__ import annotations
+import argparse, json, os, shutil, statistics, subprocess, sys, tempfile, time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from excel_io import read_datos
+import synth
+
+def timed_calls(cmd: List[str], n: int, env: Dict[str, str]) -> List[float]:
+    times = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        subprocess.run(cmd, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - t0)
+    return times
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--pages", type=int, default=2)
+    ap.add_argument("--rows", type=int, default=40, help="Filas por página")
+    ap.add_argument("--calls", type=int, default=10, help="Corridas por modo")
+    ap.add_argument("--workers", type=int, default=1, help="--workers de cada corrida (el pool del servidor es de 2)")
+    ap.add_argument("--out", help="Guardar el JSON en este archivo")
+    args = ap.parse_args()
+    work = Path(tempfile.mkdtemp(prefix="pdf2excel-serve-"))
+    env = {**os.environ, "PDF2EXCEL_CACHE_DIR": str(work / "cache")}
+    cli = [sys.executable, str(ROOT / "pdf2excel.py")]
+    server = subprocess.Popen([*cli, "serve", "--workers", "2"], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        pdf = work / "r.pdf"; synth.make_report(pdf, args.pages, args.rows, 0.3, 0)
+        t0 = time.perf_counter()
+        while not (work / "cache" / "server.json").exists():
+            if server.poll() is not None or time.perf_counter() - t0 > 60: raise SystemExit("El servidor no arrancó.")
+            time.sleep(0.05)
+        report: Dict[str, Any] = {"pages": args.pages, "rows": args.pages * args.rows, "calls": args.calls,
+                                  "server_ready_s": round(time.perf_counter() - t0, 2)}
+        base = ["create", "--pdf", str(pdf), "--no-cache", "--no-journal", "--workers", str(args.workers)]
+        for mode, extra in (("server", []), ("local", ["--no-server"])):
+            times = timed_calls([*cli, *base, "--out", str(work / f"{mode}.xlsx"), *extra], args.calls, env)
+            report[mode] = {"median_s": round(statistics.median(times), 3), "min_s": round(min(times), 3),
+                            "total_s": round(sum(times), 2)}
+            print(f"{mode:>6}: mediana {report[mode]['median_s']:.3f}s | mín {report[mode]['min_s']:.3f}s | total {report[mode]['total_s']:.2f}s")
+        report["speedup"] = round(report["local"]["total_s"] / report["server"]["total_s"], 2)
+        report["same_rows"] = read_datos(work / "server.xlsx").equals(read_datos(work / "local.xlsx"))
+        print(f"speedup x{report['speedup']} | mismas filas: {report['same_rows']}")
+        subprocess.run([*cli, "serve", "--stop"], env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        server.wait(30)
+    finally:
+        if server.poll() is None: server.kill()
+        shutil.rmtree(work, ignore_errors=True)
+    text = json.dumps(report, indent=2)
+    if args.out: Path(args.out).write_text(text, encoding="utf-8")
+    sys.exit(0 if report["same_rows"] else 1)
+
+if __name__ == "__main__":
+    main()
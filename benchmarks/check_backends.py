@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+check_backends.py — Conformidad de los motores de texto (text_backends.TEXT_BACKENDS).
+Genera el corpus del benchmark (benchmarks/synth.py, varias semillas y niveles de ruido) y compara,
+PDF por PDF, el texto de cada página y las filas parseadas de cada motor contra pdfplumber.
+También acepta PDF propios. Sale con código 1 si algún motor difiere.
+Uso:  python benchmarks/check_backends.py [--pages 30] [--rows 40] [--seeds 3] [--workers 1] [otros.pdf ...]
+"""
+from __future__ import annotations
+import argparse, shutil, sys, tempfile, time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from extractors import parse_pdf_text
+from text_backends import DEFAULT_TEXT_BACKEND, TEXT_BACKENDS, open_text_backend
+import synth
+
+def page_texts(pdf: Path, backend: str) -> List[str]:
+    doc = open_text_backend(pdf, backend)
+    try: return [doc.page_text(i) for i in range(doc.n_pages)]
+    finally: doc.close()
+
+def check(pdf: Path, workers: int, seconds: Dict[str, float]) -> List[str]:
+    """Diferencias de cada motor contra el por defecto (vacía si todos coinciden)."""
+    ref_text = page_texts(pdf, DEFAULT_TEXT_BACKEND)
+    t0 = time.perf_counter(); ref_rows = parse_pdf_text(pdf, workers, backend=DEFAULT_TEXT_BACKEND)
+    seconds[DEFAULT_TEXT_BACKEND] += time.perf_counter() - t0
+    problems = []
+    for name in TEXT_BACKENDS:
+        if name == DEFAULT_TEXT_BACKEND: continue
+        text = page_texts(pdf, name)
+        bad = [i + 1 for i, (a, b) in enumerate(zip(ref_text, text)) if a != b]
+        if len(text) != len(ref_text): problems.append(f"{pdf.name} [{name}]: {len(text)} páginas vs {len(ref_text)}")
+        if bad: problems.append(f"{pdf.name} [{name}]: texto distinto en páginas {bad[:10]}")
+        t0 = time.perf_counter(); rows = parse_pdf_text(pdf, workers, backend=name)
+        seconds[name] += time.perf_counter() - t0
+        if rows != ref_rows: problems.append(f"{pdf.name} [{name}]: filas/by_page distintas ({len(rows[0])} vs {len(ref_rows[0])})")
+    return problems
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("pdf", nargs="*", help="PDF adicionales a comparar")
+    ap.add_argument("--pages", type=int, default=30)
+    ap.add_argument("--rows", type=int, default=40, help="Filas por página")
+    ap.add_argument("--seeds", type=int, default=3, help="Reportes sintéticos por nivel de ruido")
+    ap.add_argument("--workers", type=int, default=1)
+    args = ap.parse_args()
+    work = Path(tempfile.mkdtemp(prefix="pdf2excel-backends-"))
+    try:
+        corpus = [Path(p) for p in args.pdf]
+        for noise in (0.0, 0.3, 0.9):
+            for seed in range(args.seeds):
+                pdf = work / f"synth-n{noise}-s{seed}.pdf"
+                synth.make_report(pdf, args.pages, args.rows, noise, seed); corpus.append(pdf)
+        seconds = {name: 0.0 for name in TEXT_BACKENDS}; problems: List[str] = []
+        for pdf in corpus: problems.extend(check(pdf, args.workers, seconds))
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    base = seconds[DEFAULT_TEXT_BACKEND]
+    for name, s in seconds.items():
+        print(f"{name:>12}: {s:8.3f}s  (x{base / s:.2f} vs {DEFAULT_TEXT_BACKEND})" if s else f"{name:>12}: -")
+    for p in problems: print("DIFERENCIA:", p)
+    print(f"{len(corpus)} PDF: " + ("todos los motores coinciden" if not problems else f"{len(problems)} diferencias"))
+    sys.exit(1 if problems else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+check_layout.py — Motor de columnas (layout.py) contra el de texto.
+Genera reportes sintéticos en columnas (synth.py --columns: patentes partidas, dígitos y folios que
+saltan a la línea siguiente) y planos, y por cada uno compara los motores text y columns:
+- recall / patentes correctas contra la verdad del generador (synth.score),
+- tiempo de extracción por página y de parseo puro (filas/s: Template.rows vs rows_from_text),
+- control cruzado de la plantilla (filas iguales al parser de texto).
+Falla (código 1) si en columnas el motor columns rinde menos que text o no usa plantilla, o si en un
+reporte plano acepta una plantilla o da filas distintas a text.
+Uso:  python benchmarks/check_layout.py [--pages 20] [--rows 40] [--seeds 2] [--workers 1]
+"""
+from __future__ import annotations
+import argparse, logging, os, shutil, sys, tempfile, time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from extractors import ExtractionSession, rows_from_text, collect_batches
+from layout import cross_check
+import synth
+
+def extract(pdf: Path, engine: str, workers: int) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    with ExtractionSession(pdf, workers=workers, engine=engine) as session:
+        rows, by_page, _ = collect_batches(session.iter_batches())
+        template = session.template
+    return {"rows": rows, "seconds": time.perf_counter() - t0, "template": template, "pages": len(by_page)}
+
+def parse_rate(pdf: Path, template: Any) -> Dict[str, float]:
+    """Filas/s del parseo solo (texto y palabras ya extraídos)."""
+    with ExtractionSession(pdf) as session:
+        doc = session.doc
+        texts = [doc.page_text(i) for i in range(doc.n_pages)]
+        words = [doc.page_words(i) for i in range(doc.n_pages)]
+    t0 = time.perf_counter(); n_text = sum(len(rows_from_text(t)) for t in texts); t_text = time.perf_counter() - t0
+    t0 = time.perf_counter(); n_cols = sum(len(template.rows(w)) for w in words); t_cols = time.perf_counter() - t0
+    agree = total = 0
+    for t, w in zip(texts, words):
+        a, n = cross_check(rows_from_text(t), template.scan(w)); agree += a; total += n
+    return {"text_rows_s": round(n_text / t_text), "columns_rows_s": round(n_cols / t_cols),
+            "agreement": round(agree / max(total, 1), 4), "checked": total}
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--pages", type=int, default=20)
+    ap.add_argument("--rows", type=int, default=40, help="Filas por página")
+    ap.add_argument("--seeds", type=int, default=2, help="Reportes sintéticos por nivel de ruido")
+    ap.add_argument("--workers", type=int, default=1)
+    args = ap.parse_args()
+    logging.disable(logging.INFO)
+    work = Path(tempfile.mkdtemp(prefix="pdf2excel-layout-"))
+    os.environ["PDF2EXCEL_CACHE_DIR"] = str(work / "cache")   # plantillas: no tocar la caché del usuario
+    problems: List[str] = []
+    try:
+        for columns in (True, False):
+            for noise in (0.0, 0.3, 0.9):
+                for seed in range(args.seeds):
+                    name = f"{'col' if columns else 'plano'}-n{noise}-s{seed}"; pdf = work / f"{name}.pdf"
+                    truth = synth.make_report(pdf, args.pages, args.rows, noise, seed, columns=columns)
+                    text, cols = extract(pdf, "text", args.workers), extract(pdf, "columns", args.workers)
+                    st, sc = synth.score(text["rows"], truth), synth.score(cols["rows"], truth)
+                    line = (f"{name:>14}: text {st['recall']:.3f}/{st['plate_ok']:.3f} "
+                            f"{1000 * text['seconds'] / text['pages']:5.1f} ms/pág | columns {sc['recall']:.3f}/{sc['plate_ok']:.3f} "
+                            f"{1000 * cols['seconds'] / cols['pages']:5.1f} ms/pág | plantilla={'sí' if cols['template'] else 'no'}")
+                    if cols["template"] is not None: line += f" {parse_rate(pdf, cols['template'])}"
+                    print(line)
+                    if columns and cols["template"] is None: problems.append(f"{name}: sin plantilla")
+                    if columns and (sc["recall"] < st["recall"] or sc["plate_ok"] < st["plate_ok"]):
+                        problems.append(f"{name}: columns rinde menos que text")
+                    if not columns and (cols["template"] is not None or cols["rows"] != text["rows"]):
+                        problems.append(f"{name}: plantilla aceptada o filas distintas en un reporte plano")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    for p in problems: print("PROBLEMA:", p)
+    print("OK" if not problems else f"{len(problems)} problemas")
+    sys.exit(1 if problems else 0)
+
+if __name__ == "__main__":
+    main()
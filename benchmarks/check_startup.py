@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+check_startup.py — Presupuesto de arranque en frío de la CLI y la GUI (python -X importtime).
+En subprocesos nuevos, con la carpeta del proyecto como directorio de trabajo, mide:
+- `pdf2excel --help`: milisegundos de import (suma de 'self' de -X importtime) y de pared, la mejor de --repeat,
+- `import gui` y, si hay pantalla, la primera pintura de la ventana (Tk + App + update),
+- `pdf2excel create` sobre un reporte sintético sin --ocr: qué respaldos opcionales se importaron.
+Falla (código 1) si --help o la GUI pasan su presupuesto o cargan un módulo pesado (pandas, openpyxl,
+pdfplumber, pdfminer, pyarrow, pytesseract, tabula, pdf2image, PIL), o si create sin --ocr importa
+pytesseract / pdf2image, tabula sin páginas para él o pyarrow con un destino Excel (salvo que lo importe
+pandas: pandas 3 lo carga siempre).
+Uso:  python benchmarks/check_startup.py [--help-ms 80] [--gui-ms 100] [--repeat 5] [--out run.json]
+"""
+from __future__ import annotations
+import argparse, json, shutil, subprocess, sys, tempfile, time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import synth
+
+HEAVY = ("pandas", "numpy", "openpyxl", "pdfplumber", "pdfminer", "pyarrow", "pytesseract", "tabula", "pdf2image", "PIL")
+OPTIONAL = ("pytesseract", "pdf2image", "tabula", "pyarrow")
+PAINT_PROBE = ("import tkinter as tk, gui\n"
+               "root = tk.Tk(); gui.App(root); root.update()\n"
+               "root.destroy()\n")
+
+def importtime(args: List[str]) -> Tuple[float, Dict[str, int]]:
+    """(ms de import, {módulo: µs acumulados}) de `python -X importtime <args>`."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode: raise SystemExit(f"Falló {' '.join(args)}:\n{proc.stderr[-2000:]}")
+    total = 0; cumulative: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line: continue
+        own, cum, name = line[len("import time:"):].split("|")
+        total += int(own); cumulative[name.strip()] = int(cum)
+    return total / 1000, cumulative
+
+def wall(args: List[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        best = min(best, time.perf_counter() - t0)
+    return round(1000 * best, 1)
+
+def heavy_loaded(modules: Dict[str, int], names: Tuple[str, ...] = HEAVY) -> List[str]:
+    return sorted({m.split(".")[0] for m in modules} & set(names))
+
+def top(modules: Dict[str, int], n: int = 5) -> List[Tuple[str, float]]:
+    roots = {m: us for m, us in modules.items() if "." not in m}
+    return [(m, round(us / 1000, 1)) for m, us in sorted(roots.items(), key=lambda kv: -kv[1])[:n]]
+
+def pandas_loads_pyarrow() -> bool:
+    probe = "import sys, pandas; sys.exit(0 if 'pyarrow' in sys.modules else 1)"
+    return subprocess.run([sys.executable, "-c", probe], capture_output=True).returncode == 0
+
+def has_display() -> bool:
+    probe = "import tkinter as tk; tk.Tk().destroy()"
+    return subprocess.run([sys.executable, "-c", probe], capture_output=True).returncode == 0
+
+def measure(name: str, args: List[str], budget: float, repeat: int, problems: List[str]) -> Dict[str, Any]:
+    ms, modules = min((importtime(args) for _ in range(repeat)), key=lambda r: r[0])
+    res = {"import_ms": round(ms, 1), "wall_ms": wall(args, repeat), "budget_ms": budget,
+           "heavy": heavy_loaded(modules), "top": top(modules)}
+    print(f"{name:>22}: import {res['import_ms']:6.1f} ms | pared {res['wall_ms']:6.1f} ms | pesados={res['heavy'] or '-'} | {res['top']}")
+    if ms > budget: problems.append(f"{name}: {ms:.1f} ms de import > presupuesto {budget} ms")
+    if res["heavy"]: problems.append(f"{name}: carga {', '.join(res['heavy'])}")
+    return res
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--help-ms", type=float, default=80, help="Presupuesto de import de `pdf2excel --help` (ms)")
+    ap.add_argument("--gui-ms", type=float, default=100, help="Presupuesto de import de la GUI (ms)")
+    ap.add_argument("--repeat", type=int, default=5, help="Corridas para la pared (la mejor)")
+    ap.add_argument("--out", help="Guardar el JSON en este archivo")
+    args = ap.parse_args()
+    problems: List[str] = []; report: Dict[str, Any] = {}
+    report["python_bare"] = {"wall_ms": wall(["-c", "pass"], args.repeat)}
+    print(f"{'python -c pass':>22}: pared {report['python_bare']['wall_ms']:6.1f} ms")
+    report["cli_help"] = measure("pdf2excel --help", ["pdf2excel.py", "--help"], args.help_ms, args.repeat, problems)
+    report["gui_import"] = measure("import gui", ["-c", "import gui"], args.gui_ms, args.repeat, problems)
+    if has_display():
+        report["gui_paint"] = measure("gui primera pintura", ["-c", PAINT_PROBE], args.gui_ms, args.repeat, problems)
+    else:
+        print(f"{'gui primera pintura':>22}: sin pantalla, no se mide")
+    work = Path(tempfile.mkdtemp(prefix="pdf2excel-startup-"))
+    try:
+        pdf = work / "r.pdf"; synth.make_report(pdf, 4, 20, 0.0, 0)
+        cmd = ["pdf2excel.py", "create", "--pdf", str(pdf), "--out", str(work / "r.xlsx"), "--no-cache",
+               "--no-journal", "--no-policy", "--no-server"]
+        ms, modules = importtime(cmd)
+        optional = heavy_loaded(modules, OPTIONAL[:-1] if pandas_loads_pyarrow() else OPTIONAL)
+        report["create"] = {"import_ms": round(ms, 1), "optional": optional, "top": top(modules)}
+        print(f"{'pdf2excel create':>22}: import {ms:6.1f} ms | opcionales={optional or '-'} | {report['create']['top']}")
+        if optional: problems.append(f"create sin --ocr (todas las páginas con filas) importa {', '.join(optional)}")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    for p in problems: print("PROBLEMA:", p)
+    print("OK" if not problems else f"{len(problems)} problemas")
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out: Path(args.out).write_text(text, encoding="utf-8")
+    sys.exit(1 if problems else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+synth.py — Reportes PDF sintéticos con el formato que esperan FECHA_HORA_RE / _parse_block.
+- Una línea por salida: Fecha Hora Máquina Patente Folio Variante Frecuencia Conductor AB | SD | CI %  EV | TE
+- Ruido configurable: placas partidas ("DTCB6 / 6" o dígito en la línea siguiente), folios envueltos en
+  dos líneas y Fecha / Hora en líneas distintas.
+- --columns: cada campo en su columna (x fija, números alineados a la derecha) como los reportes de un
+  generador de informes; ruido: placa partida en la celda, último dígito de la placa o parte del folio
+  en la línea siguiente (misma columna).
+- PDF escrito a mano (Helvetica, sin dependencias); copia rasterizada (solo imagen) para medir OCR.
+Uso:  python benchmarks/synth.py salida.pdf [--pages 50] [--rows 40] [--noise 0.3] [--seed 0] [--columns] [--raster]
+"""
+from __future__ import annotations
+import argparse, random
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple, Union
+
+LETTERS = "BCDFGHJKLPRSTVWXYZ"
+DRIVERS = ["JUAN PEREZ", "MARIA SOTO", "PEDRO ROJAS", "ANA MARIA GONZALEZ", "LUIS ALBERTO MUÑOZ"]
+LINES_PER_PAGE = 90   # 7pt con interlineado 9 en A4
+
+class Truth(NamedTuple):
+    fecha: str
+    hora: str
+    folio: str
+    patente: str
+
+def report_lines(rnd: random.Random, rows: int, noise: float) -> Tuple[List[str], List[Truth]]:
+    """Líneas de texto de una página y las filas que un parser correcto debe recuperar.
+    Cada tipo de ruido se aplica con probabilidad `noise` / 3."""
+    lines = ["REPORTE DE SALIDAS", "Fecha Hora Máq. Patente Folio Var. Frec. Conductor AB | SD | CI % EV | TE"]
+    truth: List[Truth] = []
+    p = noise / 3
+    for _ in range(rows):
+        fecha = f"{rnd.randint(1, 28):02d}-{rnd.randint(1, 12):02d}-2024"
+        hora = f"{rnd.randint(0, 23):02d}:{rnd.randint(0, 59):02d}:{rnd.randint(0, 59):02d}"
+        patente = "".join(rnd.choice(LETTERS) for _ in range(4)) + f"{rnd.randint(0, 99):02d}"
+        folio = "".join(str(rnd.randint(0, 9)) for _ in range(13))
+        head = [fecha, hora]
+        if rnd.random() < p: lines.append(fecha); head = [hora]          # Fecha y Hora en líneas distintas
+        plate = patente
+        if rnd.random() < p: plate = f"{patente[:5]} / {patente[5]}"   # placa partida
+        tail = [str(rnd.randint(100, 999)), str(rnd.randint(1, 60)), rnd.choice(DRIVERS),
+                f"{rnd.randint(0, 99)} | {rnd.randint(0, 99)} | {rnd.randint(0, 99)}",
+                f"{rnd.randint(0, 100)},{rnd.randint(0, 9)}%", f"{rnd.randint(0, 9)} | {rnd.randint(0, 9)}"]
+        row = head + [str(rnd.randint(1, 300)), plate]
+        if rnd.random() < p:                                            # folio envuelto
+            cut = rnd.randint(5, 9)
+            lines.append(" ".join(row + [folio[:cut]])); lines.append(" ".join([folio[cut:]] + tail))
+        else:
+            lines.append(" ".join(row + [folio] + tail))
+        truth.append(Truth(fecha, hora, folio, patente))
+    return lines, truth
+
+# columnas: (x, alineación) en puntos; los números se alinean a la derecha de x
+COLUMNS = {"Fecha": (20, "l"), "Hora": (62, "l"), "Máq.": (112, "r"), "Patente": (120, "l"), "Folio": (172, "l"),
+           "Var.": (245, "r"), "Frec.": (265, "r"), "Conductor": (275, "l"), "AB | SD | CI": (380, "l"),
+           "%": (450, "r"), "EV | TE": (460, "l")}
+# anchos Helvetica (1/1000 em) de los caracteres de las celdas alineadas a la derecha
+_WIDTHS = {**{d: 556 for d in "0123456789"}, ",": 278, "%": 889, " ": 278, "|": 260, ".": 278}
+FONT_SIZE = 7
+Cell = Tuple[float, str]          # (x izquierda, texto)
+Line = Union[str, List[Cell]]     # línea corrida o celdas en columnas
+
+def _cell(column: str, text: str) -> Cell:
+    x, align = COLUMNS[column]
+    if align == "r": x -= sum(_WIDTHS.get(c, 556) for c in text) * FONT_SIZE / 1000
+    return round(x, 2), text
+
+def report_cells(rnd: random.Random, rows: int, noise: float) -> Tuple[List[Line], List[Truth]]:
+    """Como report_lines pero en columnas; cada tipo de ruido con probabilidad `noise` / 3."""
+    lines: List[Line] = ["REPORTE DE SALIDAS", [_cell(c, c) for c in COLUMNS]]
+    truth: List[Truth] = []
+    p = noise / 3
+    for _ in range(rows):
+        fecha = f"{rnd.randint(1, 28):02d}-{rnd.randint(1, 12):02d}-2024"
+        hora = f"{rnd.randint(0, 23):02d}:{rnd.randint(0, 59):02d}:{rnd.randint(0, 59):02d}"
+        patente = "".join(rnd.choice(LETTERS) for _ in range(4)) + f"{rnd.randint(0, 99):02d}"
+        folio = "".join(str(rnd.randint(0, 9)) for _ in range(13))
+        cells = {"Fecha": fecha, "Hora": hora, "Máq.": str(rnd.randint(1, 300)), "Patente": patente, "Folio": folio,
+                 "Var.": str(rnd.randint(100, 999)), "Frec.": str(rnd.randint(1, 60)), "Conductor": rnd.choice(DRIVERS),
+                 "AB | SD | CI": f"{rnd.randint(0, 99)} | {rnd.randint(0, 99)} | {rnd.randint(0, 99)}",
+                 "%": f"{rnd.randint(0, 100)},{rnd.randint(0, 9)}%", "EV | TE": f"{rnd.randint(0, 9)} | {rnd.randint(0, 9)}"}
+        wrapped: Dict[str, str] = {}
+        r = rnd.random()
+        if r < p: cells["Patente"] = f"{patente[:5]} {patente[5]}"                           # partida en la celda
+        elif r < 2 * p: cells["Patente"] = patente[:5]; wrapped["Patente"] = patente[5]       # dígito en la línea siguiente
+        elif r < 3 * p:                                                                       # folio envuelto
+            cut = rnd.randint(5, 9); cells["Folio"] = folio[:cut]; wrapped["Folio"] = folio[cut:]
+        lines.append([_cell(c, t) for c, t in cells.items()])
+        if wrapped: lines.append([_cell(c, t) for c, t in wrapped.items()])
+        truth.append(Truth(fecha, hora, folio, patente))
+    return lines, truth
+
+def _esc(s: str) -> str:
+    return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def _stream(lines: List[Line]) -> str:
+    if all(isinstance(l, str) for l in lines):
+        return "BT /F1 7 Tf 20 815 Td 9 TL\n" + "".join(f"({_esc(l)}) Tj T*\n" for l in lines) + "ET"
+    out = ["BT /F1 7 Tf"]
+    for k, line in enumerate(lines):
+        y = 815 - 9 * k
+        for x, text in ([(20, line)] if isinstance(line, str) else line):
+            out.append(f"1 0 0 1 {x} {y} Tm ({_esc(text)}) Tj")
+    return "\n".join(out + ["ET"])
+
+def write_pdf(path: str | Path, pages: List[List[Line]], producer: str = "") -> None:
+    """PDF mínimo: catálogo, árbol de páginas, Helvetica WinAnsi y un stream de texto por página.
+    Las líneas son texto corrido o celdas (x, texto) en columnas."""
+    kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(len(pages)))
+    objs: List[bytes] = [b"<< /Type /Catalog /Pages 2 0 R >>",
+                         f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode(),
+                         b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"]
+    for i, lines in enumerate(pages):
+        objs.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                    f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>".encode())
+        data = _stream(lines).encode("cp1252")
+        objs.append(b"<< /Length %d >>\nstream\n" % len(data) + data + b"\nendstream")
+    if producer: objs.append(f"<< /Producer ({_esc(producer)}) >>".encode("cp1252"))
+    buf = bytearray(b"%PDF-1.4\n"); offsets = []
+    for i, o in enumerate(objs, 1):
+        offsets.append(len(buf)); buf += b"%d 0 obj\n" % i + o + b"\nendobj\n"
+    xref = len(buf)
+    buf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    for o in offsets: buf += b"%010d 00000 n \n" % o
+    info = b" /Info %d 0 R" % len(objs) if producer else b""
+    buf += b"trailer\n<< /Size %d /Root 1 0 R%s >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, info, xref)
+    Path(path).write_bytes(bytes(buf))
+
+def make_report(path: str | Path, pages: int = 50, rows: int = 40, noise: float = 0.3, seed: int = 0,
+                columns: bool = False) -> List[Truth]:
+    """Escribe el PDF y devuelve las filas esperadas, en orden. columns=True: celdas en columnas
+    (Producer "pdf2excel synth columnas", para la caché de plantillas de layout.py)."""
+    rnd = random.Random(seed)
+    rows = max(1, min(rows, (LINES_PER_PAGE - 2) // 2))   # el peor caso usa 2 líneas por fila
+    page_lines: List[List[Line]] = []; truth: List[Truth] = []
+    for _ in range(pages):
+        lines, t = (report_cells if columns else report_lines)(rnd, rows, noise)
+        page_lines.append(lines); truth.extend(t)
+    write_pdf(path, page_lines, "pdf2excel synth columnas" if columns else "")
+    return truth
+
+def rasterize(src: str | Path, dst: str | Path, dpi: int = 150) -> None:
+    """Copia sin capa de texto (una imagen por página), como un reporte escaneado."""
+    import pdfplumber
+    images = []
+    with pdfplumber.open(str(src)) as pdf:
+        for page in pdf.pages:
+            images.append(page.to_image(resolution=dpi).original.convert("L"))
+            page.close()
+    images[0].save(str(dst), "PDF", resolution=dpi, save_all=True, append_images=images[1:])
+    for img in images: img.close()
+
+def score(rows: List[Dict], truth: List[Truth]) -> Dict[str, float]:
+    """Fracción de filas esperadas recuperadas (Fecha+Hora+Folio) y de patentes correctas."""
+    want = {(t.fecha, t.hora, t.folio): t.patente for t in truth}
+    got = {(r.get("Fecha"), r.get("Hora"), r.get("Folio")): r.get("Patente") for r in rows}
+    hit = [k for k in want if k in got]
+    return {"recall": round(len(hit) / max(len(want), 1), 4),
+            "plate_ok": round(sum(got[k] == want[k] for k in hit) / max(len(hit), 1), 4)}
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("out")
+    ap.add_argument("--pages", type=int, default=50)
+    ap.add_argument("--rows", type=int, default=40, help="Filas por página")
+    ap.add_argument("--noise", type=float, default=0.3, help="Probabilidad total de ruido por fila (0–1)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--columns", action="store_true", help="Campos en columnas (x fija) en vez de líneas corridas")
+    ap.add_argument("--raster", action="store_true", help="Escribir además <out>.raster.pdf (solo imagen)")
+    args = ap.parse_args()
+    truth = make_report(args.out, args.pages, args.rows, args.noise, args.seed, args.columns)
+    print(f"{args.out}: {args.pages} páginas, {len(truth)} filas")
+    if args.raster:
+        dst = Path(args.out).with_suffix(".raster.pdf"); rasterize(args.out, dst); print(dst)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+cache.py — Caché en disco de extracciones PDF → filas
+- Clave: hash SHA-256 del contenido del PDF + PARSER_VERSION + flag OCR (+ motor de texto y motor de filas si no son los por defecto).
+- Guarda filas, by_page y método ganador (text/tabula/ocr).
+- Tamaño acotado con expulsión LRU (el mtime de cada entrada marca el último uso).
+"""
+from __future__ import annotations
+import gzip, hashlib, json, logging, os, tempfile
+from pathlib import Path
+from typing import List, Dict, Any, Tuple, Optional
+from options import DEFAULT_CACHE_MAX_BYTES, DEFAULT_ENGINE, DEFAULT_TEXT_BACKEND
+from schema import Row, as_row
+
+LOGGER = logging.getLogger("cache")
+DEFAULT_MAX_BYTES = DEFAULT_CACHE_MAX_BYTES
+ENTRY_SUFFIX = ".json.gz"
+
+def default_cache_dir() -> Path:
+    env = os.environ.get("PDF2EXCEL_CACHE_DIR")
+    if env: return Path(env)
+    base = os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME") or (Path.home() / ".cache")
+    return Path(base) / "pdf2excel"
+
+def file_digest(path: str | Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def extraction_key(pdf_path: str | Path, use_ocr: bool, backend: str | None = None, engine: str | None = None) -> str:
+    """Contenido del PDF + versión del parser + opciones que cambian las filas (caché y diario de páginas)."""
+    from extractors import PARSER_VERSION   # acá y no arriba: 'cache info', policy y la GUI no cargan pdfplumber
+    # los motores por defecto no agregan sufijo: las entradas ya guardadas siguen valiendo
+    suffix = f"-{backend}" if backend and backend != DEFAULT_TEXT_BACKEND else ""
+    if engine and engine != DEFAULT_ENGINE: suffix += f"-{engine}"
+    return f"{file_digest(pdf_path)}-v{PARSER_VERSION}-{'ocr' if use_ocr else 'noocr'}{suffix}"
+
+class ExtractionCache:
+    def __init__(self, root: str | Path | None = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = Path(root) if root else default_cache_dir()
+        self.max_bytes = max_bytes
+
+    def key(self, pdf_path: str | Path, use_ocr: bool, backend: str | None = None, engine: str | None = None) -> str:
+        return extraction_key(pdf_path, use_ocr, backend, engine)
+
+    def _entry_path(self, key: str) -> Path:
+        return self.root / key[:2] / (key + ENTRY_SUFFIX)
+
+    def _entries(self) -> List[Path]:
+        if not self.root.exists(): return []
+        return [p for p in self.root.glob("*/*" + ENTRY_SUFFIX) if p.is_file()]
+
+    def get(self, key: str) -> Optional[Tuple[List[Row], List[int], str]]:
+        path = self._entry_path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+            os.utime(path)  # marca de uso para LRU
+        except FileNotFoundError:
+            return None
+        except Exception:
+            LOGGER.warning("Entrada de caché ilegible, se ignora: %s", path)
+            return None
+        # filas como listas en orden ROW_SCHEMA (entradas antiguas: dicts)
+        return [as_row(r) for r in data["rows"]], data["by_page"], data["method"]
+
+    def put(self, key: str, rows: List[Row], by_page: List[int], method: str, source: str = "") -> None:
+        path = self._entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"source": source, "rows": rows, "by_page": by_page, "method": method}
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8", compresslevel=1) as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except Exception:
+            Path(tmp).unlink(missing_ok=True); raise
+        self.prune()
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self._entries()
+        return {"root": str(self.root), "entries": len(entries),
+                "bytes": sum(p.stat().st_size for p in entries), "max_bytes": self.max_bytes}
+
+    def prune(self, max_bytes: int | None = None) -> int:
+        """Expulsa las entradas menos usadas hasta quedar bajo max_bytes. Devuelve cuántas borró."""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        entries = [(p, p.stat()) for p in self._entries()]
+        total = sum(st.st_size for _, st in entries)
+        removed = 0
+        for p, st in sorted(entries, key=lambda e: e[1].st_mtime):
+            if total <= limit: break
+            p.unlink(missing_ok=True); total -= st.st_size; removed += 1
+        return removed
+
+    def clear(self) -> int:
+        return self.prune(0)
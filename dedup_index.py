@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+dedup_index.py — Índice persistente de claves DEDUP_KEY junto a cada libro (o almacén CSV/Parquet)
+- SQLite (<libro>.xlsx.dedup.sqlite) con PRIMARY KEY sobre (Folio, Fecha, Máquina).
+- Consulta de filas entrantes en O(filas nuevas).
+- Sello (tamaño + mtime) del libro: si no coincide, el índice está obsoleto y se reconstruye.
+- Las claves nuevas y el sello se confirman en una sola transacción, después de escribir el libro.
+"""
+from __future__ import annotations
+import logging, math, sqlite3
+from pathlib import Path
+from typing import Any, Iterable, List, Set, Tuple
+
+LOGGER = logging.getLogger("dedup_index")
+INDEX_SUFFIX = ".dedup.sqlite"
+
+Key = Tuple[str, str, str]
+
+def index_path(workbook: str | Path) -> Path:
+    workbook = Path(workbook)
+    return workbook.with_name(workbook.name + INDEX_SUFFIX)
+
+def workbook_stamp(workbook: str | Path) -> str:
+    workbook = Path(workbook)
+    if workbook.is_dir():
+        # almacén particionado (Parquet): cantidad, tamaño total y último mtime de sus archivos
+        sts = [p.stat() for p in workbook.rglob("*") if p.is_file()]
+        return f"{len(sts)}:{sum(s.st_size for s in sts)}:{max((s.st_mtime_ns for s in sts), default=0)}"
+    st = workbook.stat()
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+def _norm(v: Any) -> str:
+    # mismos valores leídos del Excel o recién tipados deben dar la misma clave
+    if v is None: return ""
+    if isinstance(v, float):
+        if math.isnan(v): return ""
+        if v.is_integer(): return str(int(v))
+    return str(v).strip()
+
+def norm_key(key: Iterable[Any]) -> Key:
+    a, b, c = (_norm(v) for v in key)
+    return a, b, c
+
+class DedupIndex:
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(str(self.path), isolation_level=None)
+        self.conn.executescript(
+            "CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT);"
+            "CREATE TABLE IF NOT EXISTS keys (folio TEXT, fecha TEXT, maquina TEXT,"
+            " PRIMARY KEY (folio, fecha, maquina)) WITHOUT ROWID;"
+        )
+
+    @classmethod
+    def for_workbook(cls, workbook: str | Path) -> "DedupIndex":
+        return cls(index_path(workbook))
+
+    def __enter__(self) -> "DedupIndex": return self
+    def __exit__(self, *exc) -> None: self.close()
+
+    def close(self) -> None:
+        if self.conn.in_transaction: self.conn.execute("ROLLBACK")
+        self.conn.close()
+
+    def stamp(self) -> str | None:
+        row = self.conn.execute("SELECT v FROM meta WHERE k = 'stamp'").fetchone()
+        return row[0] if row else None
+
+    def is_fresh(self, workbook: str | Path) -> bool:
+        return Path(workbook).exists() and self.stamp() == workbook_stamp(workbook)
+
+    def rebuild(self, keys: Iterable[Iterable[Any]], workbook: str | Path) -> int:
+        """Reemplaza todo el índice por las claves dadas (leídas de `workbook`) y lo sella."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute("DELETE FROM keys")
+            self.conn.executemany("INSERT OR IGNORE INTO keys VALUES (?, ?, ?)", (norm_key(k) for k in keys))
+            self._set_stamp(workbook)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK"); raise
+        n = self.conn.execute("SELECT COUNT(*) FROM keys").fetchone()[0]
+        LOGGER.info("Índice de duplicados reconstruido: %s claves (%s)", n, self.path)
+        return n
+
+    def existing(self, keys: Iterable[Iterable[Any]]) -> Set[Key]:
+        """Subconjunto (normalizado) de `keys` que ya está en el índice."""
+        q = "SELECT 1 FROM keys WHERE folio = ? AND fecha = ? AND maquina = ?"
+        found: Set[Key] = set()
+        for k in keys:
+            nk = norm_key(k)
+            if self.conn.execute(q, nk).fetchone(): found.add(nk)
+        return found
+
+    def begin_add(self, keys: List[Iterable[Any]]) -> None:
+        """Inserta claves sin confirmar; confirmar con commit(workbook) tras escribir el libro."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.executemany("INSERT OR IGNORE INTO keys VALUES (?, ?, ?)", (norm_key(k) for k in keys))
+
+    def commit(self, workbook: str | Path) -> None:
+        if not self.conn.in_transaction: self.conn.execute("BEGIN IMMEDIATE")
+        self._set_stamp(workbook)
+        self.conn.execute("COMMIT")
+
+    def _set_stamp(self, workbook: str | Path) -> None:
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('stamp', ?)", (workbook_stamp(workbook),))
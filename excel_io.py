@@ -1,80 +1,418 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
-import logging
-from typing import List, Dict, Any
+import logging, os, posixpath, re, shutil, tempfile, zipfile
+import xml.etree.ElementTree as ET
+from itertools import chain, islice
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple
+from xml.sax.saxutils import escape
 import pandas as pd
 from pathlib import Path
-from openpyxl import load_workbook
-from schema import ROW_SCHEMA, TYPE_CASTERS
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.utils import get_column_letter
+from schema import ROW_SCHEMA, TYPE_CASTERS, DEDUP_KEY, Row, try_parse_int, try_parse_float
+from dedup_index import DedupIndex, index_path, norm_key
+import profiling
 
 LOGGER = logging.getLogger("excel_io")
 SHEET_NAME = "Datos"
 
+ROWS_PER_FRAME = 5000
+
 def ensure_schema_columns(df: pd.DataFrame) -> pd.DataFrame:
     for col in ROW_SCHEMA:
         if col not in df.columns:
             df[col] = None
     return df[ROW_SCHEMA]
 
+def iter_frames(rows: Iterable[Dict[str, Any]], size: int = ROWS_PER_FRAME) -> Iterator[pd.DataFrame]:
+    """Consume filas de a `size` y entrega DataFrames ya tipados (memoria acotada por el lote)."""
+    it = iter(rows)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk: return
+        yield cast_types(ensure_schema_columns(pd.DataFrame(chunk, columns=ROW_SCHEMA)))
+
+def _records(df: pd.DataFrame) -> Iterator[Tuple[Any, ...]]:
+    """Tuplas en orden de columnas con None en lugar de <NA>/NaN (listas para openpyxl/XML)."""
+    return df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+
+# Solo dígitos ASCII y a lo más 18 cifras (cabe en int64): "1_000", dígitos Unicode ("٣") y enteros más
+# largos los resuelve try_parse_int celda a celda, como int().
+_INT_STR_RE = r"[+-]?[0-9]{1,18}"
+_INT64_LIMIT = 2 ** 63
+# Un entero que pasó por float64 desde una celda object pudo perder cifras por encima de 2**53
+_EXACT_FLOAT_INT = 2 ** 53
+# to_numeric redondea distinto que float() con mantisas largas: el camino vectorizado toma decimales
+# simples de hasta 15 caracteres; "1_000", "٣", "1e5", "nan" o más cifras van por try_parse_float.
+_FLOAT_STR_RE = r"[+-]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)"
+_FLOAT_STR_MAX = 15
+_NUMERIC_KINDS = {"integer", "floating", "mixed-integer-float", "empty"}
+
+def _split_object(s: pd.Series) -> Tuple[pd.Series, pd.Series | None]:
+    """Separa una columna object en (valores numéricos, celdas str). Sin str → un solo to_numeric en C."""
+    if pd.api.types.infer_dtype(s, skipna=True) in _NUMERIC_KINDS:
+        return pd.to_numeric(s, errors="coerce"), None
+    types = s.map(type)
+    is_str = types.eq(str)
+    # bool no es número para los casters escalares (int("True") falla)
+    nums = pd.to_numeric(s.mask(is_str | types.eq(bool)), errors="coerce")
+    return nums, s[is_str].astype(str)
+
+def _in_int64(v: Any) -> bool:
+    return v is None or -_INT64_LIMIT <= v < _INT64_LIMIT
+
+def _scalar_int(s: pd.Series, index: pd.Index) -> pd.Series:
+    # object explícito: Series.map inferiría float64 y redondearía los enteros grandes
+    return pd.Series([try_parse_int(x) for x in s], index=index, dtype=object)
+
+def _vector_int(s: pd.Series) -> pd.Series:
+    """Equivalente vectorizado de try_parse_int → Int64 (None ↔ <NA>).
+    Si algún valor no cabe en int64 la columna entera va por try_parse_int (object con el int de Python)."""
+    if pd.api.types.is_bool_dtype(s): return pd.Series(pd.NA, index=s.index, dtype="Int64")
+    if pd.api.types.is_signed_integer_dtype(s): return s.astype("Int64")
+    index = s.index
+    s = s.reset_index(drop=True)
+    if pd.api.types.is_float_dtype(s): nums, strs, exact = s, None, _INT64_LIMIT
+    else: (nums, strs), exact = _split_object(s.astype(object)), _EXACT_FLOAT_INT
+    if pd.api.types.is_integer_dtype(nums):
+        if len(nums) and nums.max() >= _INT64_LIMIT: return _scalar_int(s, index)
+        out = nums.astype("Int64")
+    else:
+        nums = nums.astype("Float64")
+        whole = nums.where(nums % 1 == 0)
+        if whole.abs().ge(exact).any(): return _scalar_int(s, index)
+        out = whole.astype("Int64")
+    if strs is not None and len(strs):
+        st = strs.str.strip()
+        fast = st.str.fullmatch(_INT_STR_RE).astype(bool)
+        parsed = pd.Series(pd.NA, index=st.index, dtype="Int64")
+        parsed[fast] = pd.to_numeric(st[fast]).astype("Int64")
+        rest = strs[~fast & st.ne("")]
+        if len(rest):
+            slow = [try_parse_int(x) for x in rest]
+            if not all(map(_in_int64, slow)): return _scalar_int(s, index)
+            parsed[rest.index] = pd.array(slow, dtype="Int64")
+        out = out.mask(out.index.isin(st.index), parsed.reindex(out.index))
+    return out.set_axis(index)
+
+def _vector_float(s: pd.Series) -> pd.Series:
+    """Equivalente vectorizado de try_parse_float (coma decimal incluida) → Float64."""
+    if pd.api.types.is_bool_dtype(s): return pd.Series(pd.NA, index=s.index, dtype="Float64")
+    if pd.api.types.is_numeric_dtype(s): return s.astype("Float64")
+    index = s.index
+    nums, strs = _split_object(s.reset_index(drop=True).astype(object))
+    out = nums.astype("Float64")
+    if strs is not None and len(strs):
+        st = strs.str.replace(",", ".", regex=False).str.strip()
+        fast = st.str.fullmatch(_FLOAT_STR_RE).astype(bool) & st.str.len().le(_FLOAT_STR_MAX)
+        parsed = pd.Series(pd.NA, index=st.index, dtype="Float64")
+        parsed[fast] = pd.to_numeric(st[fast]).astype("Float64")
+        rest = strs[~fast & st.ne("")]
+        if len(rest): parsed[rest.index] = pd.array([try_parse_float(x) for x in rest], dtype="Float64")
+        out = out.mask(out.index.isin(st.index), parsed.reindex(out.index))
+    return out.set_axis(index)
+
+# Capa vectorizada derivada de TYPE_CASTERS: caster escalar → versión por columna
+VECTOR_CASTERS = {try_parse_int: _vector_int, try_parse_float: _vector_float}
+
 def cast_types(df: pd.DataFrame) -> pd.DataFrame:
-    for col, caster in TYPE_CASTERS.items():
-        if col in df.columns:
-            df[col] = df[col].map(caster)
+    with profiling.stage("cast_types", per_pdf=False) as sp:
+        for col, caster in TYPE_CASTERS.items():
+            if col in df.columns:
+                vec = VECTOR_CASTERS.get(caster)
+                df[col] = vec(df[col]) if vec else df[col].map(caster)
+        sp.rows = len(df)
     return df
 
+def _sheet_frame(ws) -> pd.DataFrame:
+    rows = ws.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None: return pd.DataFrame()
+    return pd.DataFrame(list(rows), columns=list(header))
+
 def read_excel_all_sheets(path: str | Path) -> Dict[str, pd.DataFrame]:
+    """Todas las hojas como DataFrames (modo solo lectura). Para 'Datos' usar read_datos."""
     path = Path(path)
     if not path.exists():
         return {}
-    wb = load_workbook(path)
-    data: Dict[str, pd.DataFrame] = {}
-    for name in wb.sheetnames:
-        ws = wb[name]
-        rows = list(ws.values)
-        if not rows:
-            data[name] = pd.DataFrame()
-            continue
-        header = list(rows[0])
-        body = list(rows[1:])
-        df = pd.DataFrame(body, columns=header)
-        data[name] = df
+    with profiling.stage("read_excel", per_pdf=False) as sp:
+        wb = load_workbook(path, read_only=True)
+        try:
+            data = {name: _sheet_frame(wb[name]) for name in wb.sheetnames}
+        finally:
+            wb.close()
+        sp.rows = sum(len(df) for df in data.values())
     return data
 
-def write_preserving_other_sheets(path: str | Path, df_datos: pd.DataFrame) -> None:
+def read_datos(path: str | Path) -> pd.DataFrame:
+    """Solo la hoja 'Datos', en streaming (modo solo lectura): las demás hojas no se leen."""
     path = Path(path)
-    existing = read_excel_all_sheets(path) if path.exists() else {}
-    existing[SHEET_NAME] = ensure_schema_columns(df_datos.copy())
-    with pd.ExcelWriter(path, engine="openpyxl") as writer:
-        for name, df in existing.items():
-            if df is None:
-                df = pd.DataFrame()
-            df = ensure_schema_columns(df) if name == SHEET_NAME else df
-            df.to_excel(writer, sheet_name=name, index=False)
-
-def append_and_dedup(base_path: str | Path, new_rows: List[Dict[str, Any]], out_path: str | Path | None = None) -> str:
+    if not path.exists(): return pd.DataFrame(columns=ROW_SCHEMA)
+    with profiling.stage("read_excel", per_pdf=False) as sp:
+        wb = load_workbook(path, read_only=True)
+        try:
+            df = _sheet_frame(wb[SHEET_NAME]) if SHEET_NAME in wb.sheetnames else pd.DataFrame(columns=ROW_SCHEMA)
+        finally:
+            wb.close()
+        sp.rows = len(df)
+    return df
+
+_SHEET_DATA_RE = re.compile(rb"<sheetData\b[^>]*?(/?)>")
+
+def _datos_chunks(df: pd.DataFrame, xml: bytes, start: int, end: int) -> Callable[[], Iterator[bytes]]:
+    """Partes del XML de 'Datos' con <sheetData> (xml[start:end]) reemplazado por las filas de df."""
+    cols = [str(c) for c in df.columns]
+    letters = [get_column_letter(i) for i in range(1, len(cols) + 1)]
+    dim = f"A1:{letters[-1]}{len(df) + 1}".encode()
+    head = _DIMENSION_RE.sub(lambda m: m.group(1) + dim + m.group(3), xml[:start], count=1)
+    def chunks() -> Iterator[bytes]:
+        yield head + b"<sheetData>" + _row_xml(1, cols, letters)
+        recs = _records(df); r = 1
+        while True:
+            block = list(islice(recs, ROWS_PER_FRAME))
+            if not block: break
+            yield b"".join(_row_xml(r + i, rec, letters) for i, rec in enumerate(block, 1)); r += len(block)
+        yield b"</sheetData>" + xml[end:]
+    return chunks
+
+def write_preserving_other_sheets(path: str | Path, df_datos: pd.DataFrame, src: str | Path | None = None) -> None:
+    """Escribe 'Datos' en `path` copiando tal cual (sin parsear) el resto del libro `src` (def: path):
+    otras hojas, estilos, fórmulas, tablas dinámicas y el formato de la propia hoja 'Datos'. Solo se
+    reemplaza su <sheetData>, así que tiempo y memoria dependen de 'Datos', no del libro completo."""
+    path = Path(path); src = Path(src) if src is not None else path
+    df = ensure_schema_columns(df_datos.copy())
+    if not src.exists():
+        create_new_excel(path, (Row(rec) for rec in _records(df)))
+        return
+    with zipfile.ZipFile(src) as zf:
+        part = _sheet_part(zf, SHEET_NAME)
+        xml = zf.read(part) if part else b""
+    m = _SHEET_DATA_RE.search(xml)
+    if m is None:
+        # libro sin hoja 'Datos': se agrega con openpyxl (única ruta que carga el libro completo)
+        LOGGER.info("'%s' no tiene hoja '%s'; se agrega cargando el libro completo.", src, SHEET_NAME)
+        with profiling.stage("excel_rewrite", per_pdf=False) as sp:
+            wb = load_workbook(src); ws = wb.create_sheet(SHEET_NAME); ws.append(ROW_SCHEMA)
+            for rec in _records(df): ws.append(rec)
+            tmp = _atomic_target(path)
+            try:
+                wb.save(tmp); os.replace(tmp, path)
+            except Exception:
+                Path(tmp).unlink(missing_ok=True); raise
+            sp.rows = len(df)
+        return
+    end = m.end() if m.group(1) else xml.index(b"</sheetData>", m.end()) + len(b"</sheetData>")
+    with profiling.stage("excel_rewrite", per_pdf=False) as sp:
+        _rewrite_zip(src, path, part, _datos_chunks(df, xml, m.start(), end))
+        sp.rows = len(df)
+
+def append_and_dedup(base_path: str | Path, new_rows: Iterable[Dict[str, Any]], out_path: str | Path | None = None) -> str:
     base_path = Path(base_path)
     if out_path is None:
         out_path = base_path
     out_path = Path(out_path)
 
-    all_sheets = read_excel_all_sheets(base_path) if base_path.exists() else {}
-    df_old = all_sheets.get(SHEET_NAME, pd.DataFrame(columns=ROW_SCHEMA))
-    df_old = ensure_schema_columns(df_old)
+    df_old = ensure_schema_columns(read_datos(base_path))
 
-    df_new = pd.DataFrame(new_rows, columns=ROW_SCHEMA)
+    df_new = pd.DataFrame(list(new_rows), columns=ROW_SCHEMA)
     df_new = ensure_schema_columns(df_new)
 
-    df_concat = pd.concat([df_old, df_new], ignore_index=True)
-    df_concat = df_concat.drop_duplicates(subset=["Folio","Fecha","Máquina"], keep="first")
+    with profiling.stage("dedup", per_pdf=False) as sp:
+        df_concat = pd.concat([df_old, df_new], ignore_index=True)
+        df_concat = df_concat.drop_duplicates(subset=["Folio","Fecha","Máquina"], keep="first")
+        sp.rows = len(df_concat)
     df_concat = cast_types(df_concat)
 
-    write_preserving_other_sheets(out_path, df_concat)
+    write_preserving_other_sheets(out_path, df_concat, base_path)
     return str(out_path)
 
-def create_new_excel(out_path: str | Path, rows: List[Dict[str, Any]]) -> str:
+def _atomic_target(out_path: Path) -> str:
+    fd, tmp = tempfile.mkstemp(dir=out_path.parent, suffix=".xlsx.tmp"); os.close(fd)
+    return tmp
+
+def create_new_excel(out_path: str | Path, rows: Iterable[Dict[str, Any]]) -> str:
+    """Escribe 'Datos' consumiendo `rows` por lotes (openpyxl write-only). Si el archivo ya existe se
+    reemplaza solo 'Datos' y se conservan las demás hojas, como antes."""
     out_path = Path(out_path)
-    df = pd.DataFrame(rows, columns=ROW_SCHEMA)
-    df = ensure_schema_columns(df)
-    df = cast_types(df)
-    write_preserving_other_sheets(out_path, df)
+    if out_path.exists():
+        df = pd.DataFrame(list(rows), columns=ROW_SCHEMA)
+        df = ensure_schema_columns(df)
+        df = cast_types(df)
+        write_preserving_other_sheets(out_path, df)
+        return str(out_path)
+    frames = iter_frames(rows)
+    # primer lote antes de abrir el libro: si la extracción falla de entrada no queda nada abierto
+    first = next(frames, None)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(SHEET_NAME)
+    tmp = None
+    try:
+        ws.append(ROW_SCHEMA)
+        for df in chain([] if first is None else [first], frames):
+            with profiling.stage("excel_write", per_pdf=False) as sp:
+                for rec in _records(df): ws.append(rec)
+                sp.rows = len(df)
+        tmp = _atomic_target(out_path)
+        with profiling.stage("excel_save", per_pdf=False): wb.save(tmp)
+        os.replace(tmp, out_path)
+    except BaseException:
+        _discard_write_only(ws)
+        if tmp: Path(tmp).unlink(missing_ok=True)
+        raise
+    return str(out_path)
+
+def _discard_write_only(ws) -> None:
+    """Cierra la hoja write-only sin guardar y borra su XML temporal (lo mismo que hace openpyxl al guardar);
+    si no, el GC la cierra después con un "I/O operation on closed file" en un proceso que sigue vivo."""
+    try:
+        if not ws.closed: ws.close()
+        if ws._writer is not None: ws._writer.cleanup()
+    except Exception as e:
+        LOGGER.debug("No se pudo descartar la hoja temporal: %s", e)
+
+# ===== Append incremental (sin reescribir el libro) =====
+_NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_NS_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_LAST_ROW_RE = re.compile(rb'<row\b[^>]*?\br="(\d+)"')
+_DIMENSION_RE = re.compile(rb'(<dimension\b[^>]*?\bref=")([^"]*)(")')
+
+def _sheet_part(zf: zipfile.ZipFile, sheet_name: str) -> Optional[str]:
+    """Ruta interna (p.ej. xl/worksheets/sheet1.xml) de la hoja indicada, o None."""
+    wb = ET.fromstring(zf.read("xl/workbook.xml"))
+    rid = None
+    for sh in wb.iter(_NS_MAIN + "sheet"):
+        if sh.get("name") == sheet_name:
+            rid = sh.get(_NS_REL + "id"); break
+    if rid is None: return None
+    rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+    for rel in rels.iter(_NS_PKG_REL + "Relationship"):
+        if rel.get("Id") == rid:
+            target = rel.get("Target", "")
+            return target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+    return None
+
+def _cell_xml(ref: str, value: Any) -> str:
+    if value is None: return ""
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{ref}" t="n"><v>{value!r}</v></c>'
+    text = escape(ILLEGAL_CHARACTERS_RE.sub("", str(value)))
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+def _row_xml(r: int, rec: Iterable[Any], letters: List[str]) -> bytes:
+    cells = "".join(_cell_xml(f"{col}{r}", v) for col, v in zip(letters, rec))
+    return f'<row r="{r}">{cells}</row>'.encode("utf-8")
+
+def _read_header(path: Path) -> List[Any]:
+    wb = load_workbook(path, read_only=True)
+    try:
+        return list(next(wb[SHEET_NAME].iter_rows(max_row=1, values_only=True), ()))
+    finally:
+        wb.close()
+
+def iter_existing_keys(path: str | Path) -> Iterable[Tuple[Any, ...]]:
+    """Claves DEDUP_KEY de 'Datos' en modo streaming (lee solo esas columnas)."""
+    wb = load_workbook(path, read_only=True)
+    try:
+        ws = wb[SHEET_NAME]
+        header = list(next(ws.iter_rows(max_row=1, values_only=True), ()))
+        if not all(col in header for col in DEDUP_KEY): return
+        pos = [header.index(col) for col in DEDUP_KEY]
+        lo, hi = min(pos), max(pos)
+        for vals in ws.iter_rows(min_row=2, min_col=lo + 1, max_col=hi + 1, values_only=True):
+            yield tuple(vals[p - lo] if p - lo < len(vals) else None for p in pos)
+    finally:
+        wb.close()
+
+def _clone_info(info: zipfile.ZipInfo) -> zipfile.ZipInfo:
+    zi = zipfile.ZipInfo(info.filename, info.date_time)
+    zi.compress_type = info.compress_type; zi.external_attr = info.external_attr
+    zi.create_system = info.create_system; zi.comment = info.comment
+    return zi
+
+def _rewrite_zip(src: Path, dst: Path, part: str, chunks: Callable[[], Iterable[bytes]]) -> None:
+    """Copia el .xlsx reemplazando una sola parte por `chunks()`; el resto se copia en streaming
+    sin interpretarlo. Escritura atómica."""
+    tmp = _atomic_target(dst)
+    try:
+        with zipfile.ZipFile(src) as zin, zipfile.ZipFile(tmp, "w") as zout:
+            for info in zin.infolist():
+                with zout.open(_clone_info(info), "w") as w:
+                    if info.filename == part:
+                        for c in chunks(): w.write(c)
+                    else:
+                        with zin.open(info) as r: shutil.copyfileobj(r, w, 1 << 20)
+        os.replace(tmp, dst)
+    except Exception:
+        Path(tmp).unlink(missing_ok=True); raise
+
+def _open_index(base_path: Path, out_path: Path) -> DedupIndex:
+    """Índice de claves del libro destino, consistente con el contenido actual de base_path."""
+    if out_path != base_path and index_path(base_path).exists():
+        shutil.copyfile(index_path(base_path), index_path(out_path))
+    idx = DedupIndex.for_workbook(out_path)
+    if not idx.is_fresh(base_path):
+        with profiling.stage("index_rebuild", per_pdf=False) as sp:
+            sp.rows = idx.rebuild(iter_existing_keys(base_path), base_path)
+    return idx
+
+def append_incremental(base_path: str | Path, new_rows: Iterable[Dict[str, Any]], out_path: str | Path | None = None) -> str:
+    """Append que agrega al final de 'Datos' solo las filas nuevas no duplicadas.
+    El resto del libro (otras hojas, estilos, fórmulas) se copia sin parsear. Las filas previas no se
+    re-tipan ni se deduplican entre sí (a diferencia de append_and_dedup). Los duplicados se buscan en
+    el índice persistente junto al libro (dedup_index), que se reconstruye si quedó obsoleto.
+    `new_rows` se consume por lotes y las filas XML van a un archivo temporal, no a memoria.
+    Si el libro no tiene una hoja 'Datos' con el esquema esperado, cae a append_and_dedup."""
+    base_path = Path(base_path)
+    out_path = Path(out_path) if out_path is not None else base_path
+    if not base_path.exists():
+        return create_new_excel(out_path, new_rows)
+    try:
+        with zipfile.ZipFile(base_path) as zf:
+            part = _sheet_part(zf, SHEET_NAME)
+            xml = zf.read(part) if part else b""
+        end = xml.rfind(b"</sheetData>")
+        header = _read_header(base_path) if end >= 0 else []
+    except (KeyError, zipfile.BadZipFile, ET.ParseError):
+        end, header = -1, []
+    if end < 0 or not all(col in header for col in ROW_SCHEMA):
+        LOGGER.info("Append incremental no aplicable a '%s'; se usa reescritura completa.", base_path)
+        return append_and_dedup(base_path, new_rows, out_path)
+
+    m_last = _LAST_ROW_RE.match(xml, max(xml.rfind(b"<row ", 0, end), 0))
+    first_row = int(m_last.group(1)) + 1 if m_last else 1
+    letters = [get_column_letter(i) for i in range(1, len(header) + 1)]
+    order = [ROW_SCHEMA.index(h) if h in ROW_SCHEMA else None for h in header]
+    key_pos = [ROW_SCHEMA.index(k) for k in DEDUP_KEY]
+    fresh: List[Tuple[str, str, str]] = []; taken = set()
+    r = first_row - 1
+    with _open_index(base_path, out_path) as idx, tempfile.SpooledTemporaryFile(16 << 20) as body:
+        for df in iter_frames(new_rows):
+            recs = list(_records(df))
+            keys = [norm_key(rec[p] for p in key_pos) for rec in recs]
+            with profiling.stage("dedup_index", per_pdf=False) as sp:
+                known = idx.existing(keys); sp.rows = len(keys)
+            with profiling.stage("excel_write", per_pdf=False) as sp:
+                for rec, k in zip(recs, keys):
+                    if k in known or k in taken: continue
+                    taken.add(k); fresh.append(k); r += 1
+                    body.write(_row_xml(r, (None if o is None else rec[o] for o in order), letters))
+                sp.rows = len(recs)
+        if fresh:
+            dim = f"A1:{letters[-1]}{r}".encode()
+            head = _DIMENSION_RE.sub(lambda m: m.group(1) + dim + m.group(3), xml[:end], count=1)
+            def chunks() -> Iterator[bytes]:
+                yield head
+                body.seek(0)
+                yield from iter(lambda: body.read(1 << 20), b"")
+                yield xml[end:]
+            idx.begin_add(fresh)
+            with profiling.stage("zip_rewrite", per_pdf=False): _rewrite_zip(base_path, out_path, part, chunks)
+        elif out_path != base_path:
+            _rewrite_zip(base_path, out_path, part, lambda: [xml])
+        idx.commit(out_path)
+    LOGGER.info("Append incremental: %s filas nuevas en '%s'", len(fresh), out_path)
     return str(out_path)
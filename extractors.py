@@ -8,30 +8,56 @@ Correcciones finales:
 - Mantiene A→B→C (texto→tablas→OCR opcional).
 """
 from __future__ import annotations
+import importlib.util
 import logging
 import re
-from typing import List, Dict, Any, Tuple
+import os
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Iterator, NamedTuple, Sequence, Tuple
 from pathlib import Path
 import pdfplumber
+import profiling
+from schema import Row
+from options import DEFAULT_ENGINE, ENGINES
+from text_backends import DEFAULT_TEXT_BACKEND, open_text_backend, producer_key
 
 # ====== Opcionales ======
-try:
-    import tabula  # type: ignore
-except Exception:
-    tabula = None
-
-try:
-    from pdf2image import convert_from_path  # type: ignore
-    import pytesseract  # type: ignore
-except Exception:
-    convert_from_path = None
-    pytesseract = None
+# Se importan al primer uso (pytesseract arrastra pandas): sin --ocr ni páginas para tabula no se cargan,
+# tampoco en cada proceso del pool.
+tabula: Any = None
+convert_from_path: Any = None
+pytesseract: Any = None
+
+def _load_tabula() -> bool:
+    global tabula
+    if tabula is None:
+        try: import tabula  # type: ignore
+        except Exception: tabula = None
+    return tabula is not None
+
+def _load_ocr() -> bool:
+    global convert_from_path, pytesseract
+    if convert_from_path is None or pytesseract is None:
+        try:
+            from pdf2image import convert_from_path  # type: ignore
+            import pytesseract  # type: ignore
+        except Exception:
+            convert_from_path = pytesseract = None
+    return convert_from_path is not None and pytesseract is not None
 
 LOGGER = logging.getLogger("extractors")
+# Subir cuando cambie el resultado del parser (invalida la caché de extracciones)
+PARSER_VERSION = "4"
 
 # ====== Regex ======
+_NON_ALNUM_RE = re.compile(r"[^A-Za-z0-9]")
+_DIGIT_BREAK_RE = re.compile(r"(\d)\s*\n\s*(\d)")
+
 def normalize_space(s: str) -> str:
-    return re.sub(r"\s+", " ", s).strip()
+    # str.split() usa el mismo criterio de espacio Unicode que \s: equivale a re.sub(r"\s+", " ", s).strip()
+    return " ".join(s.split())
 
 FECHA_HORA_RE = re.compile(
     r"(?P<Fecha>\d{2}-\d{2}-\d{4})\s*(?:\n|\s)+(?P<Hora>\d{2}:\d{2}:\d{2})"
@@ -45,66 +71,91 @@ def _tokens(s: str) -> List[str]:
     return normalize_space(s.replace("\n", " ")).split(" ")
 
 # ===== Helpers =====
+# Cada token se clasifica una sola vez: dec[k] ⇔ re.fullmatch(r"\d+", tokens[k]) (dígitos Unicode, como \d).
+def _classify(tokens: List[str]) -> List[bool]:
+    return [t.isdecimal() for t in tokens]
+
 def _take_machine(tokens: List[str]) -> Tuple[int | None, int]:
     for i, t in enumerate(tokens[:5]):
         if t.isdigit() and 1 <= len(t) <= 3:
             return int(t), i + 1
     return None, 0
 
-def _reconstruct_plate(tokens: List[str], start: int) -> Tuple[str | None, int]:
-    limit = min(len(tokens), start + 12)
-    for k in range(start, len(tokens)):
-        if re.fullmatch(r"\d{10,}", tokens[k] or ""):
+def clean_token(tok: str) -> str:
+    # = re.sub(r"[^A-Za-z0-9]", "", tok).upper()
+    return tok.upper() if tok.isascii() and tok.isalnum() else _NON_ALNUM_RE.sub("", tok).upper()
+
+def is_plate6(s: str) -> bool:  # [A-Z]{4}\d{2} sobre texto ya limpio (ASCII)
+    return len(s) == 6 and s[:4].isalpha() and s[4:].isdigit()
+
+def _is_plate5(s: str) -> bool:  # [A-Z]{4}\d
+    return len(s) == 5 and s[:4].isalpha() and s[4].isdigit()
+
+def _reconstruct_plate(tokens: List[str], start: int, dec: List[bool] | None = None) -> Tuple[str | None, int]:
+    """Ventanas de hasta 6 tokens (i, j) en orden; una ventana calza si la concatenación limpia
+    de tokens[i..j] termina en LLLLDD (o LLLLD + token de 1 dígito). Se limpia cada token una vez
+    y se comparan sufijos por offsets, sin re-unir ni re-buscar por ventana."""
+    if dec is None: dec = _classify(tokens)
+    n = len(tokens)
+    limit = min(n, start + 12)
+    for k in range(start, n):
+        if dec[k] and len(tokens[k]) >= 10:
             limit = min(limit, k)
             break
-    def cj(seq): return re.sub(r"[^A-Za-z0-9]", "", " ".join(seq)).upper()
+    if limit <= start: return None, start
+    cleaned = [clean_token(t) for t in tokens[start:limit]]
+    joined = "".join(cleaned)
+    off = [0]
+    for c in cleaned: off.append(off[-1] + len(c))
     for i in range(start, limit):
+        a = off[i - start]
         for j in range(i, min(i + 6, limit)):
-            cand = cj(tokens[i:j + 1])
-            m = re.search(r"[A-Z]{4}\d{2}\b", cand)
-            if m: return m.group(0), j + 1
+            b = off[j + 1 - start]
+            if b - a >= 6 and is_plate6(joined[b - 6:b]): return joined[b - 6:b], j + 1
     for i in range(start, limit):
+        a = off[i - start]
         for j in range(i, min(i + 6, limit)):
-            cand = cj(tokens[i:j + 1])
-            m5 = re.search(r"([A-Z]{4}\d)\b$", cand)
-            if m5 and j + 1 < limit and re.fullmatch(r"\d\b", tokens[j + 1] or ""):
-                return (m5.group(1) + tokens[j + 1]).upper(), j + 2
+            b = off[j + 1 - start]
+            if b - a >= 5 and j + 1 < limit and _is_plate5(joined[b - 5:b]) \
+                    and dec[j + 1] and len(tokens[j + 1]) == 1:
+                return (joined[b - 5:b] + tokens[j + 1]).upper(), j + 2
     return None, start
 
-def _take_folio(tokens: List[str], start: int) -> Tuple[str | None, int]:
-    digs = ""
+def _take_folio(tokens: List[str], start: int, dec: List[bool] | None = None) -> Tuple[str | None, int]:
+    if dec is None: dec = _classify(tokens)
+    n_digs = 0
     i = start
-    while i < len(tokens) and re.fullmatch(r"\d{1,}", tokens[i] or ""):
-        digs += tokens[i]
-        if 12 <= len(digs) <= 14: return digs, i + 1
-        if len(digs) > 14: break
+    while i < len(tokens) and dec[i]:
+        n_digs += len(tokens[i])
+        if 12 <= n_digs <= 14: return "".join(tokens[start:i + 1]), i + 1
+        if n_digs > 14: break
         i += 1
     for j in range(start, min(start + 8, len(tokens))):
-        if re.fullmatch(r"\d{12,16}", tokens[j] or ""):
-            cand = re.sub(r"\D+", "", tokens[j])
-            if 12 <= len(cand) <= 14: return cand, j + 1
+        if dec[j] and 12 <= len(tokens[j]) <= 14: return tokens[j], j + 1
     return None, start
 
-def _take_variant_freq(tokens: List[str], start: int) -> Tuple[int | None, int | None, int]:
+def _take_variant_freq(tokens: List[str], start: int, dec: List[bool] | None = None) -> Tuple[int | None, int | None, int]:
+    if dec is None: dec = _classify(tokens)
     var = freq = None; i = start
     for k in range(i, min(i + 6, len(tokens))):
-        if re.fullmatch(r"\d{3}", tokens[k] or ""):
+        if dec[k] and len(tokens[k]) == 3:
             var = int(tokens[k]); i = k + 1; break
     for k in range(i, min(i + 6, len(tokens))):
-        if re.fullmatch(r"\d{1,3}", tokens[k] or ""):
+        if dec[k] and len(tokens[k]) <= 3:
             freq = int(tokens[k]); i = k + 1; break
     return var, freq, i
 
 # ===== Parse block =====
-def _parse_block(block: str, fecha: str, hora: str | None) -> Dict[str, Any] | None:
-    b = re.sub(r"(\d)\s*\n\s*(\d)", r"\1\2", block)
+def _parse_block(block: str, fecha: str, hora: str | None) -> Row | None:
+    b = _DIGIT_BREAK_RE.sub(r"\1\2", block)
     b = normalize_space(b)
-    tokens = _tokens(b)
+    tokens = b.split(" ")  # b ya viene normalizado: equivale a _tokens(b)
+    dec = _classify(tokens)
 
     maquina, pos = _take_machine(tokens)
-    patente, pos = _reconstruct_plate(tokens, pos)
-    folio, pos = _take_folio(tokens, pos)
-    variante, frecuencia, pos = _take_variant_freq(tokens, pos)
+    patente, pos = _reconstruct_plate(tokens, pos, dec)
+    folio, pos = _take_folio(tokens, pos, dec)
+    variante, frecuencia, pos = _take_variant_freq(tokens, pos, dec)
 
     rest_text = " ".join(tokens[pos:]).strip()
     ab = sd = ci = None
@@ -133,68 +184,426 @@ def _parse_block(block: str, fecha: str, hora: str | None) -> Dict[str, Any] | N
         try: te = int(m_pair.group(2))
         except Exception: te = None
 
-    row = {
-        "Fecha": fecha, "Hora": hora, "Máquina": maquina,
-        "Patente": patente, "Folio": folio,
-        "Variante": variante, "Frecuencia": frecuencia,
-        "Conductor": conductor, "AB": ab, "SD": sd, "CI": ci, "%": pct, "EV": ev, "TE": te,
-    }
-    if not row["Folio"] or not row["Fecha"]: return None
-    return row
+    if not folio or not fecha: return None
+    # mismo orden que ROW_SCHEMA
+    return Row((fecha, hora, maquina, patente, folio, variante, frecuencia,
+                conductor, ab, sd, ci, pct, ev, te))
 
 # ===== Intentos =====
-def parse_pdf_text(pdf_path: str | Path) -> Tuple[List[Dict[str, Any]], List[int]]:
-    rows: List[Dict[str, Any]] = []; by_page: List[int] = []
-    with pdfplumber.open(str(pdf_path)) as pdf:
-        for page in pdf.pages:
-            text = page.extract_text(x_tolerance=2, y_tolerance=2) or ""
-            matches = list(FECHA_HORA_RE.finditer(text))
-            if not matches: by_page.append(0); continue
-            idxs = [m.start() for m in matches] + [len(text)]
-            page_rows = 0
-            for i, m in enumerate(matches):
-                block = text[idxs[i]: idxs[i+1]]
-                r = _parse_block(block[m.end():], m.group("Fecha"), m.group("Hora"))
-                if r: rows.append(r); page_rows += 1
-            by_page.append(page_rows)
-    return rows, by_page
+def rows_from_text(text: str) -> List[Row]:
+    """Divide un texto por (Fecha + Hora) y parsea cada bloque."""
+    with profiling.stage("split"):
+        matches = list(FECHA_HORA_RE.finditer(text))
+    if not matches: return []
+    idxs = [m.start() for m in matches] + [len(text)]
+    rows: List[Row] = []
+    with profiling.stage("parse_block") as sp:
+        for i, m in enumerate(matches):
+            # solo el tail tras fecha/hora, hasta el siguiente match
+            r = _parse_block(text[m.end(): idxs[i+1]], m.group("Fecha"), m.group("Hora"))
+            if r: rows.append(r)
+        sp.calls = len(matches); sp.rows = len(rows)
+    return rows
+
+def _page_rows_and_chars(text: str) -> Tuple[List[Row], int]:
+    return rows_from_text(text), len(text) - text.count(" ") - text.count("\n")
+
+def _template_rows_and_chars(template: Any, words: List[Any]) -> Tuple[List[Row], int]:
+    with profiling.stage("layout_rows") as sp:
+        rows = template.rows(words); sp.rows = len(rows)
+    return rows, sum(len(w[0]) for w in words)
+
+def _screened_page(doc: Any, i: int, prescreen: bool = True, template: Any = None) -> Tuple[List[Row], int, str]:
+    """(filas, caracteres de texto, tipo) de la página i. Tipo: text (se extrajo el texto), skip (el
+    pre-filtro no vio fecha+hora: sin filas posibles) o image (sin texto y con imágenes: candidata a OCR).
+    Con `template` (layout.Template) las filas salen de las palabras de la página por columnas."""
+    if prescreen:
+        kind, n_chars = doc.page_screen(i)
+        if kind != "rows": return [], n_chars, kind
+    if template is not None: return (*_template_rows_and_chars(template, doc.page_words(i)), "text")
+    rows, n_chars = _page_rows_and_chars(doc.page_text(i))
+    return rows, n_chars, "text"
 
-def parse_pdf_tabula(pdf_path: str | Path) -> Tuple[List[Dict[str, Any]], List[int]]:
-    if tabula is None: return [], []
+def _parse_page_range(pdf_path: str | Path, start: int, stop: int | None, profile: bool = False,
+                      backend: str = DEFAULT_TEXT_BACKEND, prescreen: bool = True, template: Any = None) -> Any:
+    """(filas, caracteres de texto, tipo) de cada página en [start, stop), abriendo el documento por su
+    cuenta (apto para procesos hijos). Con profile=True devuelve (resultado, etapas medidas en el hijo)."""
+    if profile: profiling.start()
     try:
-        dfs = tabula.read_pdf(str(pdf_path), pages="all", lattice=True, multiple_tables=True) or []
-        if not dfs: dfs = tabula.read_pdf(str(pdf_path), pages="all", stream=True, multiple_tables=True) or []
-    except Exception: return [], []
-    rows: List[Dict[str, Any]] = []
+        doc = open_text_backend(pdf_path, backend)
+        try:
+            out = [_screened_page(doc, i, prescreen, template) for i in range(doc.n_pages)[start:stop]]
+        finally:
+            doc.close()
+    finally:
+        prof = profiling.stop() if profile else None
+    return (out, prof.snapshot()) if prof else out
+
+def resolve_workers(workers: int | None) -> int:
+    """0/None → todos los núcleos; nunca menos de 1."""
+    if not workers: return os.cpu_count() or 1
+    return max(1, int(workers))
+
+def _page_chunks(n_pages: int, workers: int, pages: Sequence[int] | None = None) -> List[Tuple[int, int]]:
+    # ~4 trozos por proceso para repartir bien páginas de costo desigual; con `pages` (en orden),
+    # solo rangos contiguos de esas páginas
+    pages = range(n_pages) if pages is None else pages
+    size = max(1, -(-len(pages) // (workers * 4)))
+    chunks: List[List[int]] = []
+    for p in pages:
+        if chunks and p == chunks[-1][1] and p - chunks[-1][0] < size: chunks[-1][1] = p + 1
+        else: chunks.append([p, p + 1])
+    return [(a, b) for a, b in chunks]
+
+def _iter_text_pages_ex(pdf_path: str | Path, workers: int = 1, executor: Executor | None = None,
+                        backend: str = DEFAULT_TEXT_BACKEND, n_pages: int | None = None,
+                        prescreen: bool = True, pages: Sequence[int] | None = None,
+                        template: Any = None) -> Iterator[Tuple[List[Row], int, str]]:
+    """Resultado de _screened_page para cada página (o solo las de `pages`, en orden)."""
+    if n_pages is None or (executor is None and workers <= 1):
+        doc = open_text_backend(pdf_path, backend)
+        try:
+            if executor is None and workers <= 1:
+                for i in (range(doc.n_pages) if pages is None else pages): yield _screened_page(doc, i, prescreen, template)
+                return
+            n_pages = doc.n_pages
+        finally:
+            doc.close()
+    chunks = _page_chunks(n_pages, workers, pages)
+    own = executor is None
+    pool = ProcessPoolExecutor(max_workers=workers) if own else executor
+    prof = profiling.active()
+    futures = [pool.submit(_parse_page_range, str(pdf_path), a, b, prof is not None, backend, prescreen, template)
+               for a, b in chunks]
+    try:
+        for fut in futures:
+            if prof is None: yield from fut.result(); continue
+            out, snap = fut.result(); prof.merge(snap)
+            yield from out
+    finally:
+        for fut in futures: fut.cancel()
+        if own: pool.shutdown()
+
+def iter_text_pages(pdf_path: str | Path, workers: int = 1, executor: Executor | None = None,
+                    backend: str = DEFAULT_TEXT_BACKEND) -> Iterator[List[Row]]:
+    """Filas de cada página (intento A), una lista por página y en orden. Con workers > 1 (o un executor)
+    las páginas se reparten entre procesos y se entregan en orden a medida que terminan.
+    `backend`: motor de texto (text_backends.TEXT_BACKENDS)."""
+    for rows, _, _ in _iter_text_pages_ex(pdf_path, workers, executor, backend): yield rows
+
+def parse_pdf_text(pdf_path: str | Path, workers: int = 1, executor: Executor | None = None,
+                   backend: str = DEFAULT_TEXT_BACKEND) -> Tuple[List[Row], List[int]]:
+    """Intento A (texto). Con workers > 1 el resultado es idéntico al serial: filas en orden de página y by_page por página."""
+    rows: List[Row] = []; by_page: List[int] = []
+    for page_rows in iter_text_pages(pdf_path, workers, executor, backend):
+        rows.extend(page_rows); by_page.append(len(page_rows))
+    return rows, by_page
+
+def _read_tables(pdf_path: str | Path, pages: List[int] | None) -> list:
+    pages_arg = "all" if pages is None else [p + 1 for p in pages]
+    dfs = tabula.read_pdf(str(pdf_path), pages=pages_arg, lattice=True, multiple_tables=True) or []
+    if not dfs: dfs = tabula.read_pdf(str(pdf_path), pages=pages_arg, stream=True, multiple_tables=True) or []
+    return dfs
+
+def _rows_from_tables(dfs: Iterable[Any]) -> List[Row]:
+    rows: List[Row] = []
     for df in dfs:
-        for _, r in df.iterrows():
-            line = " ".join(str(v) for v in r.to_list())
+        # to_numpy() unifica tipos igual que iterrows (usa .values): mismas líneas, sin un Series por fila
+        for values in df.to_numpy().tolist():
+            line = " ".join(map(str, values))
             m = FECHA_HORA_RE.search(line)
             if not m: continue
             rr = _parse_block(line[m.end():], m.group("Fecha"), m.group("Hora"))
             if rr: rows.append(rr)
+    return rows
+
+def parse_pdf_tabula(pdf_path: str | Path, pages: Iterable[int] | None = None) -> Tuple[List[Row], List[int]]:
+    """Intento B. `pages` (0-based) limita las páginas que lee tabula; None = todas."""
+    if not _load_tabula(): return [], []
+    if pages is not None:
+        pages = list(pages)
+        if not pages: return [], []
+    with profiling.stage("tabula"):
+        try: dfs = _read_tables(pdf_path, pages)
+        except Exception: return [], []
+    with profiling.stage("tabula_rows") as sp:
+        rows = _rows_from_tables(dfs); sp.rows = len(rows)
     return rows, []
 
-def parse_pdf_ocr(pdf_path: str | Path) -> Tuple[List[Dict[str, Any]], List[int]]:
-    if convert_from_path is None or pytesseract is None: return [], []
-    images = convert_from_path(str(pdf_path), dpi=300)
-    text = "\n".join(__import__('pytesseract').image_to_string(img, lang="spa") for img in images)
-    matches = list(FECHA_HORA_RE.finditer(text))
-    if not matches: return [], []
-    idxs = [m.start() for m in matches] + [len(text)]
-    rows: List[Dict[str, Any]] = []
-    for i, m in enumerate(matches):
-        block = text[idxs[i]: idxs[i+1]]
-        r = _parse_block(block[m.end():], m.group("Fecha"), m.group("Hora"))
-        if r: rows.append(r)
-    return rows, [len(rows)]
-
-def parse_pdf_any(pdf_path: str | Path, use_ocr: bool = False) -> Tuple[List[Dict[str, Any]], List[int], str]:
-    rows, by_page = parse_pdf_text(pdf_path)
-    if rows: return rows, by_page, "text"
-    rows, by_page = parse_pdf_tabula(pdf_path)
-    if rows: return rows, by_page, "tabula"
-    if use_ocr:
-        rows, by_page = parse_pdf_ocr(pdf_path)
-        if rows: return rows, by_page, "ocr"
-    return [], [], "none"
+def parse_pdfs_tabula(jobs: Iterable[Tuple[str | Path, Iterable[int] | None]]) -> List[List[Row]]:
+    """Intento B para varios PDF seguidos en este proceso: tabula-py (backend jpype) arranca la JVM
+    una vez y la reutiliza en cada lectura. Devuelve las filas de cada (pdf, páginas) en orden."""
+    return [parse_pdf_tabula(pdf, pages)[0] for pdf, pages in jobs]
+
+# Páginas con menos caracteres (sin espacios) se consideran sin capa de texto útil → OCR
+OCR_MIN_TEXT_CHARS = 20
+OCR_DPI = 300
+
+def _ocr_page(pdf_path: str, page: int) -> List[Row]:
+    """Renderiza y reconoce UNA página (0-based); el bitmap se libera antes de devolver."""
+    with profiling.stage("ocr_render"):
+        images = convert_from_path(pdf_path, dpi=OCR_DPI, first_page=page + 1, last_page=page + 1)
+    try:
+        with profiling.stage("ocr_tesseract"):
+            text = "\n".join(pytesseract.image_to_string(img, lang="spa") for img in images)
+    finally:
+        for img in images: img.close()
+    return rows_from_text(text)
+
+def iter_ocr_pages(pdf_path: str | Path, pages: Iterable[int], workers: int = 1) -> Iterator[Tuple[int, List[Row]]]:
+    """(página, filas) en orden para las páginas pedidas. Tesseract corre en un pool de `workers` hilos
+    (cada uno lanza su propio proceso tesseract); como mucho `workers` páginas renderizadas a la vez."""
+    if not _load_ocr(): return
+    path = str(pdf_path); it = iter(pages)
+    if workers <= 1:
+        for p in it: yield p, _ocr_page(path, p)
+        return
+    pool = ThreadPoolExecutor(max_workers=workers)
+    # ventana de 2×workers: las terminadas solo guardan filas, los bitmaps viven dentro de cada tarea
+    pending = deque((p, pool.submit(_ocr_page, path, p)) for p in islice(it, 2 * workers))
+    try:
+        while pending:
+            p, fut = pending.popleft()
+            rows = fut.result()
+            nxt = next(it, None)
+            if nxt is not None: pending.append((nxt, pool.submit(_ocr_page, path, nxt)))
+            yield p, rows
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+def parse_pdf_ocr(pdf_path: str | Path, pages: Iterable[int] | None = None, workers: int = 1) -> Tuple[List[Row], List[int]]:
+    if not _load_ocr(): return [], []
+    if pages is None:
+        with pdfplumber.open(str(pdf_path)) as pdf: pages = range(len(pdf.pages))
+    rows: List[Row] = []; by_page: List[int] = []
+    for _, page_rows in iter_ocr_pages(pdf_path, pages, workers):
+        rows.extend(page_rows); by_page.append(len(page_rows))
+    if not rows: return [], []
+    return rows, by_page
+
+# ===== Streaming =====
+class PageBatch(NamedTuple):
+    page: int | None          # índice 0-based; None si el método no distingue páginas
+    method: str               # text / tabula / ocr
+    rows: List[Row]
+    fallback: bool = False    # True: tabula / OCR tras un texto sin filas (no es la primera pasada por página)
+
+class ExtractionSession:
+    """Un PDF abierto una sola vez: número de páginas, texto y metadatos por página, y la cadena
+    A→B→C (texto→tabula→OCR) por página sin repetir etapas. `stages` registra cuántas filas dio cada
+    etapa ya ejecutada; volver a iterar no repite una etapa que ya corrió sin filas.
+    `policy` (policy.MethodPolicy): salta los respaldos que nunca dieron filas para el generador del PDF.
+    engine="columns": la etapa de texto arma las filas con una plantilla de columnas (layout.py) si el
+    documento la admite (`template`); si no, sigue por texto. Las plantillas se guardan en `cache_dir`
+    (por defecto la carpeta de la caché)."""
+
+    def __init__(self, pdf_path: str | Path, use_ocr: bool = False, workers: int = 1,
+                 executor: Executor | None = None, backend: str = DEFAULT_TEXT_BACKEND, prescreen: bool = True,
+                 engine: str = DEFAULT_ENGINE, policy: Any = None, cache_dir: str | Path | None = None):
+        self.path = str(pdf_path)
+        self.use_ocr = use_ocr; self.workers = workers; self.executor = executor
+        self.backend = backend or DEFAULT_TEXT_BACKEND; self.prescreen = prescreen
+        self.engine = engine or DEFAULT_ENGINE
+        if self.engine not in ENGINES: raise ValueError(f"Motor de filas desconocido: {self.engine} (opciones: {', '.join(ENGINES)})")
+        with profiling.stage("pdf_open"):
+            self.doc = open_text_backend(self.path, self.backend)
+        self._text: Dict[int, str] = {}
+        self._words: Dict[int, List[Any]] = {}   # palabras de las páginas de muestra de la plantilla
+        self.template = None
+        if self.engine == "columns":
+            from layout import TEMPLATES_FILE, TemplateStore, document_template   # diferido: layout importa este módulo
+            store = TemplateStore(Path(cache_dir) / TEMPLATES_FILE if cache_dir else None)
+            with profiling.stage("layout_learn"):
+                try: self.template = document_template(self.doc, store, self._text, self._words)
+                except Exception:
+                    self.doc.close(); raise
+            if self.template is not None: self._text.clear()
+            else: self._words.clear()
+        self.policy = policy
+        self.policy_key = producer_key(self.doc) if policy is not None else None
+        self.stages: Dict[str, int] = {}
+        self.text_chars: List[int] = []   # caracteres de texto por página (lo llena la etapa de texto)
+        self.page_kinds: List[str] = []   # text / skip / image por página (ver _screened_page)
+        self.text_rows: List[int] = []    # filas de la etapa de texto por página
+        self._ocr_done: set = set()       # páginas solo-imagen que ya pasaron por OCR en la primera pasada
+        self._resumed: Dict[int, Tuple[str, int, int]] = {}   # página → (tipo, caracteres, filas) ya extraída antes (diario)
+        self._resumed_rows = 0
+        self._tabula: List[Row] | None = None   # filas de tabula ya leídas en lote (prefetch_tabula)
+        self._allowed: Dict[str, bool] = {}     # respaldo → ¿se intenta? (la política se consulta una vez)
+        self._ocr_rows: int | None = None       # filas de OCR (primera pasada + respaldo); None si no corrió
+        self._recorded = False
+
+    def __enter__(self) -> "ExtractionSession": return self
+    def __exit__(self, *exc) -> None: self.close()
+    def close(self) -> None: self.doc.close()
+
+    @property
+    def n_pages(self) -> int:
+        return self.doc.n_pages
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return self.doc.metadata
+
+    def page_size(self, i: int) -> Tuple[float, float]:
+        return self.doc.page_size(i)
+
+    def page_text(self, i: int) -> str:
+        """Texto de la página i (se guarda para no extraerlo dos veces)."""
+        if i not in self._text: self._text[i] = self.doc.page_text(i)
+        return self._text[i]
+
+    def resume(self, pages: Iterable[Tuple[PageBatch, str, int]]) -> None:
+        """Páginas de la primera pasada ya extraídas en una corrida anterior (journal.PageJournal), como
+        (lote, tipo, caracteres): no se vuelven a extraer ni a entregar, pero cuentan para decidir los fallbacks."""
+        for batch, kind, n_chars in pages:
+            self._resumed[batch.page] = (kind, n_chars, len(batch.rows)); self._resumed_rows += len(batch.rows)
+            if batch.method == "ocr": self._ocr_done.add(batch.page)
+
+    def _first_pass_page(self, i: int) -> Tuple[List[Row], int, str]:
+        """Página de la etapa de texto (serial), reutilizando texto o palabras ya leídos."""
+        text = self._text.pop(i, None)
+        if text is not None: return (*_page_rows_and_chars(text), "text")
+        words = self._words.pop(i, None)
+        if words is not None: return (*_template_rows_and_chars(self.template, words), "text")
+        return _screened_page(self.doc, i, self.prescreen, self.template)
+
+    def _iter_text(self) -> Iterator[Tuple[int, List[Row], str]]:
+        todo = [i for i in range(self.n_pages) if i not in self._resumed]
+        if self.executor is None and self.workers <= 1:
+            source = (self._first_pass_page(i) for i in todo)
+        else:
+            source = _iter_text_pages_ex(self.path, self.workers, self.executor, self.backend, self.n_pages,
+                                         self.prescreen, todo if self._resumed else None, self.template)
+        self.text_chars = []; self.page_kinds = []; self.text_rows = []
+        for i in range(self.n_pages):
+            if i in self._resumed:
+                kind, n_chars, n_rows = self._resumed[i]; rows = None
+            else:
+                rows, n_chars, kind = next(source); n_rows = len(rows)
+            self.text_chars.append(n_chars); self.page_kinds.append(kind); self.text_rows.append(n_rows)
+            if rows is not None: yield i, rows, kind
+
+    def _ocr_ready(self) -> bool:
+        return self.use_ocr and _load_ocr()
+
+    def _allow(self, method: str) -> bool:
+        """¿Intentar este respaldo? La política se consulta una sola vez por documento."""
+        if method not in self._allowed:
+            self._allowed[method] = not (self.policy is not None and self.policy.skip(self.policy_key, method))
+        return self._allowed[method]
+
+    @property
+    def policy_skipped(self) -> List[str]:
+        """Respaldos que la política saltó en este documento (el resultado no es el de una corrida sin política)."""
+        return [m for m, ok in self._allowed.items() if not ok]
+
+    def _want_tabula(self) -> bool:
+        return tabula_available() and bool(self.tabula_pages()) and self._allow("tabula") and _load_tabula()
+
+    def _iter_ocr(self, pages: List[int], fallback: bool) -> Iterator[PageBatch]:
+        if not pages: return
+        n = 0
+        for i, page_rows in iter_ocr_pages(self.path, pages, resolve_workers(self.workers)):
+            n += len(page_rows)
+            yield PageBatch(i, "ocr", page_rows, fallback)
+        self._ocr_rows = (self._ocr_rows or 0) + n
+
+    def _primary(self) -> Iterator[PageBatch]:
+        """Primera pasada: texto página a página; con OCR activo, las páginas solo-imagen van directo
+        a OCR (en lote al final, con el pool de hilos) en lugar de esperar a que todo el texto falle."""
+        images: List[int] = []
+        for i, page_rows, kind in self._iter_text():
+            if kind == "image" and self._ocr_ready() and self._allow("ocr"): images.append(i); continue
+            yield PageBatch(i, "text", page_rows)
+        self._ocr_done.update(images)
+        yield from self._iter_ocr(images, False)
+
+    def ocr_pages(self) -> List[int]:
+        """Páginas sin capa de texto útil (todas si la etapa de texto no corrió)."""
+        if len(self.text_chars) != self.n_pages: return list(range(self.n_pages))
+        return [i for i, n in enumerate(self.text_chars) if n < OCR_MIN_TEXT_CHARS]
+
+    def tabula_pages(self) -> List[int] | None:
+        """Páginas con capa de texto y Fecha/Hora (pre-filtro) en las que el texto no dio filas: las únicas
+        que tabula puede resolver. None si la etapa de texto no corrió."""
+        if len(self.text_chars) != self.n_pages: return None
+        return [i for i, (n, kind, rows) in enumerate(zip(self.text_chars, self.page_kinds, self.text_rows))
+                if n >= OCR_MIN_TEXT_CHARS and kind == "text" and not rows]
+
+    def iter_batches(self, fallback: bool = True) -> Iterator[PageBatch]:
+        """Lotes por página: primera pasada de texto (las páginas que el pre-filtro descarta salen vacías
+        y las solo-imagen, con OCR activo, como lotes "ocr"); después cada página sin filas pasa al método
+        que puede resolverla: tabula (un lote para las de tabula_pages) y OCR (un lote por página sin
+        capa de texto útil). Los dos grupos no se cruzan: una página con texto no va a OCR ni una sin
+        texto a tabula. Con fallback=False se detiene si el texto no dio filas (para tabula en lote,
+        prefetch_tabula); volver a iterar sigue con los respaldos."""
+        if "text" not in self.stages or self.stages["text"]:
+            n = self._resumed_rows
+            for batch in self._primary():
+                n += len(batch.rows)
+                yield batch
+            self.stages["text"] = n
+            if not n and not fallback: return
+        if self.stages.get("tabula") != 0 and self._want_tabula():
+            rows = self._tabula if self._tabula is not None else parse_pdf_tabula(self.path, self.tabula_pages())[0]
+            self.stages["tabula"] = len(rows)
+            if rows: yield PageBatch(None, "tabula", rows, True)
+        if self.stages.get("ocr") != 0 and self._ocr_ready():
+            todo = [i for i in self.ocr_pages() if i not in self._ocr_done]
+            if todo and self._allow("ocr"):
+                before = self._ocr_rows or 0
+                yield from self._iter_ocr(todo, True)
+                self.stages["ocr"] = self._ocr_rows - before
+        self._record_policy()
+
+    def _record_policy(self) -> None:
+        """Anota en la política qué métodos corrieron en este documento y si dieron filas."""
+        if self.policy is None or self._recorded: return
+        self._recorded = True
+        self.policy.record(self.policy_key, "text", self.stages.get("text", 0))
+        if "tabula" in self.stages: self.policy.record(self.policy_key, "tabula", self.stages["tabula"])
+        if self._ocr_rows is not None: self.policy.record(self.policy_key, "ocr", self._ocr_rows)
+
+    def parse(self) -> Tuple[List[Row], List[int], str]:
+        return collect_batches(self.iter_batches())
+
+def tabula_available() -> bool:
+    """tabula-py instalado (lo busca sin importarlo)."""
+    return tabula is not None or importlib.util.find_spec("tabula") is not None
+
+def prefetch_tabula(sessions: Iterable[ExtractionSession]) -> int:
+    """Corre tabula en lote para las sesiones cuyo texto no dio filas (solo sus páginas con texto),
+    para que su siguiente iter_batches() use ese resultado. Devuelve cuántas sesiones leyó."""
+    if not _load_tabula(): return 0
+    pending = [s for s in sessions if s.stages.get("text") == 0 and "tabula" not in s.stages and s._tabula is None
+               and s._want_tabula()]
+    for s, rows in zip(pending, parse_pdfs_tabula((s.path, s.tabula_pages()) for s in pending)):
+        s._tabula = rows
+    return len(pending)
+
+def iter_pdf_rows(pdf_path: str | Path, use_ocr: bool = False, workers: int = 1,
+                  executor: Executor | None = None, backend: str = DEFAULT_TEXT_BACKEND,
+                  engine: str = DEFAULT_ENGINE) -> Iterator[PageBatch]:
+    """Filas por lotes (una página a la vez en modo texto) con la misma cadena A→B→C que parse_pdf_any.
+    Las páginas de texto se entregan aunque no tengan filas (sirven de progreso); después, las páginas
+    sin filas pasan por tabula (un lote) u OCR (un lote por página), ver ExtractionSession.iter_batches."""
+    with ExtractionSession(pdf_path, use_ocr, workers, executor, backend, engine=engine) as session:
+        yield from session.iter_batches()
+
+def collect_batches(batches: Iterable[PageBatch]) -> Tuple[List[Row], List[int], str]:
+    """Junta los lotes de iter_pdf_rows en (filas, by_page, método) como los devuelve parse_pdf_any.
+    Filas en el orden de los lotes; by_page suma por página lo de cada método (tabula, sin página, no
+    cuenta); el método junta los que dieron filas en orden de aparición ("text", "text+ocr", "text+tabula"…)."""
+    rows: List[Row] = []; per_page: Dict[int, int] = {}; methods: List[str] = []
+    for b in batches:
+        rows.extend(b.rows)
+        if b.page is not None: per_page[b.page] = per_page.get(b.page, 0) + len(b.rows)
+        if b.rows and b.method not in methods: methods.append(b.method)
+    if not rows: return [], [], "none"
+    return rows, [per_page[i] for i in sorted(per_page)], "+".join(methods)
+
+def parse_pdf_any(pdf_path: str | Path, use_ocr: bool = False, workers: int = 1,
+                  executor: Executor | None = None, backend: str = DEFAULT_TEXT_BACKEND,
+                  engine: str = DEFAULT_ENGINE) -> Tuple[List[Row], List[int], str]:
+    return collect_batches(iter_pdf_rows(pdf_path, use_ocr, workers, executor, backend, engine))
@@ -1,22 +1,80 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
-import threading, traceback
+import importlib, itertools, logging, multiprocessing, queue, threading, traceback
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from typing import TYPE_CHECKING
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import pdfplumber
 
 # Correct imports
-from extractors import parse_pdf_any, parse_pdf_text
-from excel_io import create_new_excel, append_and_dedup
+from options import DEFAULT_ENGINE, DEFAULT_TEXT_BACKEND, ENGINES, TEXT_BACKEND_NAMES
+import profiling
+
+# la extracción y la escritura (pdfplumber, pandas, openpyxl) se importan en el hilo de trabajos: la
+# ventana se pinta sin esperarlas y preload() las carga en segundo plano mientras tanto
+if TYPE_CHECKING:
+    from cache import ExtractionCache
 
 APP_TITLE = "PDF ➜ Excel — GUI (corregido)"
+# además del Excel, la salida puede ser un almacén CSV / Parquet / SQLite (según la extensión)
+OUTPUT_TYPES = [("Excel", "*.xlsx"), ("CSV", "*.csv"), ("Parquet", "*.parquet"), ("SQLite", "*.sqlite")]
+# el hilo de Tk vacía la cola de eventos cada POLL_MS; el log se inserta en un solo bloque por vuelta
+POLL_MS = 100
+MAX_EVENTS_PER_TICK = 5000
+MAX_LOG_LINES = 20000
+PRELOAD_MS = 200
+PRELOAD_MODULES = ("cache", "excel_io", "extractors", "journal", "pdf2excel", "policy", "sinks")
+
+def preload() -> None:
+    """Importa lo que usa un trabajo, en un hilo aparte tras la primera pintura: el primer trabajo ya lo
+    encuentra cargado."""
+    for name in PRELOAD_MODULES: importlib.import_module(name)
+
+class JobCancelled(Exception):
+    pass
+
+class _JobLog(logging.Handler):
+    """Manda al panel de log los registros INFO+ del hilo del trabajo (los mismos mensajes que la CLI)."""
+
+    def __init__(self, post):
+        super().__init__(logging.INFO)
+        self.post = post; self.thread = threading.get_ident()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if record.thread == self.thread: self.post(record.getMessage())
+
+class Job:
+    """Una ejecución encolada (create/append) con sus opciones. `cancel` la detiene entre páginas."""
+    _ids = itertools.count(1)
+
+    def __init__(self, mode: str, pdfs: list[str], base: str, out: str, use_ocr: bool, workers: int,
+                 cache: ExtractionCache | None, incremental: bool, profile: bool, backend: str, resume: bool = False,
+                 engine: str = DEFAULT_ENGINE, policy: bool = True):
+        self.id = next(Job._ids)
+        self.mode = mode; self.pdfs = pdfs; self.base = base; self.out = out; self.use_ocr = use_ocr
+        self.workers = workers; self.cache = cache; self.incremental = incremental; self.profile = profile
+        self.backend = backend; self.resume = resume; self.engine = engine; self.policy = policy
+        self.cancel = threading.Event(); self.future = None; self.status = "en cola"
+
+    def label(self) -> str:
+        target = self.out if self.mode == "create" else self.base
+        return f"{self.mode} · {len(self.pdfs)} PDF ➜ {Path(target).name if target else 'Reporte.xlsx'}"
 
 class App(ttk.Frame):
     def __init__(self, master: tk.Tk):
         super().__init__(master)
-        self.master.title(APP_TITLE); self.master.geometry("900x660")
+        self.master.title(APP_TITLE); self.master.geometry("900x720")
         self.pack(fill="both", expand=True); self._build_ui()
+        # trabajos en fila: un solo hilo los corre de a uno (la extracción usa su propio pool de procesos)
+        self.events: queue.SimpleQueue = queue.SimpleQueue()
+        self.runner = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf2excel-job")
+        self.jobs: dict[int, Job] = {}
+        self.finished: list[Job] = []
+        self.master.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.after(POLL_MS, self._drain_events)
+        self.after(PRELOAD_MS, lambda: threading.Thread(target=preload, name="pdf2excel-preload", daemon=True).start())
 
     def _build_ui(self):
         pad = {"padx": 8, "pady": 6}
@@ -29,6 +87,9 @@ class App(ttk.Frame):
         self.mode = tk.StringVar(value="create")
         ttk.Radiobutton(frm_mode, text="Crear nuevo Excel (create)", variable=self.mode, value="create", command=self._toggle_mode).pack(anchor="w", **pad)
         ttk.Radiobutton(frm_mode, text="Agregar a Excel existente (append)", variable=self.mode, value="append", command=self._toggle_mode).pack(anchor="w", **pad)
+        self.var_incremental = tk.BooleanVar(value=False)
+        self.chk_incremental = ttk.Checkbutton(frm_mode, text="Append incremental (solo agrega filas nuevas, no reescribe el libro)", variable=self.var_incremental)
+        self.chk_incremental.pack(anchor="w", padx=32, pady=(0,6))
 
         frm_paths = ttk.Frame(self); frm_paths.pack(fill="x", **pad)
         self.var_excel = tk.StringVar(); self.var_out = tk.StringVar(); self.var_ocr = tk.BooleanVar(value=False)
@@ -39,26 +100,127 @@ class App(ttk.Frame):
         self.ent_out = ttk.Entry(frm_paths, textvariable=self.var_out); self.ent_out.grid(row=1, column=1, sticky="ew", **pad)
         ttk.Button(frm_paths, text="Guardar como...", command=self.on_choose_out).grid(row=1, column=2, **pad)
         ttk.Checkbutton(frm_paths, text="Habilitar OCR (PDF escaneado)", variable=self.var_ocr).grid(row=2, column=1, sticky="w", **pad)
+        self.var_cache = tk.BooleanVar(value=True)
+        ttk.Checkbutton(frm_paths, text="Usar caché de extracción (no re-procesar PDFs ya leídos)", variable=self.var_cache).grid(row=2, column=2, sticky="w", **pad)
+        self.var_resume = tk.BooleanVar(value=False)
+        ttk.Checkbutton(frm_paths, text="Reanudar corrida interrumpida (no re-extrae las páginas del diario)", variable=self.var_resume).grid(row=3, column=2, sticky="w", **pad)
+        self.var_policy = tk.BooleanVar(value=True)
+        ttk.Checkbutton(frm_paths, text="Saltar respaldos que nunca dieron filas para el generador del PDF (política de métodos)", variable=self.var_policy).grid(row=4, column=2, sticky="w", **pad)
+        self.var_workers = tk.IntVar(value=1)
+        frm_workers = ttk.Frame(frm_paths); frm_workers.grid(row=3, column=1, sticky="w", **pad)
+        ttk.Label(frm_workers, text="Procesos (0 = todos los núcleos):").pack(side="left")
+        ttk.Spinbox(frm_workers, from_=0, to=64, width=5, textvariable=self.var_workers).pack(side="left", padx=(6,0))
+        self.var_backend = tk.StringVar(value=DEFAULT_TEXT_BACKEND)
+        ttk.Label(frm_workers, text="Motor de texto:").pack(side="left", padx=(16,0))
+        ttk.Combobox(frm_workers, values=list(TEXT_BACKEND_NAMES), width=11, state="readonly", textvariable=self.var_backend).pack(side="left", padx=(6,0))
+        self.var_engine = tk.StringVar(value=DEFAULT_ENGINE)
+        ttk.Label(frm_workers, text="Motor de filas:").pack(side="left", padx=(16,0))
+        ttk.Combobox(frm_workers, values=list(ENGINES), width=8, state="readonly", textvariable=self.var_engine).pack(side="left", padx=(6,0))
         frm_paths.columnconfigure(1, weight=1)
 
         frm_actions = ttk.Frame(self); frm_actions.pack(fill="x", **pad)
-        self.btn_run = ttk.Button(frm_actions, text="Ejecutar", command=self.on_run); self.btn_run.pack(side="left", **pad)
+        self.btn_run = ttk.Button(frm_actions, text="Ejecutar / encolar", command=self.on_run); self.btn_run.pack(side="left", **pad)
+        self.btn_cancel = ttk.Button(frm_actions, text="Cancelar", command=self.on_cancel); self.btn_cancel.pack(side="left", **pad)
         self.btn_save_log = ttk.Button(frm_actions, text="Guardar log", command=self.on_save_log); self.btn_save_log.pack(side="left", **pad)
+        self.var_profile = tk.BooleanVar(value=False)
+        ttk.Checkbutton(frm_actions, text="Medir etapas (perfil)", variable=self.var_profile).pack(side="left", **pad)
+        self.btn_profile = ttk.Button(frm_actions, text="▸ Perfil", command=self._toggle_profile); self.btn_profile.pack(side="right", **pad)
 
         self.pbar = ttk.Progressbar(self, mode="determinate"); self.pbar.pack(fill="x", **pad)
         self.progress_var = tk.StringVar(value="Listo.")
         self.lbl_progress = ttk.Label(self, textvariable=self.progress_var, anchor="w"); self.lbl_progress.pack(fill="x", padx=8)
 
+        # trabajos: en cola / ejecutando / completado / cancelado / error ("Cancelar" actúa sobre la selección)
+        self.tree_jobs = ttk.Treeview(self, columns=("estado",), height=4)
+        self.tree_jobs.heading("#0", text="Trabajo"); self.tree_jobs.column("#0", width=600)
+        self.tree_jobs.heading("estado", text="Estado"); self.tree_jobs.column("estado", width=140)
+        self.tree_jobs.pack(fill="x", padx=8, pady=(4,0))
+
+        # panel plegable con el último perfil (etapas y, debajo de cada PDF, sus etapas)
+        self.frm_profile = ttk.LabelFrame(self, text="Perfil por etapa")
+        cols = ("seg", "pct", "llamadas", "filas")
+        self.tree_profile = ttk.Treeview(self.frm_profile, columns=cols, height=8)
+        self.tree_profile.heading("#0", text="Etapa"); self.tree_profile.column("#0", width=320)
+        for c, label in zip(cols, ("Segundos", "% pared", "Llamadas", "Filas")):
+            self.tree_profile.heading(c, text=label); self.tree_profile.column(c, width=90, anchor="e")
+        self.tree_profile.pack(fill="both", expand=True, padx=8, pady=(0,8))
+
         self.txt = tk.Text(self, height=18); self.txt.pack(fill="both", expand=True, padx=8, pady=(0,8))
         self._toggle_mode()
 
     def log(self, msg: str):
-        self.txt.insert("end", msg + "\n"); self.txt.see("end"); self.txt.update_idletasks()
+        """Solo desde el hilo de Tk (los trabajos publican eventos "log" en self.events)."""
+        self.txt.insert("end", msg + "\n")
+        excess = int(self.txt.index("end-1c").split(".")[0]) - MAX_LOG_LINES
+        if excess > 0: self.txt.delete("1.0", f"{excess + 1}.0")
+        self.txt.see("end")
+
+    def _drain_events(self):
+        """Vacía la cola de eventos de los trabajos: un insert para todo el log de la vuelta y solo el
+        último estado de la barra de progreso. Así el costo por vuelta no crece con las páginas."""
+        lines: list[str] = []; progress = None
+        try:
+            for _ in range(MAX_EVENTS_PER_TICK):
+                try: ev = self.events.get_nowait()
+                except queue.Empty: break
+                kind, job, data = ev[0], ev[1], ev[2:]
+                if kind == "log": lines.append(data[0]); continue
+                if kind == "progress": progress = (job, *data); continue
+                if lines: self.log("\n".join(lines)); lines = []
+                if kind == "state": self._set_status(job, data[0])
+                elif kind == "profile": self.log(data[0].text()); self._show_profile(data[0])
+                elif kind == "done": self._job_done(job, *data)
+            if lines: self.log("\n".join(lines))
+            if progress:
+                job, done, total, text = progress
+                self.pbar.configure(maximum=max(total, 1), value=done)
+                self.progress_var.set(f"Trabajo #{job.id} — {text} — {int(done / max(total, 1) * 100)}%")
+        finally:
+            self.after(POLL_MS, self._drain_events)
+
+    def _set_status(self, job: Job, status: str):
+        job.status = status
+        if self.tree_jobs.exists(str(job.id)): self.tree_jobs.set(str(job.id), "estado", status)
+
+    def _job_done(self, job: Job, status: str, detail: str):
+        self._set_status(job, status)
+        if detail: self.log(detail)
+        icon = {"completado": "✅", "cancelado": "⏹", "error": "❌"}.get(status, "")
+        self.progress_var.set(f"Trabajo #{job.id}: {status} {icon}")
+        self.finished.append(job)
+        if any(j.status in ("en cola", "ejecutando", "cancelando…") for j in self.jobs.values()): return
+        # un solo aviso al vaciarse la fila, con los trabajos terminados desde el aviso anterior
+        done, self.finished = self.finished, []
+        summary = ", ".join(f"#{j.id} {j.status}" for j in done[-10:])
+        if any(j.status == "error" for j in done): messagebox.showerror(APP_TITLE, f"Terminado con errores: {summary}")
+        else: messagebox.showinfo(APP_TITLE, f"Operación completada: {summary}")
+
+    def _toggle_profile(self, show: bool | None = None):
+        visible = self.frm_profile.winfo_ismapped()
+        if show is None: show = not visible
+        if show and not visible: self.frm_profile.pack(fill="x", padx=8, pady=(0,6), before=self.txt)
+        elif not show and visible: self.frm_profile.pack_forget()
+        self.btn_profile.configure(text=("▾ Perfil" if show else "▸ Perfil"))
+
+    def _show_profile(self, prof: profiling.Profiler):
+        rep = prof.report(); wall = rep["wall_seconds"] or 1.0
+        tree = self.tree_profile; tree.delete(*tree.get_children())
+        def row(parent, name, st):
+            tree.insert(parent, "end", text=name, values=(f"{st['seconds']:.3f}", f"{100 * st['seconds'] / wall:.1f}",
+                                                           st["calls"], st["rows"]))
+        tree.insert("", "end", text="Total (pared)", values=(f"{wall:.3f}", "100.0", "", ""))
+        for name, st in sorted(rep["stages"].items(), key=lambda kv: -kv[1]["seconds"]): row("", name, st)
+        for path, info in rep["pdfs"].items():
+            extra = " ".join(f"{k}={v}" for k, v in info.items() if k != "stages")
+            node = tree.insert("", "end", text=f"PDF {Path(path).name} ({extra})", open=False)
+            for name, st in sorted(info["stages"].items(), key=lambda kv: -kv[1]["seconds"]): row(node, name, st)
+        self._toggle_profile(True)
 
     def _toggle_mode(self):
         is_create = (self.mode.get() == "create")
         self.lbl_excel.configure(state=("disabled" if is_create else "normal"))
         self.ent_excel.configure(state=("disabled" if is_create else "normal"))
+        self.chk_incremental.configure(state=("disabled" if is_create else "normal"))
 
     def on_add_pdfs(self):
         paths = filedialog.askopenfilenames(title="Selecciona PDF(s)", filetypes=[("PDF","*.pdf")])
@@ -67,75 +229,115 @@ class App(ttk.Frame):
 
     def on_clear_pdfs(self): self.lst_pdfs.delete(0, "end")
     def on_choose_excel(self):
-        p = filedialog.askopenfilename(title="Excel base (.xlsx)", filetypes=[("Excel","*.xlsx")])
+        p = filedialog.askopenfilename(title="Excel base (.xlsx)", filetypes=OUTPUT_TYPES)
         if p: self.var_excel.set(p)
     def on_choose_out(self):
-        p = filedialog.asksaveasfilename(title="Guardar Excel como...", defaultextension=".xlsx", filetypes=[("Excel","*.xlsx")])
+        p = filedialog.asksaveasfilename(title="Guardar Excel como...", defaultextension=".xlsx", filetypes=OUTPUT_TYPES)
         if p: self.var_out.set(p)
     def on_save_log(self):
         p = filedialog.asksaveasfilename(title="Guardar log", defaultextension=".txt", filetypes=[("Texto","*.txt")])
         if not p: return
         with open(p, "w", encoding="utf-8") as f: f.write(self.txt.get("1.0", "end"))
 
-    def _count_total_pages(self, pdfs: list[str]) -> int:
-        total = 0
-        for pdf in pdfs:
-            try:
-                with pdfplumber.open(pdf) as doc:
-                    total += len(doc.pages)
-            except Exception:
-                pass
-        return max(total, 1)
-
     def on_run(self):
+        from cache import ExtractionCache
+        from extractors import resolve_workers
         pdfs = list(self.lst_pdfs.get(0, "end"))
         if not pdfs: messagebox.showwarning(APP_TITLE, "Agrega al menos un PDF."); return
         mode = self.mode.get(); out = self.var_out.get().strip(); base = self.var_excel.get().strip(); use_ocr = self.var_ocr.get()
+        try: workers = resolve_workers(self.var_workers.get())
+        except (tk.TclError, ValueError): messagebox.showwarning(APP_TITLE, "'Procesos' debe ser un número entero."); return
         if mode == "create" and not out: messagebox.showwarning(APP_TITLE, "Para CREATE debes indicar 'Excel salida'."); return
         if mode == "append" and not base: messagebox.showwarning(APP_TITLE, "Para APPEND debes indicar 'Excel base'."); return
-        self.btn_run.configure(state="disabled")
-        threading.Thread(target=self._worker, args=(mode, pdfs, base, out, use_ocr), daemon=True).start()
+        cache = ExtractionCache() if self.var_cache.get() else None
+        job = Job(mode, pdfs, base, out, use_ocr, workers, cache, self.var_incremental.get(), self.var_profile.get(), self.var_backend.get(),
+                  self.var_resume.get(), self.var_engine.get(), self.var_policy.get())
+        self.jobs[job.id] = job
+        self.tree_jobs.insert("", "end", iid=str(job.id), text=f"#{job.id} {job.label()}", values=(job.status,))
+        job.future = self.runner.submit(self._worker, job)
 
-    def _worker(self, mode: str, pdfs: list[str], base: str, out: str, use_ocr: bool):
+    def on_cancel(self):
+        """Cancela los trabajos seleccionados (o, sin selección, el que está corriendo). Uno en cola se
+        quita de la fila; uno en curso se detiene en la próxima página sin escribir el destino (Excel)."""
+        ids = self.tree_jobs.selection() or [str(j.id) for j in self.jobs.values() if j.status == "ejecutando"]
+        for iid in ids:
+            job = self.jobs.get(int(iid))
+            if job is None or job.status not in ("en cola", "ejecutando"): continue
+            job.cancel.set()
+            if job.future is not None and job.future.cancel(): self._job_done(job, "cancelado", f"Trabajo #{job.id} quitado de la fila.")
+            else: self._set_status(job, "cancelando…")
+
+    def on_close(self):
+        for job in self.jobs.values(): job.cancel.set()
+        self.runner.shutdown(wait=False, cancel_futures=True)
+        self.master.destroy()
+
+    def _worker(self, job: Job):
+        """Corre en el hilo de trabajos: no toca widgets, solo publica eventos en self.events.
+        La extracción es la de la CLI (pdf2excel.iter_rows: caché, diario, tabula en lote y respaldos); el
+        trabajo le pasa su cancelación y su avance, y los mensajes del log de ese hilo van al panel."""
+        from excel_io import append_and_dedup, append_incremental, create_new_excel
+        from journal import PageJournal
+        from pdf2excel import iter_rows
+        from policy import MethodPolicy
+        from sinks import open_sink, sink_format
+        post = lambda kind, *data: self.events.put((kind, job, *data))
+        if job.cancel.is_set(): post("done", "cancelado", ""); return
+        post("state", "ejecutando")
+        mode, pdfs, base, out = job.mode, job.pdfs, job.base, job.out
+        stack = ExitStack(); handler = _JobLog(lambda msg: post("log", msg))
+        logging.getLogger().addHandler(handler)
+        if job.profile: profiling.start()
         try:
-            self.txt.delete("1.0", "end")
-            total_pages = self._count_total_pages(pdfs)
-            self.pbar.configure(maximum=total_pages, value=0)
-            processed_pages = 0
-            all_rows = []
-
-            for pdf in pdfs:
-                self.log(f"Procesando: {pdf}")
-                rows, by_page = parse_pdf_text(pdf)
-                for idx, n in enumerate(by_page, 1):
-                    processed_pages += 1
-                    self.pbar.configure(value=processed_pages)
-                    self.progress_var.set(f"Páginas {processed_pages}/{total_pages} — {int(processed_pages/total_pages*100)}%")
-                    self.log(f"  p{idx}: filas={n}")
-                    self.update_idletasks()
-                all_rows.extend(rows)
-
-                if sum(by_page) == 0:
-                    r2, _, src = parse_pdf_any(pdf, use_ocr)
-                    if r2:
-                        all_rows.extend(r2)
-                        self.log(f"  fallback {src}: filas={len(r2)}")
-
-            if not all_rows: self.log("No se detectaron filas en los PDF.")
-
-            if mode == "create":
-                out_path = out or str(Path.cwd() / "Reporte.xlsx")
-                path = create_new_excel(out_path, all_rows); self.log(f"OK: {path}")
-            else:
-                path = append_and_dedup(base, all_rows, out or None); self.log(f"OK: {path}")
+            post("log", f"=== Trabajo #{job.id}: {job.label()} ===")
+            completed: set[str] = set()
 
-            self.progress_var.set("Completado ✅"); messagebox.showinfo(APP_TITLE, "Operación completada.")
+            def check_cancel():
+                if job.cancel.is_set(): raise JobCancelled
+
+            def progress(pdf: str, done: int, pages: int, detail: str):
+                # los PDF se abren de a uno: la barra avanza por PDF y, dentro del actual, por página
+                if done >= pages: completed.add(pdf)
+                value = len(completed) + (0 if pdf in completed else done / pages)
+                post("progress", value, len(pdfs), f"PDF {len(completed)}/{len(pdfs)} — {Path(pdf).name} p{done}/{pages}")
+                post("log", f"  {Path(pdf).name} {detail}")
+
+            target = (out or str(Path.cwd() / "Reporte.xlsx")) if mode == "create" else base
+            # cada página terminada queda en <destino>.journal.jsonl: un trabajo cancelado o cerrado se reanuda
+            journal = stack.enter_context(PageJournal(target if mode == "create" else (out or base), resume=job.resume))
+            totals: dict[str, int] = {}
+            rows = iter_rows(pdfs, job.use_ocr, job.workers, job.cache, totals, job.backend, journal, job.engine,
+                             MethodPolicy() if job.policy else None, cancel=check_cancel, progress=progress)
+            post("progress", 0, len(pdfs), f"PDF 0/{len(pdfs)}")
+            if sink_format(target) != "excel":
+                sink = open_sink(target)
+                if mode == "create": sink.reset()
+                sink.append(rows); path = str(sink.path)
+                if out and mode == "append": post("log", "Aviso: 'Excel salida' no aplica a almacenes CSV/Parquet/SQLite; se amplió el almacén base.")
+            elif mode == "create":
+                path = create_new_excel(target, rows)
+            else:
+                append = append_incremental if job.incremental else append_and_dedup
+                path = append(base, rows, out or None)
+            journal.discard()
+            if not totals.get("rows"): post("log", "No se detectaron filas en los PDF.")
+            result = ("completado", f"OK: {path}")
+        except JobCancelled:
+            # los Excel se escriben a un temporal y se reemplazan al final: el destino queda intacto
+            # (un almacén CSV/Parquet/SQLite conserva los lotes ya agregados, sin duplicados) y lo ya
+            # extraído queda en el diario para "Reanudar"
+            result = ("cancelado", f"Trabajo #{job.id} cancelado.")
         except Exception:
-            self.progress_var.set("Error ❌"); self.log(traceback.format_exc()); messagebox.showerror(APP_TITLE, "Ocurrió un error.")
+            post("log", traceback.format_exc()); result = ("error", f"Trabajo #{job.id}: ocurrió un error.")
         finally:
-            self.btn_run.configure(state="normal")
+            stack.close()
+            logging.getLogger().removeHandler(handler)
+            prof = profiling.stop() if job.profile else None
+            if prof is not None: post("profile", prof)
+        post("done", *result)
 
 def main():
+    multiprocessing.freeze_support()
     root = tk.Tk(); style = ttk.Style(root)
     try: style.theme_use("clam")
     except Exception: pass
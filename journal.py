@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+journal.py — Diario de páginas para reanudar corridas largas (create/append, GUI)
+- <destino>.journal.jsonl: una línea JSON por página terminada (clave del PDF = hash del contenido +
+  versión del parser + opciones, índice de página, método, tipo, caracteres y filas), escrita y volcada
+  al archivo apenas la página sale del extractor; una línea "done" al terminar cada PDF.
+- Con resume=True se cargan las páginas ya escritas: los PDF terminados no se vuelven a abrir y los
+  interrumpidos solo extraen las páginas que faltan. Un fallback (tabula / OCR tras un texto sin filas)
+  interrumpido se repite entero. Una última línea cortada (corte a mitad de escritura) se ignora.
+- Se crea con la primera página anotada (una corrida que falla antes de extraer no deja un diario vacío)
+  y se borra después de la escritura final; sin resume, un diario anterior se descarta.
+Costo: un json.dumps + write + flush por página (el fsync se hace solo al cerrar cada PDF).
+"""
+from __future__ import annotations
+import json, logging, os, tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+from extractors import PageBatch, collect_batches
+from schema import Row, as_row
+
+LOGGER = logging.getLogger("journal")
+JOURNAL_SUFFIX = ".journal.jsonl"
+
+# página reanudable: (lote, tipo del pre-filtro, caracteres de texto), como la toma ExtractionSession.resume
+ResumedPage = Tuple[PageBatch, str, int]
+
+def journal_path(target: str | Path) -> Path:
+    target = Path(target)
+    return target.with_name(target.name + JOURNAL_SUFFIX)
+
+def _entry(key: str, batch: PageBatch, kind: str, n_chars: int) -> Dict[str, Any]:
+    return {"key": key, "page": batch.page, "method": batch.method, "fallback": batch.fallback,
+            "kind": kind, "chars": n_chars, "rows": batch.rows}
+
+class PageJournal:
+    """Diario de páginas de una corrida hacia `target`."""
+
+    def __init__(self, target: str | Path, resume: bool = False):
+        self.path = journal_path(target)
+        self.entries: Dict[str, List[Dict[str, Any]]] = {}   # clave → líneas de página (en orden)
+        self.finished: set = set()
+        self._fh = None
+        if resume: self._load()
+        elif self.path.exists():
+            LOGGER.warning("Se descarta el diario de una corrida anterior (use --resume para reanudarla): %s", self.path)
+        if self.entries or self.finished: self._rewrite()
+        else: self.path.unlink(missing_ok=True)
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            LOGGER.info("Sin diario para reanudar: %s", self.path); return
+        bad = 0
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try: e = json.loads(line)
+                except ValueError: bad += 1; continue
+                if e.get("done"): self.finished.add(e["key"])
+                else: self.entries.setdefault(e["key"], []).append(e)
+        if bad: LOGGER.warning("Diario: %s línea(s) ilegibles ignoradas (corte a mitad de escritura)", bad)
+        # de un PDF sin terminar solo se reanuda la primera pasada: su fallback se repite entero
+        for key, entries in self.entries.items():
+            if key not in self.finished: entries[:] = [e for e in entries if not e["fallback"]]
+        pages = sum(len(v) for v in self.entries.values())
+        LOGGER.info("Diario: %s página(s) ya extraídas, %s PDF terminados ➜ %s", pages, len(self.finished), self.path)
+
+    def _rewrite(self) -> None:
+        """Deja en el archivo solo lo cargado, de forma atómica."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                for key, entries in self.entries.items():
+                    for e in entries: f.write(json.dumps(e, ensure_ascii=False) + "\n")
+                    if key in self.finished: f.write(json.dumps({"key": key, "done": True}) + "\n")
+            os.replace(tmp, self.path)
+        except Exception:
+            Path(tmp).unlink(missing_ok=True); raise
+
+    def done(self, key: str) -> bool:
+        return key in self.finished
+
+    def rows(self, key: str) -> Tuple[List[Row], List[int], str]:
+        """Filas de un PDF terminado, con by_page y método como collect_batches."""
+        return collect_batches(PageBatch(e["page"], e["method"], [as_row(r) for r in e["rows"]], e["fallback"])
+                               for e in self.entries.get(key, []))
+
+    def pages(self, key: str) -> List[ResumedPage]:
+        """Páginas de la primera pasada ya extraídas de un PDF sin terminar."""
+        return [(PageBatch(e["page"], e["method"], [as_row(r) for r in e["rows"]]), e["kind"], e["chars"])
+                for e in self.entries.get(key, []) if not e["fallback"]]
+
+    def _file(self):
+        if self._fh is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = open(self.path, "a", encoding="utf-8")
+        return self._fh
+
+    def record(self, key: str, batch: PageBatch, kind: str = "", n_chars: int = 0) -> None:
+        self._file().write(json.dumps(_entry(key, batch, kind, n_chars), ensure_ascii=False) + "\n")
+        self._fh.flush()   # sobrevive a un cierre del proceso; el fsync queda para finish()
+
+    def finish(self, key: str) -> None:
+        self._file().write(json.dumps({"key": key, "done": True}) + "\n")
+        self._fh.flush(); os.fsync(self._fh.fileno())
+        self.finished.add(key)
+
+    def close(self) -> None:
+        if self._fh is not None and not self._fh.closed: self._fh.close()
+
+    def discard(self) -> None:
+        """Tras la escritura final: el diario ya no hace falta."""
+        self.close(); self.path.unlink(missing_ok=True)
+
+    def __enter__(self) -> "PageJournal": return self
+    def __exit__(self, *exc) -> None: self.close()
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+layout.py — Motor de filas por columnas (--engine columns)
+- Plantilla por documento: límites x de cada columna (huecos verticales que ninguna palabra cruza en las
+  líneas con Fecha + Hora) y el campo de cada columna según el encabezado (Fecha, Hora, Máq., Patente,
+  Folio, Var., Frec., Conductor, AB | SD | CI, %, EV | TE).
+- Por página: palabras con caja (page_words) → líneas → celdas por bisección de x. Una línea con fecha en
+  la columna Fecha abre una fila; las líneas pegadas debajo, sin nada en esa columna, son celdas envueltas
+  (último dígito de la placa, resto del folio) y se suman a sus columnas. Sin ventanas de tokens ni
+  reconstrucciones: una placa o un folio partido se juntan dentro de su columna.
+- Control cruzado con el parser de texto (_parse_block): en las páginas de muestra, las filas de una sola
+  línea deben dar lo mismo por ambos caminos (los campos que el texto deja vacíos no cuentan; una fila
+  que la plantilla no encuentra cuenta en contra) en al menos MIN_AGREEMENT; si no, el documento sigue
+  por texto. Las filas con celdas envueltas no se comparan: ahí el texto es el que se equivoca.
+- Plantillas en caché por generador (Producer/Creator + tamaño de página) en templates.json, dentro de la
+  carpeta de la caché: otro documento del mismo generador solo verifica la plantilla en una página.
+"""
+from __future__ import annotations
+import json, logging, os, re, tempfile, unicodedata
+from bisect import bisect
+from itertools import groupby
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+from cache import default_cache_dir
+from extractors import PCT_RE, clean_token, is_plate6, rows_from_text, normalize_space
+from schema import ROW_SCHEMA, Row
+from text_backends import Y_TOLERANCE, Word, cluster_ids, producer_key
+
+LOGGER = logging.getLogger("layout")
+TEMPLATES_FILE = "templates.json"
+LEARN_MAX_PAGES = 6       # páginas que se miran para aprender (se corta antes al juntar LEARN_LINES)
+LEARN_LINES = 60
+LEARN_MIN_LINES = 8
+HEADER_MIN_LABELS = 5
+MIN_AGREEMENT = 0.97
+MAX_WRAPPED_LINES = 2     # líneas de celdas envueltas por fila
+MAX_WRAPPED_CELLS = 3
+
+_DATE_RE = re.compile(r"\d{2}-\d{2}-\d{4}")
+_TIME_RE = re.compile(r"\d{2}:\d{2}:\d{2}")
+_COL = {c: i for i, c in enumerate(ROW_SCHEMA)}
+REQUIRED = ("Fecha", "Hora", "Folio")
+
+# títulos de columna (sin tildes, minúsculas, sin puntos) → campo
+HEADER_ALIASES = {
+    "fecha": "Fecha", "hora": "Hora", "maq": "Máquina", "maquina": "Máquina", "bus": "Máquina", "movil": "Máquina",
+    "patente": "Patente", "ppu": "Patente", "placa": "Patente", "folio": "Folio", "var": "Variante",
+    "variante": "Variante", "frec": "Frecuencia", "frecuencia": "Frecuencia", "conductor": "Conductor",
+    "ab": "AB", "sd": "SD", "ci": "CI", "%": "%", "ev": "EV", "te": "TE",
+}
+
+def _norm(word: str) -> str:
+    return unicodedata.normalize("NFKD", word).encode("ascii", "ignore").decode().lower().strip(".:")
+
+def _lines(words: Sequence[Word]) -> List[List[Word]]:
+    """Palabras → líneas (mismo agrupamiento por top que extract_text), cada una ordenada por x."""
+    if not words: return []
+    ids = cluster_ids([w[3] for w in words], Y_TOLERANCE)
+    ordered = sorted(words, key=lambda w: (ids[w[3]], w[1]))
+    return [list(g) for _, g in groupby(ordered, key=lambda w: ids[w[3]])]
+
+def _is_row_line(line: List[Word]) -> bool:
+    return bool(_DATE_RE.fullmatch(line[0][0])) and any(_TIME_RE.fullmatch(w[0]) for w in line)
+
+# ===== Celdas → campos (cada conversor recibe las palabras de la celda) =====
+def _first(pattern: re.Pattern) -> Callable[[List[str]], Optional[str]]:
+    return lambda toks: next((t for t in toks if pattern.fullmatch(t)), None)
+
+def _int(toks: List[str]) -> Optional[int]:
+    return int(toks[0]) if toks and toks[0].isdecimal() else None
+
+def _machine(toks: List[str]) -> Optional[int]:   # = _take_machine sobre la celda
+    return next((int(t) for t in toks if t.isdigit() and 1 <= len(t) <= 3), None)
+
+def _plate(toks: List[str]) -> Optional[str]:
+    joined = "".join(clean_token(t) for t in toks)
+    return joined[-6:] if len(joined) >= 6 and is_plate6(joined[-6:]) else None
+
+def _folio(toks: List[str]) -> Optional[str]:
+    joined = "".join(toks)
+    return joined if joined.isdecimal() and 12 <= len(joined) <= 14 else None
+
+def _pct(toks: List[str]) -> Optional[float]:
+    m = PCT_RE.search(" ".join(toks))
+    return float(m.group(1).replace(",", ".")) if m else None
+
+def _text(toks: List[str]) -> Optional[str]:
+    return normalize_space(" ".join(toks)) or None
+
+CONVERTERS: Dict[str, Callable[[List[str]], Any]] = {
+    "Fecha": _first(_DATE_RE), "Hora": _first(_TIME_RE), "Máquina": _machine, "Patente": _plate, "Folio": _folio,
+    "Variante": _int, "Frecuencia": _int, "Conductor": _text, "AB": _int, "SD": _int, "CI": _int,
+    "%": _pct, "EV": _int, "TE": _int,
+}
+
+class Template(NamedTuple):
+    bounds: Tuple[float, ...]              # x de corte entre columnas consecutivas
+    fields: Tuple[Tuple[str, ...], ...]    # campos de cada columna, en orden de ROW_SCHEMA (vacío: se ignora)
+
+    def _plan(self) -> List[Tuple[Tuple[str, ...], int, Optional[Callable[[List[str]], Any]]]]:
+        """Por columna: (campos, índice en ROW_SCHEMA y conversor si es un solo campo)."""
+        return [(f, _COL[f[0]], CONVERTERS[f[0]]) if len(f) == 1 else (f, -1, None) for f in self.fields]
+
+    def _row(self, plan: List[Tuple[Tuple[str, ...], int, Any]], cells: List[List[str]]) -> Optional[Row]:
+        vals: List[Any] = [None] * len(ROW_SCHEMA)
+        for (fields, col, conv), toks in zip(plan, cells):
+            if not toks or not fields: continue
+            if conv is not None:
+                vals[col] = conv(toks); continue
+            # varios campos en una celda ("48 | 87 | 27", "05-10-2024 02:16:07"): fecha/hora por patrón,
+            # el resto en orden si la cantidad calza
+            parts = [p for t in toks for p in t.split("|") if p]
+            rest = [f for f in fields if f not in ("Fecha", "Hora")]
+            for f in ("Fecha", "Hora"):
+                if f in fields: vals[_COL[f]] = CONVERTERS[f](parts)
+            parts = [p for p in parts if not (_DATE_RE.fullmatch(p) or _TIME_RE.fullmatch(p))]
+            if len(parts) == len(rest):
+                for f, p in zip(rest, parts): vals[_COL[f]] = CONVERTERS[f]([p])
+        if not vals[_COL["Folio"]] or not vals[_COL["Fecha"]]: return None
+        return Row(vals)
+
+    def scan(self, words: Sequence[Word]) -> List[Tuple[Row, int]]:
+        """(fila, líneas envueltas que se le sumaron) de una página a partir de sus palabras."""
+        fecha = next(k for k, f in enumerate(self.fields) if "Fecha" in f)
+        plan, bounds, n_cols, is_date = self._plan(), self.bounds, len(self.fields), _DATE_RE.fullmatch
+        out: List[Tuple[Row, int]] = []; cells: Optional[List[List[str]]] = None; wrapped = 0; bottom = 0.0
+        def close() -> None:
+            r = self._row(plan, cells)
+            if r: out.append((r, wrapped))
+        for line in _lines(words):
+            line_cells: List[List[str]] = [[] for _ in range(n_cols)]
+            top, line_bottom, height = line[0][3], line[0][4], 0.0
+            for text, x0, x1, w_top, w_bottom in line:
+                line_cells[bisect(bounds, (x0 + x1) / 2)].append(text)
+                if w_top < top: top = w_top
+                if w_bottom > line_bottom: line_bottom = w_bottom
+                if w_bottom - w_top > height: height = w_bottom - w_top
+            if any(map(is_date, line_cells[fecha])):
+                if cells is not None: close()
+                cells = line_cells; wrapped = 0
+            elif (cells is not None and not line_cells[fecha] and wrapped < MAX_WRAPPED_LINES
+                  and top - bottom < height and sum(map(bool, line_cells)) <= MAX_WRAPPED_CELLS):
+                for c, extra in zip(cells, line_cells): c.extend(extra)
+                wrapped += 1
+            elif cells is not None:
+                close(); cells = None
+            bottom = line_bottom
+        if cells is not None: close()
+        return out
+
+    def rows(self, words: Sequence[Word]) -> List[Row]:
+        """Filas de una página a partir de sus palabras."""
+        return [r for r, _ in self.scan(words)]
+
+def learn(pages: Iterable[Sequence[Word]]) -> Tuple[Optional[Template], str]:
+    """Plantilla a partir de las palabras de algunas páginas; (None, motivo) si no hay columnas claras."""
+    header: Optional[List[Tuple[str, float]]] = None; samples: List[List[Word]] = []
+    for words in pages:
+        for line in _lines(words):
+            if header is None:
+                labels = [(HEADER_ALIASES[n], (w[1] + w[2]) / 2) for w in line if (n := _norm(w[0])) in HEADER_ALIASES]
+                if len({f for f, _ in labels}) >= HEADER_MIN_LABELS: header = labels; continue
+            if _is_row_line(line): samples.append(line)
+    if header is None: return None, "sin encabezado reconocible"
+    if len(samples) < LEARN_MIN_LINES: return None, f"solo {len(samples)} líneas con Fecha y Hora"
+    # columnas = tramos de x cubiertos por alguna palabra; los huecos que ninguna cruza las separan
+    spans = sorted((w[1], w[2]) for line in samples for w in line)
+    cols = [list(spans[0])]
+    for x0, x1 in spans[1:]:
+        if x0 <= cols[-1][1]: cols[-1][1] = max(cols[-1][1], x1)
+        else: cols.append([x0, x1])
+    fields: List[List[str]] = [[] for _ in cols]
+    for field, cx in header:
+        k = min(range(len(cols)), key=lambda k: max(cols[k][0] - cx, cx - cols[k][1], 0))
+        if field not in fields[k]: fields[k].append(field)
+    # una columna sin título es parte de la de su izquierda (un apellido, el '|' de un par)
+    merged: List[List[float]] = []; merged_fields: List[Tuple[str, ...]] = []
+    for col, f in zip(cols, fields):
+        if not f and merged: merged[-1][1] = col[1]; continue
+        merged.append(col); merged_fields.append(tuple(sorted(f, key=_COL.__getitem__)))
+    missing = [f for f in REQUIRED if not any(f in fs for fs in merged_fields)]
+    if missing: return None, "faltan columnas: " + ", ".join(missing)
+    bounds = tuple((a[1] + b[0]) / 2 for a, b in zip(merged, merged[1:]))
+    return Template(bounds, tuple(merged_fields)), ""
+
+def cross_check(text_rows: List[Row], scanned: List[Tuple[Row, int]]) -> Tuple[int, int]:
+    """(coincidencias, filas comparadas) entre el texto y Template.scan: las filas se emparejan por
+    (Fecha, Hora, Máquina) y una fila del texto coincide si la plantilla da los mismos valores en todo
+    campo que el texto no deja vacío. No se comparan las filas que la plantilla armó con celdas
+    envueltas (con un folio envuelto el texto arma una fila con otro folio)."""
+    by_key = {(r[0], r[1], r[2]): (r, wrapped) for r, wrapped in scanned}
+    agree = total = 0
+    for r in text_rows:
+        t, wrapped = by_key.get((r[0], r[1], r[2]), (None, 0))
+        if wrapped: continue
+        total += 1
+        if t is not None and all(a is None or a == b for a, b in zip(r, t)): agree += 1
+    return agree, total
+
+class TemplateStore:
+    """Plantillas por generador en un JSON (pocas y chicas: se reescribe entero)."""
+
+    def __init__(self, path: str | Path | None = None):
+        self.path = Path(path) if path else default_cache_dir() / TEMPLATES_FILE
+
+    def _read(self) -> Dict[str, Any]:
+        try: return json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError: return {}
+        except Exception:
+            LOGGER.warning("Plantillas ilegibles, se ignoran: %s", self.path); return {}
+
+    def get(self, key: str) -> Optional[Template]:
+        d = self._read().get(key)
+        return Template(tuple(d["bounds"]), tuple(tuple(f) for f in d["fields"])) if d else None
+
+    def put(self, key: str, template: Template) -> None:
+        data = self._read(); data[key] = {"bounds": list(template.bounds), "fields": [list(f) for f in template.fields]}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f: json.dump(data, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.path)
+        except Exception:
+            Path(tmp).unlink(missing_ok=True); raise
+
+def document_template(doc: Any, store: Optional[TemplateStore] = None,
+                      texts: Optional[Dict[int, str]] = None,
+                      words: Optional[Dict[int, List[Word]]] = None) -> Optional[Template]:
+    """Plantilla para `doc` (un motor de text_backends): la del generador si pasa el control cruzado en
+    la primera página con filas; si no, una aprendida de las primeras páginas. None: seguir por texto.
+    `texts` / `words` guardan el texto y las palabras de las páginas de muestra (ExtractionSession los reutiliza)."""
+    texts = {} if texts is None else texts
+    words = {} if words is None else words
+    def page_words(i: int) -> List[Word]:
+        if i not in words: words[i] = doc.page_words(i)
+        return words[i]
+    def text_rows(i: int) -> List[Row]:
+        if i not in texts: texts[i] = doc.page_text(i)
+        return rows_from_text(texts[i])
+
+    key = producer_key(doc)
+    cached = store.get(key) if store and key else None
+    if cached:
+        for i in range(min(doc.n_pages, LEARN_MAX_PAGES)):
+            scanned = cached.scan(page_words(i))
+            if not scanned: continue
+            agree, total = cross_check(text_rows(i), scanned)
+            if total and agree / total >= MIN_AGREEMENT:
+                LOGGER.info("Plantilla de columnas en caché (%s)", key); return cached
+            break
+        LOGGER.info("La plantilla en caché de '%s' no calza con este documento; se aprende de nuevo", key)
+    pages: List[Tuple[int, List[Word]]] = []; n_lines = 0
+    for i in range(min(doc.n_pages, LEARN_MAX_PAGES)):
+        pages.append((i, page_words(i)))
+        n_lines += sum(_is_row_line(line) for line in _lines(words[i]))
+        if n_lines >= LEARN_LINES: break
+    template, why = learn(w for _, w in pages)
+    if template is None:
+        LOGGER.info("Sin plantilla de columnas (%s): se usa el texto", why); return None
+    agree = total = 0
+    for i, page in pages:
+        a, t = cross_check(text_rows(i), template.scan(page)); agree += a; total += t
+    if not total or agree / total < MIN_AGREEMENT:
+        LOGGER.info("Plantilla de columnas descartada (coincide con el texto en %s de %s filas): se usa el texto", agree, total)
+        return None
+    LOGGER.info("Plantilla de columnas aprendida: %s columnas, %s/%s filas iguales al texto", len(template.fields), agree, total)
+    if store and key: store.put(key, template)
+    return template
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""
+options.py — Nombres y valores por defecto de las opciones de la CLI y la GUI
+Sin dependencias (ni pdfplumber, ni pandas, ni openpyxl): `pdf2excel --help` y la primera pintura de la
+GUI se arman solo con esto, y los módulos que hacen el trabajo se importan al correr un comando o un
+trabajo. Los módulos dueños toman de acá sus valores (text_backends, extractors, sinks, cache, watcher);
+los nombres deben coincidir con TEXT_BACKENDS y SINKS.
+"""
+TEXT_BACKEND_NAMES = ("pdfplumber", "pdfminer")
+DEFAULT_TEXT_BACKEND = "pdfplumber"
+# Motor de filas: text (texto de la página → _parse_block) o columns (plantilla de columnas, layout.py)
+ENGINES = ("text", "columns")
+DEFAULT_ENGINE = "text"
+SINK_FORMATS = ("csv", "parquet", "sqlite")
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_FLUSH_ROWS = 5000
+DEFAULT_FLUSH_SECONDS = 30.0
+DEFAULT_SETTLE_SECONDS = 2.0
+DEFAULT_POLL_SECONDS = 2.0
@@ -1,46 +1,403 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
-import argparse, logging
-from typing import List, Dict, Any
-from extractors import parse_pdf_any
-from excel_io import append_and_dedup, create_new_excel
+import argparse, logging, multiprocessing, sys
+from itertools import chain
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, List, Dict, Any, Generator, Iterator, Optional, Tuple
+from options import (DEFAULT_CACHE_MAX_BYTES, DEFAULT_ENGINE, DEFAULT_FLUSH_ROWS, DEFAULT_FLUSH_SECONDS, DEFAULT_POLL_SECONDS,
+                     DEFAULT_SETTLE_SECONDS, DEFAULT_TEXT_BACKEND, ENGINES, SINK_FORMATS, TEXT_BACKEND_NAMES)
+import profiling
+
+# extracción y escritura se importan dentro de cada comando (pdfplumber, pandas, openpyxl): --help y los
+# comandos que no las usan arrancan sin cargarlas (ver benchmarks/check_startup.py)
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+    from cache import ExtractionCache
+    from extractors import ExtractionSession, PageBatch
+    from journal import PageJournal, ResumedPage
+    from policy import MethodPolicy
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 LOGGER = logging.getLogger("pdf2excel")
+# comandos que, con un `pdf2excel serve` corriendo, se mandan al servidor (salvo --no-server)
+SERVED_COMMANDS = ("create", "append")
+# progress(pdf, páginas hechas, páginas del PDF, detalle): avance por página para la GUI (ver iter_rows)
+Progress = Callable[[str, int, int, str], None]
+
+def _page_label(session: ExtractionSession, batch: PageBatch) -> str:
+    if batch.fallback:
+        where = f" p{batch.page + 1}" if batch.page is not None else ""
+        return f"fallback {batch.method}{where}: filas={len(batch.rows)}"
+    kind = session.page_kinds[batch.page] if batch.page < len(session.page_kinds) else ""
+    if kind == "skip": return f"p{batch.page + 1}: sin Fecha/Hora (pre-filtro)"
+    return f"p{batch.page + 1}: {'OCR ' if batch.method == 'ocr' else ''}filas={len(batch.rows)}"
+
+def _drain(pdf: str, key: Optional[str], session: ExtractionSession, cache: Optional[ExtractionCache],
+           totals: Dict[str, int], fallback: bool = True, journal: Optional[PageJournal] = None,
+           resumed: List[ResumedPage] = (), cancel: Optional[Callable[[], None]] = None,
+           progress: Optional[Progress] = None) -> Generator[Dict[str, Any], None, bool]:
+    """Entrega las filas de la sesión (antes, las de `resumed`: páginas ya extraídas según el diario);
+    False si se detuvo tras el texto sin filas (queda para tabula en lote). Cada lote nuevo se anota
+    en el diario antes de entregar sus filas."""
+    from extractors import collect_batches
+    batches: List[PageBatch] = []; n_rows = 0; methods: List[str] = []
+    done = len(resumed)
+    if resumed and progress:
+        progress(pdf, done, session.n_pages, f"diario: {done} páginas ya extraídas, filas={sum(len(b.rows) for b, _, _ in resumed)}")
+    profiling.set_pdf(pdf)
+    fresh = profiling.timed_iter(session.iter_batches(fallback), "extract_pdf")
+    try:
+        for batch, new in chain(((b, False) for b, _, _ in resumed), ((b, True) for b in fresh)):
+            if journal and new:
+                page = None if batch.fallback else batch.page
+                journal.record(key, batch, *((session.page_kinds[page], session.text_chars[page]) if page is not None else ()))
+            if cancel: cancel()
+            if new and progress and (not batch.fallback or batch.rows or batch.page is None):
+                if not batch.fallback: done += 1
+                progress(pdf, done, session.n_pages, _page_label(session, batch))
+            if batch.rows and batch.method not in methods: methods.append(batch.method)
+            n_rows += len(batch.rows)
+            if cache: batches.append(batch)
+            yield from batch.rows
+    finally:
+        close = getattr(fresh, "close", None)
+        if close: close()   # cancela las páginas pendientes en el pool (cancelación o error del consumidor)
+    if not n_rows and not fallback: return False
+    source = "+".join(methods) or "none"
+    skipped = session.page_kinds.count("skip")
+    LOGGER.info("PDF '%s' ➜ método=%s | páginas=%s%s | filas=%s", pdf, source, session.n_pages,
+                f" ({skipped} descartadas por el pre-filtro)" if skipped else "", n_rows)
+    prof = profiling.active()
+    if prof: prof.pdf_info(pdf, method=source, pages=session.n_pages, rows=n_rows)
+    totals["pdfs"] += 1; totals["rows"] += n_rows
+    if cache and n_rows and session.policy_skipped:
+        # la clave de la caché no incluye la política: una corrida con --no-policy debe poder correr esos respaldos
+        LOGGER.info("PDF '%s': no se guarda en la caché (la política saltó %s)", pdf, ", ".join(session.policy_skipped))
+    elif cache and n_rows:
+        rows, by_page, source = collect_batches(batches)
+        with profiling.stage("cache_put"): cache.put(key, rows, by_page, source, str(pdf))
+    if journal: journal.finish(key)
+    profiling.set_pdf(None)
+    return True
+
+def iter_rows(pdf_paths: List[str], use_ocr: bool, workers: int = 1,
+              cache: Optional[ExtractionCache] = None, totals: Optional[Dict[str, int]] = None,
+              backend: str = DEFAULT_TEXT_BACKEND, journal: Optional[PageJournal] = None,
+              engine: str = DEFAULT_ENGINE, policy: Optional[MethodPolicy] = None,
+              executor: Optional[Executor] = None, cancel: Optional[Callable[[], None]] = None,
+              progress: Optional[Progress] = None, cache_dir: Optional[str] = None,
+              counts: Optional[Dict[str, int]] = None) -> Iterator[Dict[str, Any]]:
+    """Filas de todos los PDF, página a página (para escribir a medida que se extraen).
+    Si se pasa `totals`, acumula ahí 'pdfs' y 'rows'; `counts`, las filas de cada PDF terminado.
+    `backend`: motor de texto (pdfplumber / pdfminer); `engine`: motor de filas (text / columns, ver
+    layout.py; sus plantillas van a `cache_dir`). `policy`: respaldos a saltar por generador del PDF (se
+    guarda al terminar).
+    `journal`: diario de páginas; las ya anotadas (--resume) no se vuelven a extraer. `executor`: pool de
+    procesos ya lanzado (el del servidor) en vez de uno propio, si workers > 1.
+    `cancel`: se llama entre páginas y entre PDF; para detener la corrida levanta una excepción (la GUI).
+    `progress(pdf, páginas hechas, páginas, detalle)`: una llamada por página terminada, por respaldo con
+    filas y por PDF leído de la caché o del diario.
+    Con tabula instalado y varios PDF, los que no dan filas por texto se resuelven al final con una
+    sola pasada de tabula (misma JVM); sus filas salen después de las de los PDF resueltos por texto."""
+    from concurrent.futures import ProcessPoolExecutor
+    from cache import extraction_key
+    from extractors import ExtractionSession, prefetch_tabula, resolve_workers, tabula_available
+    totals = totals if totals is not None else {}
+    totals.setdefault("pdfs", 0); totals.setdefault("rows", 0)
+    workers = resolve_workers(workers)
+    batch_tabula = tabula_available() and len(pdf_paths) > 1
+    # un solo pool para todos los PDF (evita relanzar procesos por archivo)
+    own_pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and executor is None else None
+    pool = (executor or own_pool) if workers > 1 else None
+    deferred: List[Tuple[str, Optional[str], ExtractionSession]] = []
+    try:
+        for pdf in pdf_paths:
+            if cancel: cancel()
+            profiling.set_pdf(pdf)
+            with profiling.stage("cache_get"):
+                key = extraction_key(pdf, use_ocr, backend, engine) if cache or journal else None
+                hit = cache.get(key) if cache else None
+            profiling.set_pdf(None)
+            if not hit and journal and journal.done(key): hit = journal.rows(key); hit_from = "diario"
+            else: hit_from = "caché"
+            if hit:
+                rows, by_page, source = hit
+                LOGGER.info("PDF '%s' ➜ método=%s (%s) | filas=%s", pdf, source, hit_from, len(rows))
+                prof = profiling.active()
+                if prof: prof.pdf_info(pdf, method=source, pages=len(by_page), rows=len(rows), cached=True)
+                if progress: progress(pdf, len(by_page), len(by_page), f"{hit_from} ({source}): filas={len(rows)}")
+                totals["pdfs"] += 1; totals["rows"] += len(rows)
+                if counts is not None: counts[pdf] = len(rows)
+                yield from rows; continue
+            profiling.set_pdf(pdf)
+            session = ExtractionSession(pdf, use_ocr, workers, pool, backend, engine=engine, policy=policy,
+                                        cache_dir=cache_dir)
+            resumed = journal.pages(key) if journal else []
+            if resumed:
+                session.resume(resumed)
+                LOGGER.info("PDF '%s': %s de %s páginas ya extraídas (diario)", pdf, len(resumed), session.n_pages)
+            before = totals["rows"]
+            try:
+                done = yield from _drain(pdf, key, session, cache, totals, not batch_tabula, journal, resumed, cancel, progress)
+            except BaseException:
+                session.close(); raise
+            if done:
+                session.close()
+                if counts is not None: counts[pdf] = totals["rows"] - before
+            else: deferred.append((pdf, key, session))
+        if deferred:
+            if cancel: cancel()
+            with profiling.stage("tabula_batch", per_pdf=False):
+                n = prefetch_tabula(s for _, _, s in deferred)
+            LOGGER.info("Tabula en lote: %s PDF sin filas de texto", n)
+            for pdf, key, session in deferred:
+                before = totals["rows"]
+                yield from _drain(pdf, key, session, cache, totals, journal=journal, cancel=cancel, progress=progress)
+                session.close()
+                if counts is not None: counts[pdf] = totals["rows"] - before
+    finally:
+        for _, _, session in deferred: session.close()
+        if own_pool is not None: own_pool.shutdown(cancel_futures=True)
+        if policy is not None: policy.save()
+
+def process_pdfs(pdf_paths: List[str], use_ocr: bool, workers: int = 1,
+                 cache: Optional[ExtractionCache] = None, backend: str = DEFAULT_TEXT_BACKEND,
+                 journal: Optional[PageJournal] = None, engine: str = DEFAULT_ENGINE,
+                 policy: Optional[MethodPolicy] = None) -> List[Dict[str, Any]]:
+    return list(iter_rows(pdf_paths, use_ocr, workers, cache, backend=backend, journal=journal, engine=engine, policy=policy))
+
+def _journal_from_args(args: argparse.Namespace, target: str) -> Optional[PageJournal]:
+    if args.no_journal:
+        if args.resume: raise SystemExit("--resume necesita el diario (no use --no-journal).")
+        return None
+    from journal import PageJournal
+    return PageJournal(target, resume=args.resume)
 
-def process_pdfs(pdf_paths: List[str], use_ocr: bool) -> List[Dict[str, Any]]:
-    all_rows: List[Dict[str, Any]] = []
-    for pdf in pdf_paths:
-        rows, by_page, source = parse_pdf_any(pdf, use_ocr)
-        total = sum(by_page) if by_page else len(rows)
-        LOGGER.info("PDF '%s' ➜ método=%s | filas=%s", pdf, source, total)
-        all_rows.extend(rows)
-    return all_rows
+def _policy_from_args(args: argparse.Namespace) -> Optional[MethodPolicy]:
+    if args.no_policy: return None
+    from policy import MethodPolicy, POLICY_FILE
+    return MethodPolicy(Path(args.cache_dir) / POLICY_FILE if args.cache_dir else None)
+
+def _cache_from_args(args: argparse.Namespace) -> Optional[ExtractionCache]:
+    if getattr(args, "no_cache", False): return None
+    from cache import ExtractionCache
+    return ExtractionCache(args.cache_dir, int(args.cache_max_mb * 1024 * 1024))
+
+def _export(sink, args: argparse.Namespace) -> None:
+    if args.export_excel:
+        from sinks import export_excel
+        LOGGER.info("Exportado a Excel: %s", export_excel(sink, args.export_excel))
+
+def _archive_from_args(args: argparse.Namespace) -> Optional[Any]:
+    """Índice del archivo (--archive), puesto al día antes de consultar."""
+    if not args.archive: return None
+    from archive import ArchiveIndex
+    if not Path(args.archive).is_dir(): raise SystemExit(f"No existe la carpeta del archivo: {args.archive}")
+    archive = ArchiveIndex(args.archive)
+    with profiling.stage("archive_update", per_pdf=False): archive.update()
+    return archive
 
 def cmd_create(args: argparse.Namespace) -> None:
-    rows = process_pdfs(args.pdf, args.ocr)
-    if not rows: LOGGER.warning("No se detectaron filas.")
+    from excel_io import create_new_excel
+    from sinks import open_sink, sink_format
     if not args.out: raise SystemExit("Debe indicar --out para 'create'.")
-    path = create_new_excel(args.out, rows); LOGGER.info("Escritura: %s", path)
+    totals: Dict[str, int] = {}
+    archive = _archive_from_args(args)
+    journal = _journal_from_args(args, args.out)
+    rows = iter_rows(args.pdf, args.ocr, args.workers, _cache_from_args(args), totals, args.text_backend, journal, args.engine,
+                     _policy_from_args(args), getattr(args, "executor", None), cache_dir=args.cache_dir)
+    if archive: rows = archive.reject_known(rows, exclude=[args.out])
+    try:
+        if sink_format(args.out, args.format) == "excel":
+            path = create_new_excel(args.out, rows)
+        else:
+            sink = open_sink(args.out, args.format); sink.reset(); sink.append(rows); path = str(sink.path)
+            _export(sink, args)
+        if archive: archive.record(path, replace=True)
+    finally:
+        if journal: journal.close()
+        if archive: archive.close()
+    if journal: journal.discard()   # escritura final hecha: ya no hay nada que reanudar
+    if not totals["rows"]: LOGGER.warning("No se detectaron filas.")
+    LOGGER.info("Escritura: %s", path)
 
 def cmd_append(args: argparse.Namespace) -> None:
-    rows = process_pdfs(args.pdf, args.ocr)
-    if not rows: LOGGER.warning("No se detectaron filas.")
+    from excel_io import append_and_dedup, append_incremental
+    from sinks import open_sink, sink_format
     if not args.excel: raise SystemExit("Debe indicar --excel para 'append'.")
-    path = append_and_dedup(args.excel, rows, args.out); LOGGER.info("Append + dedup: %s", path)
+    totals: Dict[str, int] = {}
+    store = sink_format(args.excel, args.format) != "excel"
+    if store and args.out: raise SystemExit("--out solo aplica a libros Excel; los almacenes CSV/Parquet/SQLite se amplían en el lugar.")
+    archive = _archive_from_args(args)
+    journal = _journal_from_args(args, args.out or args.excel)
+    rows = iter_rows(args.pdf, args.ocr, args.workers, _cache_from_args(args), totals, args.text_backend, journal, args.engine,
+                     _policy_from_args(args), getattr(args, "executor", None), cache_dir=args.cache_dir)
+    # el destino (y el libro base) deduplican por su cuenta: el índice solo mira los demás libros
+    if archive: rows = archive.reject_known(rows, exclude=[args.excel, args.out or args.excel])
+    try:
+        if store:
+            sink = open_sink(args.excel, args.format); sink.append(rows); path = str(sink.path)
+            _export(sink, args)
+        else:
+            append = append_incremental if args.incremental else append_and_dedup
+            path = append(args.excel, rows, args.out)
+        if archive: archive.record(path, replace=False)
+    finally:
+        if journal: journal.close()
+        if archive: archive.close()
+    if journal: journal.discard()
+    if not totals["rows"]: LOGGER.warning("No se detectaron filas.")
+    LOGGER.info("Append + dedup: %s", path)
+
+def cmd_export(args: argparse.Namespace) -> None:
+    from sinks import export_excel, open_sink
+    sink = open_sink(args.store, args.format)
+    if not sink.exists(): raise SystemExit(f"No existe el almacén: {args.store}")
+    LOGGER.info("Exportado a Excel: %s", export_excel(sink, args.out))
+
+def cmd_watch(args: argparse.Namespace) -> None:
+    from watcher import FolderWatcher
+    if not Path(args.folder).is_dir(): raise SystemExit(f"No existe la carpeta: {args.folder}")
+    cache, policy = _cache_from_args(args), _policy_from_args(args)
+    # todos los PDF listos en una pasada van en una sola llamada: un pool y un lote de tabula
+    extract = lambda pdfs, counts: iter_rows(pdfs, args.ocr, args.workers, cache, backend=args.text_backend, engine=args.engine,
+                                             policy=policy, cache_dir=args.cache_dir, counts=counts)
+    watcher = FolderWatcher(args.folder, args.excel, extract, args.format, incremental=not args.full_rewrite,
+                            recursive=args.recursive, flush_rows=args.flush_rows, flush_seconds=args.flush_seconds,
+                            settle_seconds=args.settle_seconds)
+    if args.once: watcher.run_once(); return
+    watcher.install_signal_handlers()
+    watcher.run(args.poll_seconds)
+
+def cmd_index(args: argparse.Namespace) -> None:
+    from archive import ArchiveIndex
+    if not Path(args.folder).is_dir(): raise SystemExit(f"No existe la carpeta: {args.folder}")
+    with ArchiveIndex(args.folder) as archive:
+        stats = archive.update(args.recursive or None)
+    if stats["errors"]: LOGGER.warning("%s archivo(s) no se pudieron indexar", stats["errors"])
+
+def cmd_serve(args: argparse.Namespace) -> None:
+    import server
+    if args.status or args.stop:
+        try: st = server.request("GET", "/status") if args.status else server.request("POST", "/shutdown")
+        except OSError as e: raise SystemExit(f"Servidor no disponible: {e}")
+        LOGGER.info("Servidor: %s", st if args.status else "detenido"); return
+    server.serve(args.host, args.port, args.workers)
+
+def cmd_cache(args: argparse.Namespace) -> None:
+    cache = _cache_from_args(args)
+    if args.action == "prune":
+        n = cache.prune(); LOGGER.info("Entradas expulsadas: %s", n)
+    elif args.action == "clear":
+        n = cache.clear(); LOGGER.info("Entradas borradas: %s", n)
+    st = cache.stats()
+    LOGGER.info("Caché: %s | entradas=%s | %.1f/%.1f MB", st["root"], st["entries"],
+                st["bytes"] / 2**20, st["max_bytes"] / 2**20)
+
+def _add_cache_args(p: argparse.ArgumentParser, toggle: bool = True) -> None:
+    p.add_argument("--cache-dir", help="Carpeta de la caché de extracciones (def: PDF2EXCEL_CACHE_DIR o ~/.cache/pdf2excel)")
+    p.add_argument("--cache-max-mb", type=float, default=DEFAULT_CACHE_MAX_BYTES / 2**20, help="Tamaño máximo de la caché (MB)")
+    if toggle: p.add_argument("--no-cache", action="store_true", help="No leer ni escribir la caché de extracciones")
+
+FORMATS = ["excel", *SINK_FORMATS]
+
+def _add_format_args(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--format", choices=FORMATS,
+                   help="Destino: excel, csv, parquet (carpeta por mes) o sqlite (def: según la extensión)")
+    p.add_argument("--export-excel", metavar="ARCHIVO.xlsx", help="Con un almacén CSV/Parquet/SQLite, exportar además su contenido a Excel")
+
+def _add_profile_arg(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--profile", nargs="?", const="", metavar="ARCHIVO.json",
+                   help="Medir tiempo, llamadas y filas por etapa y por PDF; resumen en el log y, si se indica, JSON en ARCHIVO")
+
+def _add_journal_args(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--resume", action="store_true",
+                   help="Reanudar una corrida interrumpida: las páginas ya anotadas en <destino>.journal.jsonl no se vuelven a extraer")
+    p.add_argument("--no-journal", action="store_true", help="No anotar cada página terminada en el diario")
+
+def _add_archive_arg(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--archive", metavar="CARPETA",
+                   help="Carpeta de libros históricos (ver 'index'): descartar filas cuya clave ya está en otro libro de la carpeta")
+
+def _add_backend_arg(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--text-backend", choices=list(TEXT_BACKEND_NAMES), default=DEFAULT_TEXT_BACKEND,
+                   help="Motor de texto: pdfplumber (def) o pdfminer (pdfminer.six directo, más liviano; mismas filas)")
+    p.add_argument("--engine", choices=list(ENGINES), default=DEFAULT_ENGINE,
+                   help="Motor de filas: text (def) o columns (plantilla de columnas aprendida de las palabras; "
+                        "se valida contra el texto y, si no coincide, se usa text)")
+    p.add_argument("--no-policy", action="store_true",
+                   help="No consultar ni actualizar la política de métodos por generador (policy.json en la carpeta de la caché)")
+
+def _add_server_arg(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--no-server", action="store_true",
+                   help="Correr en este proceso aunque haya un 'pdf2excel serve' corriendo (por defecto se le manda el trabajo)")
+
+WORKERS_HELP = "Procesos para extraer páginas en paralelo (1 = serial, 0 = todos los núcleos)"
 
 def build_parser() -> argparse.ArgumentParser:
     p = argparse.ArgumentParser(description="PDF → Excel (Datos)")
     sub = p.add_subparsers(dest="command", required=True)
     p_create = sub.add_parser("create", help="Crear nuevo Excel")
     p_create.add_argument("--pdf", nargs="+", required=True); p_create.add_argument("--out", required=True)
-    p_create.add_argument("--ocr", action="store_true"); p_create.set_defaults(func=cmd_create)
+    p_create.add_argument("--ocr", action="store_true"); p_create.add_argument("--workers", type=int, default=1, help=WORKERS_HELP)
+    _add_backend_arg(p_create); _add_server_arg(p_create); _add_archive_arg(p_create); _add_journal_args(p_create); _add_cache_args(p_create); _add_profile_arg(p_create); _add_format_args(p_create); p_create.set_defaults(func=cmd_create)
     p_append = sub.add_parser("append", help="Agregar a Excel (sin duplicar)")
-    p_append.add_argument("--excel", required=True); p_append.add_argument("--pdf", nargs="+", required=True)
-    p_append.add_argument("--out"); p_append.add_argument("--ocr", action="store_true"); p_append.set_defaults(func=cmd_append)
+    p_append.add_argument("--excel", required=True, help="Libro .xlsx o almacén (.csv, .parquet, .sqlite) destino"); p_append.add_argument("--pdf", nargs="+", required=True)
+    p_append.add_argument("--out"); p_append.add_argument("--ocr", action="store_true")
+    p_append.add_argument("--workers", type=int, default=1, help=WORKERS_HELP)
+    p_append.add_argument("--incremental", action="store_true",
+                          help="Agregar solo las filas nuevas al final de 'Datos' sin reescribir el libro completo")
+    _add_backend_arg(p_append); _add_server_arg(p_append); _add_archive_arg(p_append); _add_journal_args(p_append); _add_cache_args(p_append); _add_profile_arg(p_append); _add_format_args(p_append); p_append.set_defaults(func=cmd_append)
+    p_export = sub.add_parser("export", help="Exportar un almacén CSV/Parquet/SQLite a Excel")
+    p_export.add_argument("--store", required=True); p_export.add_argument("--out", required=True)
+    p_export.add_argument("--format", choices=list(SINK_FORMATS)); p_export.set_defaults(func=cmd_export)
+    p_watch = sub.add_parser("watch", help="Vigilar una carpeta y agregar sus PDF nuevos o cambiados (en lotes)")
+    p_watch.add_argument("folder"); p_watch.add_argument("--excel", required=True, help="Libro .xlsx o almacén (.csv, .parquet, .sqlite) destino")
+    p_watch.add_argument("--format", choices=FORMATS); p_watch.add_argument("--ocr", action="store_true")
+    p_watch.add_argument("--workers", type=int, default=1, help=WORKERS_HELP)
+    p_watch.add_argument("--recursive", action="store_true", help="Incluir subcarpetas")
+    p_watch.add_argument("--flush-rows", type=int, default=DEFAULT_FLUSH_ROWS, help="Escribir al juntar estas filas")
+    p_watch.add_argument("--flush-seconds", type=float, default=DEFAULT_FLUSH_SECONDS, help="…o a los N segundos del primer PDF pendiente")
+    p_watch.add_argument("--settle-seconds", type=float, default=DEFAULT_SETTLE_SECONDS, help="Segundos sin cambios antes de leer un PDF")
+    p_watch.add_argument("--poll-seconds", type=float, default=DEFAULT_POLL_SECONDS, help="Intervalo de sondeo de la carpeta")
+    p_watch.add_argument("--full-rewrite", action="store_true", help="Excel: usar append_and_dedup (reescribe el libro) en vez del append incremental")
+    p_watch.add_argument("--once", action="store_true", help="Procesar lo que haya, escribir y salir (para tareas programadas)")
+    _add_backend_arg(p_watch); _add_cache_args(p_watch); p_watch.set_defaults(func=cmd_watch)
+    p_index = sub.add_parser("index", help="Indexar las claves (Folio, Fecha, Máquina) de una carpeta de libros/almacenes (incremental)")
+    p_index.add_argument("folder")
+    p_index.add_argument("--recursive", action="store_true", help="Incluir subcarpetas (queda guardado en el índice)")
+    p_index.set_defaults(func=cmd_index)
+    p_serve = sub.add_parser("serve", help="Servidor local en caliente: create/append se le mandan solos mientras corre")
+    p_serve.add_argument("--host", default="127.0.0.1"); p_serve.add_argument("--port", type=int, default=0, help="Puerto (def: uno libre)")
+    p_serve.add_argument("--workers", type=int, default=0, help="Procesos del pool, lanzados al arrancar (def: todos los núcleos)")
+    p_serve.add_argument("--status", action="store_true", help="Mostrar el estado del servidor corriendo")
+    p_serve.add_argument("--stop", action="store_true", help="Detener el servidor corriendo")
+    p_serve.set_defaults(func=cmd_serve)
+    p_cache = sub.add_parser("cache", help="Inspeccionar / podar la caché de extracciones")
+    p_cache.add_argument("action", nargs="?", choices=["info", "prune", "clear"], default="info")
+    _add_cache_args(p_cache, toggle=False); p_cache.set_defaults(func=cmd_cache)
     return p
 
-def main():
-    parser = build_parser(); args = parser.parse_args(); args.func(args)
+def run_command(args: argparse.Namespace) -> None:
+    """Corre el comando ya parseado (con --profile si se pidió); también lo usa el servidor."""
+    profile = getattr(args, "profile", None)
+    if profile is None: args.func(args); return
+    profiling.start()
+    try:
+        args.func(args)
+    finally:
+        prof = profiling.stop()
+        LOGGER.info("%s", prof.text())
+        if profile: prof.write(profile); LOGGER.info("Perfil JSON: %s", profile)
+
+def main(argv: Optional[List[str]] = None):
+    multiprocessing.freeze_support()
+    argv = sys.argv[1:] if argv is None else argv
+    parser = build_parser(); args = parser.parse_args(argv)
+    if args.command in SERVED_COMMANDS and not args.no_server:
+        from server import remote_run
+        code = remote_run(argv)
+        if code is not None: raise SystemExit(code)
+    run_command(args)
 
 if __name__ == "__main__": main()
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+policy.py — Política de métodos de respaldo por generador del PDF
+- Clave: Producer|Creator|tamaño de página (text_backends.producer_key); sin Producer ni Creator no se aplica.
+- Por clave y método (text, tabula, ocr): intentos, intentos con filas y saltos. Un respaldo que en
+  POLICY_MIN_ATTEMPTS documentos de ese generador nunca dio filas se salta; cada POLICY_RETRY_EVERY
+  saltos se vuelve a probar una vez (por si el generador cambió de formato).
+- policy.json en la carpeta de la caché; se escribe al terminar cada corrida (save), de forma atómica.
+"""
+from __future__ import annotations
+import json, logging, os, tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+from cache import default_cache_dir
+
+LOGGER = logging.getLogger("policy")
+POLICY_FILE = "policy.json"
+POLICY_MIN_ATTEMPTS = 3
+POLICY_RETRY_EVERY = 20
+
+class MethodPolicy:
+    """Qué métodos dieron filas para cada generador de PDF y cuáles conviene saltar."""
+
+    def __init__(self, path: str | Path | None = None):
+        self.path = Path(path) if path else default_cache_dir() / POLICY_FILE
+        self.data: Dict[str, Dict[str, List[int]]] = self._read()
+        self.dirty = False
+
+    def _read(self) -> Dict[str, Dict[str, List[int]]]:
+        try: return json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError: return {}
+        except Exception:
+            LOGGER.warning("Política de métodos ilegible, se ignora: %s", self.path); return {}
+
+    def _stats(self, key: str, method: str) -> List[int]:
+        return self.data.setdefault(key, {}).setdefault(method, [0, 0, 0])   # intentos, con filas, saltos
+
+    def skip(self, key: Optional[str], method: str) -> bool:
+        """True si `method` nunca dio filas para este generador (y no toca volver a probarlo)."""
+        if key is None: return False
+        st = self.data.get(key, {}).get(method)
+        if not st or st[0] < POLICY_MIN_ATTEMPTS or st[1]: return False
+        st[2] += 1; self.dirty = True
+        if st[2] % POLICY_RETRY_EVERY == 0: return False
+        LOGGER.info("Política: se salta %s (sin filas en %s documentos de '%s')", method, st[0], key)
+        return True
+
+    def record(self, key: Optional[str], method: str, rows: int) -> None:
+        if key is None: return
+        st = self._stats(key, method); st[0] += 1; st[1] += bool(rows); self.dirty = True
+
+    def save(self) -> None:
+        if not self.dirty: return
+        data = self._read(); data.update(self.data)   # otras claves escritas por otra corrida se conservan
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f: json.dump(data, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.path)
+        except Exception:
+            Path(tmp).unlink(missing_ok=True); raise
+        self.data = data; self.dirty = False
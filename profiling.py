@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+profiling.py — Perfil por etapa (--profile en la CLI, panel "Perfil" en la GUI)
+- Tiempo de pared, llamadas y filas por etapa, en total y por PDF.
+- Desactivado (por defecto): stage() devuelve un contexto nulo compartido, sin medir ni reservar nada.
+- Los segundos de etapas que corren en hilos (OCR) o procesos hijos se suman: pueden superar el total.
+"""
+from __future__ import annotations
+import json, threading, time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+class Stat:
+    __slots__ = ("seconds", "calls", "rows")
+    def __init__(self) -> None: self.seconds = 0.0; self.calls = 0; self.rows = 0
+    def as_dict(self) -> Dict[str, Any]:
+        return {"seconds": round(self.seconds, 4), "calls": self.calls, "rows": self.rows}
+
+class Profiler:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.stages: Dict[str, Stat] = {}
+        self.pdfs: Dict[str, Dict[str, Any]] = {}
+        self.pdf: Optional[str] = None       # PDF en curso: las etapas con per_pdf=True se le atribuyen
+        self.t0 = time.perf_counter(); self.wall: Optional[float] = None
+
+    def add(self, name: str, seconds: float, calls: int = 1, rows: int = 0, per_pdf: bool = True) -> None:
+        with self.lock:
+            buckets = [self.stages]
+            if per_pdf and self.pdf is not None: buckets.append(self.pdfs[self.pdf]["stages"])
+            for b in buckets:
+                st = b.get(name) or b.setdefault(name, Stat())
+                st.seconds += seconds; st.calls += calls; st.rows += rows
+
+    def set_pdf(self, path: Optional[str]) -> None:
+        if path is not None: self.pdfs.setdefault(str(path), {"stages": {}})
+        self.pdf = None if path is None else str(path)
+
+    def pdf_info(self, path: str, **info: Any) -> None:
+        self.pdfs.setdefault(str(path), {"stages": {}}).update(info)
+
+    def snapshot(self) -> Dict[str, List[float]]:
+        """Etapas en forma serializable (para devolverlas desde un proceso hijo)."""
+        return {k: [v.seconds, v.calls, v.rows] for k, v in self.stages.items()}
+
+    def merge(self, snap: Dict[str, List[float]]) -> None:
+        for name, (seconds, calls, rows) in snap.items(): self.add(name, seconds, int(calls), int(rows))
+
+    def report(self) -> Dict[str, Any]:
+        wall = self.wall if self.wall is not None else time.perf_counter() - self.t0
+        return {"wall_seconds": round(wall, 4),
+                "stages": {k: v.as_dict() for k, v in self.stages.items()},
+                "pdfs": {p: {**{k: v for k, v in info.items() if k != "stages"},
+                             "stages": {k: v.as_dict() for k, v in info["stages"].items()}}
+                         for p, info in self.pdfs.items()}}
+
+    def text(self) -> str:
+        rep = self.report()
+        lines = [f"Perfil: {rep['wall_seconds']:.3f}s de pared",
+                 f"  {'etapa':<22}{'seg':>10}{'%':>7}{'llamadas':>10}{'filas':>10}"]
+        wall = rep["wall_seconds"] or 1.0
+        for name, st in sorted(rep["stages"].items(), key=lambda kv: -kv[1]["seconds"]):
+            lines.append(f"  {name:<22}{st['seconds']:>10.3f}{100 * st['seconds'] / wall:>6.1f}%{st['calls']:>10}{st['rows']:>10}")
+        for path, info in rep["pdfs"].items():
+            extra = " ".join(f"{k}={v}" for k, v in info.items() if k != "stages")
+            top = ", ".join(f"{k} {v['seconds']:.3f}s" for k, v in
+                            sorted(info["stages"].items(), key=lambda kv: -kv[1]["seconds"])[:4])
+            lines.append(f"  PDF {Path(path).name}: {extra} | {top}")
+        return "\n".join(lines)
+
+    def write(self, path: str | Path) -> None:
+        Path(path).write_text(json.dumps(self.report(), indent=2, ensure_ascii=False), encoding="utf-8")
+
+class _Span:
+    __slots__ = ("prof", "name", "per_pdf", "calls", "rows", "t0")
+    def __init__(self, prof: Profiler, name: str, per_pdf: bool) -> None:
+        self.prof = prof; self.name = name; self.per_pdf = per_pdf; self.calls = 1; self.rows = 0
+    def __enter__(self) -> "_Span":
+        self.t0 = time.perf_counter(); return self
+    def __exit__(self, *exc: Any) -> None:
+        self.prof.add(self.name, time.perf_counter() - self.t0, self.calls, self.rows, self.per_pdf)
+
+class _NullSpan:
+    __slots__ = ("calls", "rows")
+    def __enter__(self) -> "_NullSpan": return self
+    def __exit__(self, *exc: Any) -> None: return None
+
+_NULL = _NullSpan()
+_ACTIVE: Optional[Profiler] = None
+
+def start() -> Profiler:
+    global _ACTIVE
+    _ACTIVE = Profiler()
+    return _ACTIVE
+
+def stop() -> Optional[Profiler]:
+    global _ACTIVE
+    prof, _ACTIVE = _ACTIVE, None
+    if prof is not None: prof.wall = time.perf_counter() - prof.t0
+    return prof
+
+def active() -> Optional[Profiler]:
+    return _ACTIVE
+
+def stage(name: str, per_pdf: bool = True) -> Any:
+    """Contexto que mide una etapa; se le puede fijar .rows / .calls antes de salir.
+    per_pdf=False para etapas que no pertenecen a un PDF (escritura del Excel, caché…)."""
+    prof = _ACTIVE
+    return _NULL if prof is None else _Span(prof, name, per_pdf)
+
+def set_pdf(path: Optional[str]) -> None:
+    if _ACTIVE is not None: _ACTIVE.set_pdf(path)
+
+def timed_iter(it: Iterable[T], name: str) -> Iterator[T]:
+    """Mide solo el tiempo de producir cada elemento (no el del consumidor). Sin perfil: el mismo iterable."""
+    if _ACTIVE is None: return iter(it)
+    return _timed(iter(it), name)
+
+def _timed(it: Iterator[T], name: str) -> Iterator[T]:
+    try:
+        while True:
+            with stage(name):
+                try: item = next(it)
+                except StopIteration: return
+            yield item
+    finally:
+        close = getattr(it, "close", None)
+        if close: close()
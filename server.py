@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+server.py — Servidor de extracción en caliente (pdf2excel serve) y su cliente
+- HTTP en 127.0.0.1 (solo stdlib). El proceso queda con pdfplumber, pandas y openpyxl importados, un pool
+  de procesos ya lanzado (cada uno con extractors importado) y, tras la primera lectura con tabula, la JVM
+  arrancada: cada pedido paga solo la extracción y la escritura.
+- <caché>/server.json: dirección, pid y un token aleatorio (legible solo por el usuario); cada pedido lo
+  manda en la cabecera X-Pdf2excel-Token.
+- POST /run {"argv", "cwd", "cache_dir"}: corre create/append como la CLI (rutas relativas a cwd) y devuelve
+  el log línea a línea (NDJSON) y al final {"exit": código}.
+- POST /rows: {"pdf": [rutas], "ocr", "workers", "text_backend", "engine", "cache", "policy", "cache_dir"} o los bytes de un PDF
+  (Content-Type: application/pdf, opciones en la query); devuelve {"columns", "rows"}.
+- GET /status, POST /shutdown.
+Los pedidos se atienden de a uno (lock): dos escrituras al mismo libro no se pisan.
+Cliente: remote_run() lo usan create/append si hay un servidor corriendo (None = no hay, se corre local).
+"""
+from __future__ import annotations
+import http.client, importlib, json, logging, os, secrets, tempfile, threading, time, traceback
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlencode, urlsplit
+from cache import default_cache_dir
+from options import DEFAULT_ENGINE, DEFAULT_TEXT_BACKEND
+
+LOGGER = logging.getLogger("server")
+SERVER_FILE = "server.json"
+TOKEN_HEADER = "X-Pdf2excel-Token"
+DEFAULT_HOST = "127.0.0.1"
+CONNECT_TIMEOUT = 2.0
+# módulos que el servidor deja importados antes del primer pedido
+WARM_MODULES = ("excel_io", "extractors", "journal", "pdf2excel", "policy", "sinks")
+# argumentos de create/append con rutas: se resuelven contra el cwd del cliente
+PATH_ARGS = ("pdf", "out", "excel", "cache_dir", "archive", "export_excel", "profile")
+
+def server_file() -> Path:
+    return default_cache_dir() / SERVER_FILE
+
+def read_server_file() -> Optional[Dict[str, Any]]:
+    try: return json.loads(server_file().read_text(encoding="utf-8"))
+    except (OSError, ValueError): return None
+
+def _flag(value: Any, default: bool) -> bool:
+    """Opción booleana de /rows (JSON o query string: "1"/"true", "0"/"false")."""
+    if value is None: return default
+    return str(value).lower() in ("1", "true")
+
+def _warm_worker() -> None:
+    importlib.import_module("extractors")   # inicializador del pool: cada proceso arranca con el parser importado
+
+def _ping(_: int) -> int:
+    return os.getpid()
+
+class _StreamLog(logging.Handler):
+    """Manda al cliente los registros del hilo del pedido; si el cliente se fue, el trabajo sigue."""
+
+    def __init__(self, send: Callable[[Dict[str, Any]], None]):
+        super().__init__(logging.INFO)
+        self.send = send; self.thread = threading.get_ident(); self.gone = False
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self.gone or record.thread != self.thread: return
+        try: self.send({"log": [record.levelno, record.name, record.getMessage()]})
+        except OSError: self.gone = True
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "ExtractionServer"
+
+    def log_message(self, fmt: str, *args: Any) -> None:
+        LOGGER.debug(fmt, *args)
+
+    def _json(self, code: int, obj: Any) -> None:
+        body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(code); self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body))); self.end_headers(); self.wfile.write(body)
+
+    def _authorized(self) -> bool:
+        if secrets.compare_digest(self.headers.get(TOKEN_HEADER, ""), self.server.token): return True
+        self._json(403, {"error": "token inválido"}); return False
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def do_GET(self) -> None:
+        if not self._authorized(): return
+        if urlsplit(self.path).path != "/status": self._json(404, {"error": "ruta desconocida"}); return
+        self._json(200, self.server.status())
+
+    def do_POST(self) -> None:
+        if not self._authorized(): return
+        route = urlsplit(self.path).path
+        if route == "/run": self._run()
+        elif route == "/rows": self._rows()
+        elif route == "/shutdown":
+            self._json(200, {"ok": True})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        else: self._json(404, {"error": "ruta desconocida"})
+
+    def _run(self) -> None:
+        req = json.loads(self._body())
+        self.send_response(200); self.send_header("Content-Type", "application/x-ndjson"); self.end_headers()
+
+        def send(obj: Dict[str, Any]) -> None:
+            self.wfile.write((json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")); self.wfile.flush()
+        with self.server.lock:
+            stream = _StreamLog(send); logging.getLogger().addHandler(stream)
+            try: code, message = self.server.run(req["argv"], req["cwd"], req.get("cache_dir")), None
+            except SystemExit as e:
+                code, message = (e.code, None) if isinstance(e.code, int) or e.code is None else (1, str(e.code))
+            except Exception:
+                code, message = 1, traceback.format_exc()
+            finally:
+                logging.getLogger().removeHandler(stream)
+        if not stream.gone:
+            try: send({"exit": code or 0, "message": message})
+            except OSError: pass
+
+    def _rows(self) -> None:
+        if self.headers.get("Content-Type", "").startswith("application/pdf"):
+            opts = {k: v[-1] for k, v in parse_qs(urlsplit(self.path).query).items()}
+            fd, tmp = tempfile.mkstemp(suffix=".pdf")
+            with os.fdopen(fd, "wb") as f: f.write(self._body())
+            opts["pdf"] = [tmp]
+        else:
+            opts = json.loads(self._body()); tmp = None
+            if isinstance(opts.get("pdf"), str): opts["pdf"] = [opts["pdf"]]
+        try:
+            with self.server.lock: rows = self.server.rows(opts)
+            self._json(200, {"columns": self.server.columns, "rows": rows})
+        except Exception as e:
+            LOGGER.warning("Pedido /rows falló: %s", e); self._json(500, {"error": str(e)})
+        finally:
+            if tmp: Path(tmp).unlink(missing_ok=True)
+
+class ExtractionServer(ThreadingHTTPServer):
+    """Servidor HTTP local con el pool de procesos y los módulos de extracción ya cargados."""
+    daemon_threads = True
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = 0, workers: int | None = None):
+        super().__init__((host, port), _Handler)
+        for name in WARM_MODULES: importlib.import_module(name)   # en caliente para todos los pedidos
+        from extractors import resolve_workers
+        from schema import ROW_SCHEMA
+        self.columns = ROW_SCHEMA
+        self.workers = resolve_workers(workers)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker) if self.workers > 1 else None
+        # un pedido por proceso del pool: quedan todos lanzados antes del primer pedido
+        if self.pool is not None: list(self.pool.map(_ping, range(self.workers)))
+        self.lock = threading.Lock(); self.token = secrets.token_hex(16)
+        self.started = time.time(); self.served = 0
+
+    def status(self) -> Dict[str, Any]:
+        return {"pid": os.getpid(), "workers": self.workers, "uptime_s": round(time.time() - self.started, 1),
+                "served": self.served, "busy": self.lock.locked()}
+
+    def run(self, argv: List[str], cwd: str, cache_dir: Optional[str]) -> Optional[int]:
+        """Corre un create/append de la CLI con el pool del servidor (si pide más de un proceso)."""
+        import pdf2excel
+        args = pdf2excel.build_parser().parse_args(argv)
+        if args.command not in pdf2excel.SERVED_COMMANDS: raise SystemExit(f"El servidor no atiende '{args.command}'.")
+        for name in PATH_ARGS:
+            value = getattr(args, name, None)
+            if isinstance(value, list): setattr(args, name, [str(Path(cwd, v)) for v in value])
+            elif value: setattr(args, name, str(Path(cwd, value)))
+        if not args.cache_dir: args.cache_dir = cache_dir
+        args.executor = self.pool if args.workers != 1 else None
+        self.served += 1
+        LOGGER.info("Pedido #%s: %s", self.served, " ".join(argv))
+        pdf2excel.run_command(args)
+        return 0
+
+    def rows(self, opts: Dict[str, Any]) -> List[Any]:
+        """Filas de opts["pdf"] con las opciones del cliente: la caché y la política de métodos salen de su
+        carpeta (cache_dir), como en una corrida local."""
+        from cache import ExtractionCache
+        from pdf2excel import iter_rows
+        from policy import MethodPolicy, POLICY_FILE
+        workers = int(opts.get("workers", 1)); cache_dir = opts.get("cache_dir") or None
+        cache = ExtractionCache(cache_dir) if _flag(opts.get("cache"), True) else None
+        policy = MethodPolicy(Path(cache_dir) / POLICY_FILE if cache_dir else None) if _flag(opts.get("policy"), True) else None
+        self.served += 1
+        return list(iter_rows(opts["pdf"], _flag(opts.get("ocr"), False), workers, cache,
+                              backend=opts.get("text_backend") or DEFAULT_TEXT_BACKEND,
+                              engine=opts.get("engine") or DEFAULT_ENGINE, policy=policy,
+                              executor=self.pool if workers != 1 else None, cache_dir=cache_dir))
+
+    def write_server_file(self) -> Path:
+        path = server_file(); path.parent.mkdir(parents=True, exist_ok=True)
+        host, port = self.server_address[:2]
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)   # el token no queda legible para otros
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"host": host, "port": port, "pid": os.getpid(), "token": self.token}, f)
+        return path
+
+    def close(self) -> None:
+        self.server_close()
+        if self.pool is not None: self.pool.shutdown(cancel_futures=True)
+        info = read_server_file()
+        if info and info.get("pid") == os.getpid(): server_file().unlink(missing_ok=True)
+
+def serve(host: str = DEFAULT_HOST, port: int = 0, workers: int | None = None) -> None:
+    """Atiende pedidos hasta Ctrl+C o POST /shutdown."""
+    t0 = time.perf_counter()
+    server = ExtractionServer(host, port, workers)
+    try:
+        path = server.write_server_file()
+        LOGGER.info("Servidor en http://%s:%s | %s procesos | listo en %.2fs | %s", *server.server_address[:2],
+                    server.workers, time.perf_counter() - t0, path)
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close(); LOGGER.info("Servidor detenido (%s pedidos)", server.served)
+
+# ===== Cliente =====
+def _connect(info: Dict[str, Any]) -> http.client.HTTPConnection:
+    conn = http.client.HTTPConnection(info["host"], info["port"], timeout=CONNECT_TIMEOUT)
+    conn.connect(); conn.sock.settimeout(None)   # un trabajo largo puede pasar minutos sin escribir
+    return conn
+
+def request(method: str, route: str, body: Any = None, info: Optional[Dict[str, Any]] = None) -> Any:
+    """Pedido JSON al servidor (de server.json si no se pasa `info`); ConnectionError si no responde."""
+    info = info or read_server_file()
+    if info is None: raise ConnectionError(f"no existe {server_file()} (¿pdf2excel serve corriendo?)")
+    conn = _connect(info)
+    try:
+        headers = {TOKEN_HEADER: info["token"]}
+        if isinstance(body, bytes): headers["Content-Type"] = "application/pdf"
+        elif body is not None: headers["Content-Type"] = "application/json"; body = json.dumps(body).encode("utf-8")
+        conn.request(method, route, body, headers)
+        resp = conn.getresponse(); data = json.loads(resp.read() or b"null")
+        if resp.status != 200: raise RuntimeError(f"Servidor: {(data or {}).get('error', resp.status)}")
+        return data
+    finally:
+        conn.close()
+
+def remote_rows(pdf: str | Path | List[str] | bytes, **opts: Any) -> List[List[Any]]:
+    """Filas de uno o más PDF (rutas vistas por el servidor) o de los bytes de un PDF, extraídas por el
+    servidor. `opts`: ocr, workers, text_backend, engine, cache, policy, cache_dir (por defecto la carpeta
+    de caché de este proceso, como remote_run)."""
+    opts.setdefault("cache_dir", str(default_cache_dir()))
+    if isinstance(pdf, bytes):
+        query = urlencode(opts)
+        return request("POST", "/rows" + (f"?{query}" if query else ""), pdf)["rows"]
+    paths = [str(Path(p).resolve()) for p in ([pdf] if isinstance(pdf, (str, Path)) else pdf)]
+    return request("POST", "/rows", {"pdf": paths, **opts})["rows"]
+
+def remote_run(argv: List[str]) -> Optional[int]:
+    """Corre create/append en el servidor y repite su log acá. None si no hay servidor que responda
+    (el llamador corre el comando local)."""
+    info = read_server_file()
+    if info is None: return None
+    try: conn = _connect(info)
+    except OSError: return None   # server.json de un servidor que ya no está
+    try:
+        body = json.dumps({"argv": argv, "cwd": os.getcwd(), "cache_dir": str(default_cache_dir())}).encode("utf-8")
+        conn.request("POST", "/run", body, {TOKEN_HEADER: info["token"], "Content-Type": "application/json"})
+        resp = conn.getresponse()
+        if resp.status != 200:
+            LOGGER.warning("El servidor rechazó el pedido (%s); se corre local.", resp.status); return None
+        for line in resp:
+            msg = json.loads(line)
+            if "log" in msg:
+                level, name, text = msg["log"]; logging.getLogger(name).log(level, "%s", text)
+            elif "exit" in msg:
+                if msg.get("message"): raise SystemExit(msg["message"])
+                return msg["exit"]
+    finally:
+        conn.close()
+    raise SystemExit("Se perdió la conexión con el servidor antes de terminar (revise su log).")
@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""
+sinks.py — Almacenes de filas alternativos al Excel: CSV, Parquet (particionado por mes de Fecha) y SQLite
+- Mismas reglas que 'Datos': columnas ROW_SCHEMA, tipos de TYPE_CASTERS y DEDUP_KEY único (se conserva la primera).
+- append() es incremental en todos: solo escribe filas nuevas, sin reescribir lo existente.
+- CSV y Parquet buscan duplicados en el índice <almacén>.dedup.sqlite (dedup_index); SQLite usa su propia
+  restricción UNIQUE.
+- El Excel pasa a ser una exportación del almacén: export_excel(sink, "Reporte.xlsx").
+"""
+from __future__ import annotations
+import csv, logging, shutil, sqlite3, time, uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+import pandas as pd
+from schema import ROW_SCHEMA, TYPE_CASTERS, DEDUP_KEY, Row, try_parse_int
+from dedup_index import DedupIndex, index_path, norm_key
+from excel_io import ROWS_PER_FRAME, _records, cast_types, create_new_excel, iter_frames
+import profiling
+
+# ====== Opcionales (pyarrow se importa al abrir el primer almacén Parquet) ======
+pa: Any = None
+pq: Any = None
+
+def _load_pyarrow() -> bool:
+    global pa, pq
+    if pa is None:
+        try:
+            import pyarrow as pa  # type: ignore
+            import pyarrow.parquet as pq  # type: ignore
+        except Exception:
+            pa = pq = None
+    return pa is not None
+
+LOGGER = logging.getLogger("sinks")
+KEY_POS = [ROW_SCHEMA.index(k) for k in DEDUP_KEY]
+TEXT_COLUMNS = [c for c in ROW_SCHEMA if c not in TYPE_CASTERS]
+SQLITE_SUFFIXES = {".sqlite", ".sqlite3", ".db"}
+UNKNOWN_MONTH = "sin_fecha"
+
+def sink_format(path: str | Path, fmt: str | None = None) -> str:
+    """excel / csv / parquet / sqlite según `fmt` o, si no se indica, la extensión de `path`."""
+    if fmt: return fmt
+    path = Path(path); ext = path.suffix.lower()
+    if ext == ".csv": return "csv"
+    if ext in SQLITE_SUFFIXES: return "sqlite"
+    if ext == ".parquet" or path.is_dir(): return "parquet"
+    return "excel"
+
+def _text(v: Any) -> Any:
+    return None if v is None else str(v)
+
+class RowSink:
+    """Almacén de filas de 'Datos'. Subclases: CsvSink, ParquetSink, SqliteSink."""
+    format = ""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def reset(self) -> None:
+        """Borra el almacén (y su índice) para empezar de cero, como 'create'."""
+        if self.path.is_dir(): shutil.rmtree(self.path)
+        else: self.path.unlink(missing_ok=True)
+        index_path(self.path).unlink(missing_ok=True)
+
+    def append(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Agrega las filas cuya clave no esté ya en el almacén. Devuelve cuántas escribió."""
+        raise NotImplementedError
+
+    def iter_frames(self) -> Iterator[pd.DataFrame]:
+        """Contenido en DataFrames tipados de hasta ROWS_PER_FRAME filas."""
+        raise NotImplementedError
+
+    def iter_rows(self) -> Iterator[Dict[str, Any]]:
+        for df in self.iter_frames():
+            for rec in _records(df): yield Row(rec)
+
+    def iter_keys(self) -> Iterator[Tuple[Any, ...]]:
+        for df in self.iter_frames():
+            yield from df[list(DEDUP_KEY)].astype(object).where(df[list(DEDUP_KEY)].notna(), None).itertuples(index=False, name=None)
+
+class _IndexedSink(RowSink):
+    """Dedup con el índice de dedup_index, igual que append_incremental del Excel."""
+
+    def _open_index(self) -> DedupIndex:
+        idx = DedupIndex.for_workbook(self.path)
+        if self.exists() and not idx.is_fresh(self.path):
+            with profiling.stage("index_rebuild", per_pdf=False) as sp:
+                sp.rows = idx.rebuild(self.iter_keys(), self.path)
+        elif not self.exists():
+            idx.rebuild((), self._create())
+        return idx
+
+    def _create(self) -> Path:
+        raise NotImplementedError
+
+    def _write(self, recs: List[Tuple[Any, ...]]) -> None:
+        raise NotImplementedError
+
+    def _close(self) -> None:
+        pass
+
+    def append(self, rows: Iterable[Dict[str, Any]]) -> int:
+        fresh: List[Tuple[str, str, str]] = []; taken = set()
+        with self._open_index() as idx:
+            try:
+                for df in iter_frames(rows):
+                    recs = list(_records(df))
+                    keys = [norm_key(rec[p] for p in KEY_POS) for rec in recs]
+                    with profiling.stage("dedup_index", per_pdf=False) as sp:
+                        known = idx.existing(keys); sp.rows = len(keys)
+                    new = []
+                    for rec, k in zip(recs, keys):
+                        if k in known or k in taken: continue
+                        taken.add(k); fresh.append(k); new.append(rec)
+                    if new:
+                        with profiling.stage(f"{self.format}_write", per_pdf=False) as sp:
+                            self._write(new); sp.rows = len(new)
+            finally:
+                self._close()
+            idx.begin_add(fresh)
+            idx.commit(self.path)
+        LOGGER.info("%s: %s filas nuevas en '%s'", self.format.upper(), len(fresh), self.path)
+        return len(fresh)
+
+class CsvSink(_IndexedSink):
+    """CSV UTF-8 con encabezado ROW_SCHEMA; las filas nuevas se agregan al final del archivo."""
+    format = "csv"
+
+    def __init__(self, path: str | Path):
+        super().__init__(path); self._fh = None; self._writer = None
+
+    def _create(self) -> Path:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # BOM para que Excel abra el CSV con los acentos bien; los append siguientes van sin BOM
+        with open(self.path, "w", newline="", encoding="utf-8-sig") as f: csv.writer(f).writerow(ROW_SCHEMA)
+        return self.path
+
+    def _check_header(self) -> None:
+        with open(self.path, newline="", encoding="utf-8-sig") as f:
+            header = next(csv.reader(f), [])
+        if header != ROW_SCHEMA:
+            raise ValueError(f"'{self.path}' no tiene el encabezado esperado: {ROW_SCHEMA}")
+
+    def _write(self, recs: List[Tuple[Any, ...]]) -> None:
+        if self._fh is None:
+            self._check_header()
+            self._fh = open(self.path, "a", newline="", encoding="utf-8"); self._writer = csv.writer(self._fh)
+        self._writer.writerows(("" if v is None else v for v in rec) for rec in recs)
+
+    def _close(self) -> None:
+        if self._fh is not None:
+            self._fh.close(); self._fh = self._writer = None
+
+    def iter_frames(self) -> Iterator[pd.DataFrame]:
+        if not self.exists(): return
+        self._check_header()
+        # todo como texto: Folio conserva ceros a la izquierda; "" → nulo; cast_types tipa los números
+        for df in pd.read_csv(self.path, dtype=str, keep_default_na=False, na_values=[""],
+                              chunksize=ROWS_PER_FRAME, encoding="utf-8-sig"):
+            yield cast_types(df[ROW_SCHEMA])
+
+class ParquetSink(_IndexedSink):
+    """Carpeta Parquet particionada por mes (mes=AAAA-MM/); cada append agrega un archivo por mes."""
+    format = "parquet"
+
+    def __init__(self, path: str | Path):
+        if not _load_pyarrow(): raise RuntimeError("Para Parquet instale pyarrow (pip install pyarrow).")
+        super().__init__(path); self._writers: Dict[str, Any] = {}
+        self._name = f"part-{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet"
+
+    @staticmethod
+    def schema() -> "pa.Schema":
+        types = {c: (pa.float64() if c == "%" else pa.int64()) for c in TYPE_CASTERS}
+        return pa.schema([(c, types.get(c, pa.string())) for c in ROW_SCHEMA])
+
+    @staticmethod
+    def month(fecha: Any) -> str:
+        # Fecha dd-mm-aaaa → "aaaa-mm"
+        s = str(fecha or "")
+        if len(s) == 10 and s[2] == "-" and s[5] == "-" and try_parse_int(s[6:]) is not None:
+            return f"{s[6:]}-{s[3:5]}"
+        return UNKNOWN_MONTH
+
+    def _create(self) -> Path:
+        self.path.mkdir(parents=True, exist_ok=True)
+        return self.path
+
+    def _write(self, recs: List[Tuple[Any, ...]]) -> None:
+        fecha = ROW_SCHEMA.index("Fecha")
+        by_month: Dict[str, List[Tuple[Any, ...]]] = {}
+        for rec in recs: by_month.setdefault(self.month(rec[fecha]), []).append(rec)
+        schema = self.schema()
+        for month, group in by_month.items():
+            cols = [pa.array([(_text(r[i]) if f.type == pa.string() else r[i]) for r in group], type=f.type)
+                    for i, f in enumerate(schema)]
+            table = pa.Table.from_arrays(cols, schema=schema)
+            writer = self._writers.get(month)
+            if writer is None:
+                part = self.path / f"mes={month}"; part.mkdir(parents=True, exist_ok=True)
+                writer = self._writers[month] = pq.ParquetWriter(str(part / self._name), schema)
+            writer.write_table(table)
+
+    def _close(self) -> None:
+        for w in self._writers.values(): w.close()
+        self._writers.clear()
+
+    def _files(self) -> List[Path]:
+        return sorted(self.path.glob("mes=*/*.parquet")) if self.exists() else []
+
+    def iter_frames(self) -> Iterator[pd.DataFrame]:
+        # por mes y, dentro del mes, en orden de escritura
+        for f in self._files():
+            for batch in pq.ParquetFile(str(f)).iter_batches(batch_size=ROWS_PER_FRAME, columns=ROW_SCHEMA):
+                yield cast_types(batch.to_pandas())
+
+    def iter_keys(self) -> Iterator[Tuple[Any, ...]]:
+        for f in self._files():
+            for batch in pq.ParquetFile(str(f)).iter_batches(batch_size=65536, columns=list(DEDUP_KEY)):
+                yield from zip(*(batch.column(i).to_pylist() for i in range(len(DEDUP_KEY))))
+
+class SqliteSink(RowSink):
+    """Tabla 'datos' con columnas tipadas y UNIQUE sobre la clave normalizada (sin índice aparte)."""
+    format = "sqlite"
+    TABLE = "datos"
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), isolation_level=None)
+        types = {c: ("REAL" if c == "%" else "INTEGER") for c in TYPE_CASTERS}
+        cols = ", ".join(f'"{c}" {types.get(c, "TEXT")}' for c in ROW_SCHEMA)
+        conn.execute(f'CREATE TABLE IF NOT EXISTS {self.TABLE} ({cols}, k_folio TEXT NOT NULL, k_fecha TEXT NOT NULL,'
+                     f' k_maquina TEXT NOT NULL, UNIQUE (k_folio, k_fecha, k_maquina))')
+        return conn
+
+    def append(self, rows: Iterable[Dict[str, Any]]) -> int:
+        conn = self._connect()
+        cols = ", ".join(f'"{c}"' for c in ROW_SCHEMA)
+        q = f"INSERT OR IGNORE INTO {self.TABLE} ({cols}, k_folio, k_fecha, k_maquina) VALUES ({', '.join('?' * (len(ROW_SCHEMA) + 3))})"
+        text_pos = [ROW_SCHEMA.index(c) for c in TEXT_COLUMNS]
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            before = conn.total_changes
+            for df in iter_frames(rows):
+                with profiling.stage("sqlite_write", per_pdf=False) as sp:
+                    recs = [list(rec) for rec in _records(df)]
+                    for rec in recs:
+                        for i in text_pos: rec[i] = _text(rec[i])
+                    conn.executemany(q, (rec + list(norm_key(rec[p] for p in KEY_POS)) for rec in recs))
+                    sp.rows = len(recs)
+            n = conn.total_changes - before
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction: conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        LOGGER.info("SQLITE: %s filas nuevas en '%s'", n, self.path)
+        return n
+
+    def iter_frames(self) -> Iterator[pd.DataFrame]:
+        if not self.exists(): return
+        conn = self._connect()
+        try:
+            cols = ", ".join(f'"{c}"' for c in ROW_SCHEMA)
+            for df in pd.read_sql_query(f"SELECT {cols} FROM {self.TABLE} ORDER BY rowid", conn, chunksize=ROWS_PER_FRAME):
+                yield cast_types(df)
+        finally:
+            conn.close()
+
+SINKS = {"csv": CsvSink, "parquet": ParquetSink, "sqlite": SqliteSink}
+
+def open_sink(path: str | Path, fmt: str | None = None) -> RowSink:
+    fmt = sink_format(path, fmt)
+    if fmt not in SINKS: raise ValueError(f"Formato sin almacén de filas: {fmt}")
+    return SINKS[fmt](path)
+
+def export_excel(sink: RowSink, out_path: str | Path) -> str:
+    """Escribe el contenido del almacén como hoja 'Datos' (conserva otras hojas si el libro ya existe)."""
+    return create_new_excel(out_path, sink.iter_rows())
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+text_backends.py — Motores de extracción de texto por página
+- pdfplumber (por defecto): page.extract_text(x_tolerance=2, y_tolerance=2).
+- pdfminer: maneja pdfminer.six directamente (sin el modelo de objetos de pdfplumber: nada de dicts por
+  carácter ni atributos de color/fuente) y agrupa caracteres → palabras → líneas con las mismas reglas
+  que extract_text de pdfplumber, para dar el mismo texto.
+Todos exponen: n_pages, metadata, page_size(i), page_text(i), page_words(i), page_screen(i), close().
+page_words: palabras con su caja (texto, x0, x1, top, bottom), las mismas que arman page_text (layout.py).
+Pre-filtro (page_screen): recorre el flujo de contenido con un dispositivo mínimo (sin cajas ni objetos
+por carácter) y corta apenas ve una fecha y una hora; así las portadas, resúmenes y páginas en blanco
+no pagan extract_text, y las páginas solo-imagen se reconocen sin extraer texto.
+"""
+from __future__ import annotations
+import logging, re
+from itertools import groupby
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import pdfplumber
+from pdfplumber.utils.text import LIGATURES
+from pdfminer.converter import PDFPageAggregator
+from pdfminer.layout import LTChar, LTContainer
+from pdfminer.pdfdevice import PDFDevice
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdffont import PDFUnicodeNotDefined
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import resolve1
+from pdfminer.psparser import PSLiteral
+from pdfminer.utils import decode_text
+from options import DEFAULT_TEXT_BACKEND
+import profiling
+
+LOGGER = logging.getLogger("text_backends")
+X_TOLERANCE = 2
+Y_TOLERANCE = 2
+
+# ===== Pre-filtro =====
+# Firma laxa de una fila (superconjunto de FECHA_HORA_RE): fecha y hora en el flujo sin espacios, en cualquier orden
+_SCREEN_DATE_RE = re.compile(r"\d{2}-\d{2}-\d{4}")
+_SCREEN_TIME_RE = re.compile(r"\d{2}:\d{2}:\d{2}")
+_SCREEN_TAIL = 16
+# sin la firma en el orden del flujo pero con dígitos, '-' y ':' suficientes para una fila: puede haber
+# caracteres dibujados fuera de orden, así que se extrae igual (nunca se descarta una fila posible)
+_SCREEN_MIN_DIGITS = 14
+
+class Screen(NamedTuple):
+    kind: str      # rows (extraer el texto) / skip (texto sin filas posibles) / image (sin texto, con imágenes)
+    chars: int     # caracteres de texto vistos (0 en image); en rows puede quedar corto porque el recorrido se corta
+
+class _Found(Exception):
+    pass
+
+class _ScreenDevice(PDFDevice):
+    """Solo decodifica el texto de cada Tj/TJ y cuenta imágenes; corta con _Found al ver fecha y hora."""
+
+    def reset(self) -> None:
+        self.tail = ""; self.chars = 0; self.digits = 0; self.images = 0
+        self.date = self.time = self.dash = self.colon = False
+
+    def render_string(self, textstate, seq, ncs, graphicstate) -> None:
+        font = textstate.font
+        if font is None: return
+        parts = []
+        for obj in seq:
+            if not isinstance(obj, bytes): continue
+            for cid in font.decode(obj):
+                try: parts.append(font.to_unichr(cid))
+                except PDFUnicodeNotDefined: parts.append(f"(cid:{cid})")
+        text = "".join("".join(parts).split())
+        if not text: return
+        self.chars += len(text); self.digits += sum(c.isdigit() for c in text)
+        self.dash = self.dash or "-" in text; self.colon = self.colon or ":" in text
+        window = self.tail + text; self.tail = window[-_SCREEN_TAIL:]
+        self.date = self.date or _SCREEN_DATE_RE.search(window) is not None
+        self.time = self.time or _SCREEN_TIME_RE.search(window) is not None
+        if self.date and self.time: raise _Found
+
+    def render_image(self, name, stream) -> None:
+        self.images += 1
+
+def screen_page(rsrcmgr: PDFResourceManager, page: PDFPage) -> Screen:
+    with profiling.stage("prescreen"):
+        device = _ScreenDevice(rsrcmgr); device.reset()
+        try:
+            PDFPageInterpreter(rsrcmgr, device).process_page(page)
+        except _Found:
+            return Screen("rows", device.chars)
+        if not device.chars: return Screen("image" if device.images else "skip", 0)
+        maybe = device.digits >= _SCREEN_MIN_DIGITS and device.dash and device.colon and (device.date or device.time)
+        return Screen("rows" if maybe else "skip", device.chars)
+
+# palabra con caja: (texto, x0, x1, top, bottom), origen arriba a la izquierda como pdfplumber
+Word = Tuple[str, float, float, float, float]
+
+def pdfplumber_page_words(page) -> List[Word]:
+    with profiling.stage("extract_words"):
+        words = page.extract_words(x_tolerance=X_TOLERANCE, y_tolerance=Y_TOLERANCE)
+        page.close()
+    return [(w["text"], w["x0"], w["x1"], w["top"], w["bottom"]) for w in words]
+
+def pdfplumber_page_text(page) -> str:
+    with profiling.stage("extract_text"):
+        text = page.extract_text(x_tolerance=X_TOLERANCE, y_tolerance=Y_TOLERANCE) or ""
+        page.close()  # libera el caché de objetos de la página: memoria acotada a una página
+    return text
+
+class PdfplumberText:
+    name = "pdfplumber"
+
+    def __init__(self, pdf_path: str):
+        self.pdf = pdfplumber.open(pdf_path)
+
+    @property
+    def n_pages(self) -> int:
+        return len(self.pdf.pages)
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return dict(self.pdf.metadata or {})
+
+    def page_size(self, i: int) -> Tuple[float, float]:
+        page = self.pdf.pages[i]
+        return float(page.width), float(page.height)
+
+    def page_text(self, i: int) -> str:
+        return pdfplumber_page_text(self.pdf.pages[i])
+
+    def page_words(self, i: int) -> List[Word]:
+        return pdfplumber_page_words(self.pdf.pages[i])
+
+    def page_screen(self, i: int) -> Screen:
+        return screen_page(self.pdf.rsrcmgr, self.pdf.pages[i].page_obj)
+
+    def close(self) -> None:
+        self.pdf.close()
+
+# ===== pdfminer directo =====
+def cluster_ids(values: List[float], tolerance: float) -> Dict[float, int]:
+    """= pdfplumber make_cluster_dict: valores ordenados, nuevo grupo si salta más que `tolerance`."""
+    ids: Dict[float, int] = {}; gid = -1; last = None
+    for v in sorted(set(values)):
+        if last is None or v > last + tolerance: gid += 1
+        ids[v] = gid; last = v
+    return ids
+
+# carácter: (texto, x0, x1, top, bottom, upright)
+Char = Tuple[str, float, float, float, float, bool]
+
+def _words(chars: List[Char], boxes: bool = False) -> List[Any]:
+    """Palabras (texto, top) en el orden de pdfplumber WordExtractor (use_text_flow=False);
+    con boxes=True, Word (texto, x0, x1, top, bottom) como extract_words."""
+    out: List[Any] = []
+    _merge = _merge_box if boxes else _merge_top
+    for upright, group in groupby(chars, key=lambda c: c[5]):
+        group = list(group)
+        if upright:   # líneas por top, caracteres por x0; palabra nueva si retrocede o salta > x_tol
+            ids = cluster_ids([c[3] for c in group], Y_TOLERANCE)
+            lines = groupby(sorted(group, key=lambda c: ids[c[3]]), key=lambda c: ids[c[3]])
+            order, tol_in, tol_cross = (lambda c: c[1]), X_TOLERANCE, Y_TOLERANCE
+            pos, end, cross = 1, 2, 3
+        else:         # texto rotado: líneas por x0, caracteres de arriba hacia abajo
+            ids = cluster_ids([c[1] for c in group], X_TOLERANCE)
+            lines = groupby(sorted(group, key=lambda c: ids[c[1]]), key=lambda c: ids[c[1]])
+            order, tol_in, tol_cross = (lambda c: (c[3], c[4])), Y_TOLERANCE, X_TOLERANCE
+            pos, end, cross = 3, 4, 1
+        for _, line in lines:
+            word: List[Char] = []
+            for c in sorted(line, key=order):
+                if c[0].isspace():
+                    if word: out.append(_merge(word)); word = []
+                    continue
+                if not c[0]:   # pdfplumber: texto vacío ("" in split_at_punctuation) queda como palabra propia
+                    if word: out.append(_merge(word)); word = []
+                    out.append(_merge([c])); continue
+                if word:
+                    p = word[-1]
+                    if c[pos] < p[pos] or c[pos] > p[end] + tol_in or abs(c[cross] - p[cross]) > tol_cross:
+                        out.append(_merge(word)); word = []
+                word.append(c)
+            if word: out.append(_merge(word))
+    return out
+
+def _merge_top(word: List[Char]) -> Tuple[str, float]:
+    return "".join(LIGATURES.get(c[0], c[0]) for c in word), min(c[3] for c in word)
+
+def _merge_box(word: List[Char]) -> Word:
+    return ("".join(LIGATURES.get(c[0], c[0]) for c in word), min(c[1] for c in word), max(c[2] for c in word),
+            min(c[3] for c in word), max(c[4] for c in word))
+
+def chars_to_text(chars: List[Char]) -> str:
+    """Palabras → líneas agrupando por top (sin reordenar) como pdfplumber extract_text sin layout."""
+    words = _words(chars)
+    if not words: return ""
+    ids = cluster_ids([w[1] for w in words], Y_TOLERANCE)
+    return "\n".join(" ".join(w[0] for w in line) for _, line in groupby(words, key=lambda w: ids[w[1]]))
+
+def _iter_chars(objs) -> Any:
+    for obj in objs:
+        if isinstance(obj, LTChar): yield obj
+        elif isinstance(obj, LTContainer): yield from _iter_chars(obj)
+
+def _decode(v: Any) -> Any:
+    v = resolve1(v)
+    if isinstance(v, PSLiteral): return v.name
+    if isinstance(v, bytes): return decode_text(v)
+    return v
+
+class PdfminerText:
+    name = "pdfminer"
+
+    def __init__(self, pdf_path: str):
+        self._fh = open(pdf_path, "rb")
+        try:
+            self.doc = PDFDocument(PDFParser(self._fh))
+            self.pages = list(PDFPage.create_pages(self.doc))
+        except Exception:
+            self._fh.close(); raise
+        self.rsrc = PDFResourceManager(caching=True)
+        self.device = PDFPageAggregator(self.rsrc, laparams=None)
+        self.interpreter = PDFPageInterpreter(self.rsrc, self.device)
+
+    @property
+    def n_pages(self) -> int:
+        return len(self.pages)
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        info = self.doc.info[0] if self.doc.info else {}
+        return {k: _decode(v) for k, v in info.items()}
+
+    def _box(self, i: int) -> Tuple[float, float, float, float, int]:
+        page = self.pages[i]
+        rotation = (resolve1(page.attrs.get("Rotate", 0)) or 0) % 360
+        x0, y0, x1, y1 = page.mediabox
+        x0, x1 = sorted((x0, x1)); y0, y1 = sorted((y0, y1))
+        if rotation in (90, 270): x0, y0, x1, y1 = y0, x0, y1, x1
+        return x0, y0, x1, y1, rotation
+
+    def page_size(self, i: int) -> Tuple[float, float]:
+        x0, y0, x1, y1, _ = self._box(i)
+        return float(x1 - x0), float(y1 - y0)
+
+    def _chars(self, i: int) -> List[Char]:
+        x0, y0, x1, y1, _ = self._box(i)
+        height = y1 - y0
+        mb_top = height - y1     # mismo origen que pdfplumber (mediabox invertida)
+        self.interpreter.process_page(self.pages[i])
+        layout = self.device.get_result()
+        return [(c.get_text(), c.x0 + x0, c.x1 + x0, (height - c.y1) + mb_top, (height - c.y0) + mb_top, c.upright)
+                for c in _iter_chars(layout)] if x0 else \
+               [(c.get_text(), c.x0, c.x1, (height - c.y1) + mb_top, (height - c.y0) + mb_top, c.upright)
+                for c in _iter_chars(layout)]
+
+    def page_text(self, i: int) -> str:
+        with profiling.stage("extract_text"):
+            return chars_to_text(self._chars(i))
+
+    def page_words(self, i: int) -> List[Word]:
+        with profiling.stage("extract_words"):
+            return _words(self._chars(i), boxes=True)
+
+    def page_screen(self, i: int) -> Screen:
+        return screen_page(self.rsrc, self.pages[i])
+
+    def close(self) -> None:
+        self._fh.close()
+
+def producer_key(doc: Any) -> Optional[str]:
+    """Generador del documento: Producer|Creator|tamaño de la 1.ª página (None sin Producer ni Creator).
+    Clave de las plantillas de columnas (layout.py) y de la política de métodos (policy.py)."""
+    meta = doc.metadata
+    producer = str(meta.get("Producer") or "").strip(); creator = str(meta.get("Creator") or "").strip()
+    if not (producer or creator) or not doc.n_pages: return None
+    w, h = doc.page_size(0)
+    return f"{producer}|{creator}|{round(w)}x{round(h)}"
+
+TEXT_BACKENDS = {"pdfplumber": PdfplumberText, "pdfminer": PdfminerText}
+
+def open_text_backend(pdf_path: str, name: str | None = None):
+    name = name or DEFAULT_TEXT_BACKEND
+    if name not in TEXT_BACKENDS: raise ValueError(f"Motor de texto desconocido: {name} (opciones: {', '.join(TEXT_BACKENDS)})")
+    return TEXT_BACKENDS[name](str(pdf_path))
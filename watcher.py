@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+watcher.py — Carpeta vigilada (pdf2excel watch <carpeta> --excel <destino>)
+- Sondea la carpeta: un PDF nuevo o cambiado se extrae cuando su tamaño y mtime se mantienen
+  `settle_seconds` (evita leer archivos a medio copiar).
+- Las filas se acumulan y se escriben en una sola pasada al juntar `flush_rows` filas o al cumplirse
+  `flush_seconds` desde el primer PDF pendiente: el libro no se reescribe una vez por archivo.
+- Estado persistente en <destino>.watch.json (ruta → tamaño, mtime, SHA-256 y filas), guardado solo
+  después de cada escritura: al reiniciar no se re-ingiere lo ya escrito y lo pendiente se vuelve a
+  extraer (con la caché de extracciones es casi gratis; el dedup del destino evita duplicados).
+  Un PDF con contenido ya ingerido (copiado o renombrado) se registra sin volver a extraerlo.
+"""
+from __future__ import annotations
+import json, logging, os, signal, tempfile, threading, time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from cache import file_digest
+from excel_io import append_and_dedup, append_incremental
+from options import DEFAULT_FLUSH_ROWS, DEFAULT_FLUSH_SECONDS, DEFAULT_POLL_SECONDS, DEFAULT_SETTLE_SECONDS
+from sinks import open_sink, sink_format
+
+LOGGER = logging.getLogger("watcher")
+STATE_SUFFIX = ".watch.json"
+# PDF listos en una misma pasada que se extraen juntos (una llamada a extract)
+BATCH_PDFS = 50
+
+Signature = Tuple[int, int]   # (tamaño, mtime_ns)
+
+def state_path(target: str | Path) -> Path:
+    target = Path(target)
+    return target.with_name(target.name + STATE_SUFFIX)
+
+def _signature(st: os.stat_result) -> Signature:
+    return st.st_size, st.st_mtime_ns
+
+class WatchState:
+    """PDF ya escritos en el destino, por ruta y por contenido."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.files: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            try:
+                self.files = json.loads(self.path.read_text(encoding="utf-8")).get("files", {})
+            except Exception:
+                LOGGER.warning("Estado ilegible, se empieza de cero: %s", self.path)
+        self.digests = {f["sha256"] for f in self.files.values()}
+
+    def known(self, pdf: str, sig: Signature) -> bool:
+        f = self.files.get(pdf)
+        return f is not None and (f["size"], f["mtime_ns"]) == sig
+
+    def record(self, pdf: str, sig: Signature, digest: str, rows: int) -> None:
+        self.files[pdf] = {"size": sig[0], "mtime_ns": sig[1], "sha256": digest, "rows": rows}
+        self.digests.add(digest)
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"files": self.files}, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.path)
+        except Exception:
+            Path(tmp).unlink(missing_ok=True); raise
+
+class FolderWatcher:
+    """Vigila `folder` y agrega las filas de sus PDF a `target` (Excel o almacén CSV/Parquet/SQLite).
+    `extract(pdfs, counts)` entrega las filas de una lista de PDF y anota en `counts` las filas de cada uno
+    (pdf2excel.iter_rows con sus opciones)."""
+
+    def __init__(self, folder: str | Path, target: str | Path,
+                 extract: Callable[[List[str], Dict[str, int]], Iterable[Dict[str, Any]]],
+                 fmt: Optional[str] = None, incremental: bool = True, recursive: bool = False,
+                 flush_rows: int = DEFAULT_FLUSH_ROWS, flush_seconds: float = DEFAULT_FLUSH_SECONDS,
+                 settle_seconds: float = DEFAULT_SETTLE_SECONDS):
+        self.folder = Path(folder); self.target = Path(target); self.extract = extract
+        self.fmt = sink_format(target, fmt); self.incremental = incremental; self.recursive = recursive
+        self.flush_rows = flush_rows; self.flush_seconds = flush_seconds; self.settle_seconds = settle_seconds
+        self.state = WatchState(state_path(target))
+        self.stop_event = threading.Event()
+        self._seen: Dict[str, Tuple[Signature, float]] = {}    # firma observada y desde cuándo no cambia
+        self._failed: Dict[str, Signature] = {}                 # no reintentar hasta que el archivo cambie
+        self.pending_rows: List[Dict[str, Any]] = []
+        self.pending_files: List[Tuple[str, Signature, str, int]] = []
+        self.pending_since: Optional[float] = None
+
+    def _pdfs(self) -> Iterator[Path]:
+        pattern = "**/*" if self.recursive else "*"
+        for p in self.folder.glob(pattern):
+            if p.suffix.lower() == ".pdf" and p.is_file(): yield p
+
+    def scan(self, now: Optional[float] = None, settle: Optional[float] = None) -> List[Tuple[str, Signature]]:
+        """PDF nuevos o cambiados cuya firma lleva `settle` (def: settle_seconds) sin moverse, en orden de nombre."""
+        now = time.monotonic() if now is None else now
+        settle = self.settle_seconds if settle is None else settle
+        ready: List[Tuple[str, Signature]] = []; present = set()
+        for p in sorted(self._pdfs()):
+            pdf = str(p.resolve())
+            try: sig = _signature(p.stat())
+            except OSError: continue
+            present.add(pdf)
+            if self.state.known(pdf, sig) or self._failed.get(pdf) == sig: continue
+            if any(f[0] == pdf and f[1] == sig for f in self.pending_files): continue
+            seen = self._seen.get(pdf)
+            if seen is None or seen[0] != sig: self._seen[pdf] = (sig, now); seen = self._seen[pdf]
+            if now - seen[1] >= settle: ready.append((pdf, sig))
+        for pdf in list(self._seen):
+            if pdf not in present: del self._seen[pdf]
+        return ready
+
+    def ingest(self, ready: Iterable[Tuple[str, Signature]]) -> int:
+        """Extrae los PDF listos y deja sus filas pendientes. Devuelve cuántos PDF extrajo.
+        Los de una misma pasada van juntos a extract (un pool de procesos y un lote de tabula), de a
+        BATCH_PDFS; si el lote falla se reintenta PDF por PDF para aislar al que falla."""
+        todo: List[Tuple[str, Signature, str]] = []; digests = {f[2] for f in self.pending_files}
+        for pdf, sig in ready:
+            self._seen.pop(pdf, None)
+            try: digest = file_digest(pdf)
+            except OSError:
+                LOGGER.exception("No se pudo leer '%s'; se reintenta si el archivo cambia.", pdf)
+                self._failed[pdf] = sig; continue
+            if digest in self.state.digests or digest in digests:
+                LOGGER.info("Ya ingerido (mismo contenido): %s", pdf)
+                self.state.record(pdf, sig, digest, 0); self.state.save(); continue
+            digests.add(digest); todo.append((pdf, sig, digest))
+        n = 0
+        for i in range(0, len(todo), BATCH_PDFS):
+            batch = todo[i:i + BATCH_PDFS]
+            try: n += self._extract(batch)
+            except Exception:
+                if len(batch) == 1:
+                    LOGGER.exception("No se pudo extraer '%s'; se reintenta si el archivo cambia.", batch[0][0])
+                    self._failed[batch[0][0]] = batch[0][1]; continue
+                LOGGER.warning("Falló la extracción de %s PDF juntos; se reintenta de a uno.", len(batch))
+                for one in batch:
+                    try: n += self._extract([one])
+                    except Exception:
+                        LOGGER.exception("No se pudo extraer '%s'; se reintenta si el archivo cambia.", one[0])
+                        self._failed[one[0]] = one[1]
+            if len(self.pending_rows) >= self.flush_rows: self.flush()   # memoria acotada a un lote
+        return n
+
+    def _extract(self, batch: List[Tuple[str, Signature, str]]) -> int:
+        counts: Dict[str, int] = {}
+        rows = list(self.extract([pdf for pdf, _, _ in batch], counts))
+        if self.pending_since is None: self.pending_since = time.monotonic()
+        self.pending_rows.extend(rows)
+        for pdf, sig, digest in batch:
+            self._failed.pop(pdf, None)
+            self.pending_files.append((pdf, sig, digest, counts.get(pdf, 0)))
+        return len(batch)
+
+    def due(self, now: Optional[float] = None) -> bool:
+        if not self.pending_files: return False
+        now = time.monotonic() if now is None else now
+        return len(self.pending_rows) >= self.flush_rows or now - self.pending_since >= self.flush_seconds
+
+    def _write(self, rows: List[Dict[str, Any]]) -> None:
+        if self.fmt != "excel":
+            open_sink(self.target, self.fmt).append(rows)
+        elif self.incremental:
+            append_incremental(self.target, rows)
+        else:
+            append_and_dedup(self.target, rows)
+
+    def flush(self) -> int:
+        """Escribe todas las filas pendientes en una pasada y recién entonces marca sus PDF como ingeridos."""
+        if not self.pending_files: return 0
+        rows, files = self.pending_rows, self.pending_files
+        if rows: self._write(rows)
+        for pdf, sig, digest, n in files: self.state.record(pdf, sig, digest, n)
+        self.state.save()
+        LOGGER.info("Escritura: %s filas de %s PDF ➜ %s", len(rows), len(files), self.target)
+        self.pending_rows = []; self.pending_files = []; self.pending_since = None
+        return len(rows)
+
+    def run_once(self) -> int:
+        """Una pasada sin esperar a que los archivos se asienten; escribe lo pendiente al final."""
+        self.ingest(self.scan(settle=0))
+        return self.flush()
+
+    def run(self, poll_seconds: float = DEFAULT_POLL_SECONDS) -> None:
+        LOGGER.info("Vigilando '%s' ➜ %s (lote: %s filas o %ss; estado: %s)",
+                    self.folder, self.target, self.flush_rows, self.flush_seconds, self.state.path)
+        try:
+            while not self.stop_event.is_set():
+                self.ingest(self.scan())
+                if self.due(): self.flush()
+                self.stop_event.wait(poll_seconds)
+        finally:
+            self.flush()   # al detenerse (Ctrl+C, SIGTERM) no se pierde lo ya extraído
+            LOGGER.info("Vigilancia detenida.")
+
+    def install_signal_handlers(self) -> None:
+        def stop(*_: Any) -> None: self.stop_event.set()
+        for name in ("SIGINT", "SIGTERM"):
+            if hasattr(signal, name): signal.signal(getattr(signal, name), stop)